@@ -0,0 +1,89 @@
+# analysis_cache.py - Single-flight cache for analysis results keyed by store generation
+import threading
+from collections import OrderedDict
+
+
+class SingleFlightCache:
+    """Small LRU of computed results where concurrent misses share one computation.
+
+    The first caller to miss a key computes it; callers arriving while that
+    computation runs wait for it instead of starting their own (``joined``).
+    A failed computation is not cached and its exception is raised in every
+    waiting caller (interrupts such as KeyboardInterrupt reach them as
+    RuntimeError). Keys carry everything the result depends on, e.g.
+    (store generation, window config), so entries never need invalidating;
+    old ones simply age out of the LRU.
+    """
+
+    def __init__(self, max_entries=8):
+        self.max_entries = int(max_entries)
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.in_flight = {}
+        self.counters = {'hits': 0, 'misses': 0, 'joined': 0, 'errors': 0}
+
+    def get(self, key, compute):
+        """Cached value for ``key``, computing it with ``compute()`` at most once at a time"""
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.counters['hits'] += 1
+                return self.entries[key]
+            flight = self.in_flight.get(key)
+            if flight is None:
+                flight = self.in_flight[key] = {'done': threading.Event(), 'value': None, 'error': None}
+                self.counters['misses'] += 1
+                leader = True
+            else:
+                self.counters['joined'] += 1
+                leader = False
+
+        if not leader:
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['value']
+
+        try:
+            value = compute()
+            flight['value'] = value
+            self.put(key, value)
+            return value
+        except BaseException as e:
+            # Waiters get the error too; an interrupt of this thread must not propagate into theirs
+            flight['error'] = e if isinstance(e, Exception) else RuntimeError(f"computation of {key!r} was "
+                                                                                f"interrupted: {e!r}")
+            with self.lock:
+                self.counters['errors'] += 1
+            raise
+        finally:
+            # Always release the key, or every later miss would wait on this flight forever
+            with self.lock:
+                del self.in_flight[key]
+            flight['done'].set()
+
+    def peek(self, key):
+        """Cached value or None, without computing (counts a hit when found)"""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            self.counters['hits'] += 1
+            return self.entries[key]
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counters['hits'] + self.counters['misses'] + self.counters['joined']
+            return dict(self.counters, entries=len(self.entries),
+                        hit_rate=(self.counters['hits'] + self.counters['joined']) / lookups if lookups else 0.0)
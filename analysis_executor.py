@@ -0,0 +1,345 @@
+# analysis_executor.py - Process-pool pattern analysis off the request path
+import threading
+import time
+import multiprocessing as mp
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+from packet_features import metrics_to_features
+from attack_rules import CompiledRuleEngine
+from quantum_engine import StatevectorEngine, QuantumLookupTable
+
+
+def classical_score(features):
+    """Rule-of-thumb threat score from the 12-feature vector"""
+    score = 0.0
+    if features[0] > 0.5:  # High packet rate
+        score += 0.3
+    if features[2] > 0.5:  # High IP diversity
+        score += 0.3
+    if features[3] > 0.4:  # High port diversity
+        score += 0.3
+    if len(features) > 11 and features[11] > 0.5:  # High attack signature
+        score += 0.4
+    if len(features) > 7 and features[7] > 0.5:  # SYN flood indicator
+        score += 0.3
+    if len(features) > 9 and features[8] > 0.4 and features[9] > 0.6:  # Data exfiltration indicator
+        score += 0.4
+    return min(score, 1.0)
+
+
+def decide_attack(attack_scores, threshold):
+    """Add the normal-traffic score and pick the prediction: (attack, confidence, scores)"""
+    max_attack_score = max(attack_scores.values()) if attack_scores else 0
+    attack_scores['normal_traffic'] = max(0, 1.0 - max_attack_score)
+    if max_attack_score > threshold:
+        attack, confidence = max(attack_scores.items(), key=lambda x: x[1])
+        return attack, confidence, attack_scores
+    return 'normal_traffic', attack_scores.get('normal_traffic', 0.8), attack_scores
+
+
+def encode_features(features, n_features, n_qubits):
+    """Pad/truncate to ``n_features``, clip to [0, 1] and keep the first ``n_qubits`` angles"""
+    matrix = np.atleast_2d(np.asarray(features, dtype=float))[:, :n_features]
+    if matrix.shape[1] < n_features:
+        matrix = np.pad(matrix, ((0, 0), (0, n_features - matrix.shape[1])), 'constant')
+    return np.clip(matrix, 0, 1)[:, :n_qubits]
+
+
+# Per-worker caches, so a task only ships metrics, rules and parameters
+_rule_engines = {}
+_quantum_engines = {}
+_lookup_tables = {}
+
+
+def _rule_engine(key, signatures):
+    engine = _rule_engines.get(key)
+    if engine is None:
+        _rule_engines.clear()
+        engine = _rule_engines[key] = CompiledRuleEngine(signatures)
+    return engine
+
+
+def _quantum_scores(payload, encoded):
+    shape = (payload['n_qubits'], payload['n_layers'])
+    engine = _quantum_engines.get(shape)
+    if engine is None:
+        engine = _quantum_engines[shape] = StatevectorEngine(*shape)
+    params = np.asarray(payload['params'], dtype=float)
+    if payload['inference_mode'] == 'lut':
+        key = shape + (payload['lut_grid_points'],)
+        table = _lookup_tables.get(key)
+        if table is None:
+            table = _lookup_tables[key] = QuantumLookupTable(engine, payload['lut_grid_points'])
+        measurements = table.expval_z0_batch(encoded, params)
+    else:
+        measurements = engine.expval_z0_batch(encoded, params)
+    return 1 / (1 + np.exp(-measurements * 3))
+
+
+def run_analysis(payload):
+    """Pure window analysis (runs in a pool worker): features, attack scores, quantum/classical scores.
+
+    ``payload`` holds the window ``metrics``, the attack ``signatures`` (with
+    ``signatures_key`` for the compiled-rule cache), the confidence
+    ``threshold`` and the quantum model (``params``, ``n_qubits``,
+    ``n_layers``, ``n_features``, ``inference_mode``, ``lut_grid_points``).
+    """
+    started = time.perf_counter()
+    metrics = payload['metrics']
+    features = metrics_to_features(metrics)
+    attack_scores, _ = _rule_engine(payload['signatures_key'], payload['signatures']).score(metrics)
+    predicted, confidence, attack_scores = decide_attack(attack_scores, payload['threshold'])
+    classical = classical_score(features)
+    if payload['params'] is None:
+        quantum = classical
+    else:
+        quantum = float(_quantum_scores(payload, encode_features([features], payload['n_features'],
+                                                                 payload['n_qubits']))[0])
+    return {
+        'features': features,
+        'predicted_attack': predicted,
+        'attack_confidence': float(confidence),
+        'attack_scores': attack_scores,
+        'quantum_score': quantum,
+        'classical_score': float(classical),
+        'compute_seconds': time.perf_counter() - started
+    }
+
+
+class AnalysisExecutor:
+    """Process pool for run_analysis with a bounded queue, coalescing and timeouts.
+
+    Callers submit under a key (e.g. the analysis window configuration);
+    while a task for that key is queued or running, further submissions join
+    it instead of queueing another one. At most ``max_pending`` tasks are
+    outstanding; past that, submissions are rejected and callers fall back
+    to the latest completed result. ``result`` waits at most ``timeout``
+    seconds (tasks that have not started by then are cancelled). Each task
+    carries a caller ``context`` (e.g. the stats snapshot it was built from)
+    that comes back with its result.
+
+    If a worker dies the pool breaks for good, so it is replaced
+    (``pool_restarts``) and the tasks it took down are analysed inline once.
+    A task still unfinished ``task_timeout`` seconds after it was dispatched
+    (counted from when the pool's workers came up) is treated as a hung
+    worker: it fails with TimeoutError, leaves ``pending`` so its key can be
+    submitted again, and the pool is recycled (``stuck``).
+    """
+
+    def __init__(self, workers=1, max_pending=4, timeout=2.0, task_timeout=None):
+        self.workers = int(workers)
+        self.max_pending = int(max_pending)
+        self.timeout = timeout
+        self.task_timeout = task_timeout if task_timeout is not None else 5 * timeout
+        self.pool_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.ready = (None, None)  # (pool, time its workers first answered)
+        self.pool = self._new_pool()
+        self.pending = {}
+        self.dispatched = {}  # id(task) -> task whose worker has not finished yet
+        self.latest = None  # (result, context) of the newest completed task
+        self.counters = {'submitted': 0, 'coalesced': 0, 'rejected': 0, 'completed': 0, 'failed': 0,
+                         'timeouts': 0, 'cancelled': 0, 'stuck': 0, 'pool_restarts': 0, 'inline_fallbacks': 0}
+        self._durations = []
+
+    def _new_pool(self):
+        # spawn: workers must not inherit the server's threads or locks
+        pool = ProcessPoolExecutor(self.workers, mp_context=mp.get_context('spawn'))
+        # Spawned workers take a while to import numpy; hang detection starts once they answer
+        pool.submit(time.perf_counter).add_done_callback(lambda future: self._pool_ready(pool))
+        return pool
+
+    def _pool_ready(self, pool):
+        self.ready = (pool, time.perf_counter())
+
+    def _restart_pool(self, broken):
+        """Replace ``broken`` unless another caller already did"""
+        with self.pool_lock:
+            if self.pool is not broken:
+                return
+            print("⚠️  Analysis worker died - restarting the process pool")
+            # wait=False: this can run on the broken pool's own management thread
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._new_pool()
+            self.counters['pool_restarts'] += 1
+
+    def _recycle_pool(self, hung):
+        """Kill the workers of ``hung`` (tasks on it fall back inline) and start a fresh pool"""
+        with self.pool_lock:
+            if self.pool is not hung:
+                return
+            print(f"⚠️  Analysis task exceeded {self.task_timeout:g}s - recycling the process pool")
+            self.pool = self._new_pool()
+            self.counters['pool_restarts'] += 1
+        for process in list((hung._processes or {}).values()):
+            process.kill()  # SIGKILL: a stopped or deadlocked worker ignores SIGTERM
+        hung.shutdown(wait=False, cancel_futures=True)
+
+    def _stuck_tasks(self):
+        """Pop tasks whose worker has run longer than task_timeout (call with self.lock held)"""
+        ready_pool, ready_at = self.ready
+        if ready_pool is not self.pool:
+            return []
+        now = time.perf_counter()
+        stuck = [task for task in self.dispatched.values()
+                 if task['pool'] is self.pool and now - max(task['dispatched_at'], ready_at) > self.task_timeout]
+        for task in stuck:
+            del self.dispatched[id(task)]
+            if self.pending.get(task['key']) is task:
+                del self.pending[task['key']]
+            self.counters['stuck'] += 1
+        return stuck
+
+    def _fail_stuck(self, stuck):
+        for task in stuck:
+            try:
+                task['future'].set_exception(FutureTimeoutError(f"analysis task {task['key']!r} exceeded "
+                                                                f"{self.task_timeout:g}s"))
+            except InvalidStateError:
+                pass  # Already cancelled by a timed-out caller
+        if stuck:
+            self._recycle_pool(stuck[0]['pool'])
+
+    def _dispatch(self, task, payload):
+        """Run payload on the pool into ``task['future']``, inline if the pool has died"""
+        outer = task['future']
+        pool = task['pool'] = self.pool
+        task['dispatched_at'] = time.perf_counter()
+        # Tracked until the worker finishes, even if every caller has given up on it
+        with self.lock:
+            self.dispatched[id(task)] = task
+        try:
+            inner = pool.submit(run_analysis, payload)
+        except BrokenProcessPool:
+            with self.lock:
+                self.dispatched.pop(id(task), None)
+            self._run_inline(pool, outer, payload)
+            return
+        outer.add_done_callback(lambda future: future.cancelled() and inner.cancel())
+        inner.add_done_callback(lambda future: self._chain(future, task, pool, payload))
+
+    def _chain(self, inner, task, pool, payload):
+        with self.lock:
+            self.dispatched.pop(id(task), None)
+        outer = task['future']
+        if inner.cancelled():
+            outer.cancel()
+            return
+        error = inner.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._run_inline(pool, outer, payload)
+            return
+        try:
+            if error is not None:
+                outer.set_exception(error)
+            else:
+                outer.set_result(inner.result())
+        except InvalidStateError:
+            pass  # Cancelled by a timed-out caller meanwhile
+
+    def _run_inline(self, pool, outer, payload):
+        self._restart_pool(pool)
+        if outer.done():
+            return  # Already failed as stuck or cancelled: nothing is waiting for it
+        self.counters['inline_fallbacks'] += 1
+        try:
+            try:
+                outer.set_result(run_analysis(payload))
+            except Exception as e:
+                outer.set_exception(e)
+        except InvalidStateError:
+            pass  # Cancelled by a timed-out caller meanwhile
+
+    def submit(self, key, build, callback=None):
+        """Queue ``build() -> (payload, context)`` under ``key``; returns the task's future or None if rejected.
+
+        ``callback(result, context)`` runs once when the task completes.
+        """
+        task = self._submit(key, build, callback)
+        return task['future'] if task else None
+
+    def _submit(self, key, build, callback=None):
+        created = False
+        with self.lock:
+            stuck = self._stuck_tasks()
+            task = self.pending.get(key)
+            if task is not None:
+                self.counters['coalesced'] += 1
+                if callback is not None:
+                    task['callbacks'].append(callback)
+            elif len(self.pending) >= self.max_pending:
+                self.counters['rejected'] += 1
+            else:
+                # Reserve the key first; build() and dispatch run outside the lock
+                task = {'key': key, 'context': None, 'callbacks': [callback] if callback else [], 'future': Future(),
+                        'submitted_at': time.perf_counter()}
+                self.pending[key] = task
+                self.counters['submitted'] += 1
+                created = True
+        self._fail_stuck(stuck)
+        if not created:
+            return task
+
+        task['future'].add_done_callback(lambda future: self._done(key, task))
+        try:
+            payload, task['context'] = build()
+        except Exception as e:
+            task['future'].set_exception(e)
+            return task
+        self._dispatch(task, payload)
+        return task
+
+    def _done(self, key, task):
+        future = task['future']
+        with self.lock:
+            if self.pending.get(key) is task:
+                del self.pending[key]
+            if future.cancelled():
+                self.counters['cancelled'] += 1
+                return
+            if future.exception() is not None:
+                self.counters['failed'] += 1
+                print(f"❌ Analysis task error: {future.exception()}")
+                return
+            result = future.result()
+            self.counters['completed'] += 1
+            self._durations.append(time.perf_counter() - task['submitted_at'])
+            del self._durations[:-256]
+            self.latest = (result, task['context'])
+            callbacks = list(task['callbacks'])
+        for callback in callbacks:
+            try:
+                callback(result, task['context'])
+            except Exception as e:
+                print(f"❌ Analysis callback error: {e}")
+
+    def result(self, key, build, timeout=None):
+        """(result, context) of a fresh task, or the latest completed one if rejected or timed out"""
+        task = self._submit(key, build)
+        if task is None:
+            return self.latest
+        try:
+            return task['future'].result(self.timeout if timeout is None else timeout), task['context']
+        except FutureTimeoutError:
+            with self.lock:
+                self.counters['timeouts'] += 1
+                stuck = self._stuck_tasks()
+            task['future'].cancel()
+            self._fail_stuck(stuck)
+            return self.latest
+        except Exception:
+            return self.latest
+
+    def stats(self):
+        with self.lock:
+            durations = np.array(self._durations) * 1e3
+            stats = dict(self.counters, workers=self.workers, pending=len(self.pending),
+                         max_pending=self.max_pending)
+        if len(durations):
+            stats['latency_ms_p50'], stats['latency_ms_p99'] = np.percentile(durations, [50, 99]).tolist()
+        return stats
+
+    def shutdown(self, wait=True):
+        with self.pool_lock:
+            self.pool.shutdown(wait=wait, cancel_futures=True)
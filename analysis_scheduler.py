@@ -0,0 +1,111 @@
+# analysis_scheduler.py - Continuous background analysis publishing the latest verdict
+import threading
+import time
+from collections import deque, namedtuple
+import numpy as np
+
+Verdict = namedtuple('Verdict', [
+    'seq', 'analysis', 'generation', 'position', 'snapshot_epoch', 'computed_at', 'duration'
+])
+
+
+class ContinuousAnalysis:
+    """Runs ``analyze()`` on a fixed cadence and publishes each result as an immutable Verdict.
+
+    A run starts every ``interval`` seconds, or as soon as ``every_packets``
+    new packets have reached the store, whichever comes first. Like
+    SnapshotPublisher, ``latest`` is swapped in one assignment, so readers
+    get the newest verdict in O(1) without locks. Listeners are called with
+    ``(verdict, previous)`` from the scheduler thread after each run.
+    """
+
+    def __init__(self, analyze, store, interval=0.25, every_packets=None, poll_interval=0.01):
+        self.analyze = analyze
+        self.store = store
+        self.interval = interval
+        self.every_packets = every_packets
+        self.poll_interval = min(poll_interval, interval) if interval else poll_interval
+        self.latest = None
+        self.listeners = []
+        self.active = False
+        self.thread = None
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0  # Runs that took longer than the interval
+        self._durations = deque(maxlen=256)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def start(self):
+        if self.active:
+            return
+        self.active = True
+        self.thread = threading.Thread(target=self._loop, name='continuous-analysis', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=2.0):
+        self.active = False
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def _due(self, last_run, last_position):
+        if self.interval and time.monotonic() - last_run >= self.interval:
+            return True
+        return bool(self.every_packets) and self.store.total - last_position >= self.every_packets
+
+    def _loop(self):
+        last_run, last_position = float('-inf'), self.store.total
+        while self.active:
+            if not self._due(last_run, last_position):
+                time.sleep(self.poll_interval)
+                continue
+            last_run, last_position = time.monotonic(), self.store.total
+            try:
+                self.run_once()
+            except Exception as e:
+                self.errors += 1
+                print(f"❌ Continuous analysis error: {e}")
+                time.sleep(1)
+
+    def run_once(self):
+        """Analyse now and publish the verdict (also usable without the thread)"""
+        generation, position = self.store.generation, self.store.total
+        started = time.perf_counter()
+        analysis = self.analyze()
+        duration = time.perf_counter() - started
+        self._durations.append(duration)
+        if self.interval and duration > self.interval:
+            self.overruns += 1
+
+        previous = self.latest
+        self.runs += 1
+        stats = analysis.get('real_time_stats') or {}
+        verdict = Verdict(seq=self.runs, analysis=analysis, generation=generation, position=position,
+                          snapshot_epoch=stats.get('stats_epoch'), computed_at=time.time(), duration=duration)
+        self.latest = verdict
+        for listener in self.listeners:
+            try:
+                listener(verdict, previous)
+            except Exception as e:
+                print(f"❌ Verdict listener error: {e}")
+        return verdict
+
+    def stats(self):
+        """Cadence, analysis duration and how stale the published verdict is"""
+        verdict = self.latest
+        durations = np.array(self._durations) * 1e3
+        stats = {
+            'active': self.active,
+            'interval': self.interval,
+            'every_packets': self.every_packets,
+            'runs': self.runs,
+            'errors': self.errors,
+            'overruns': self.overruns,
+            'staleness_seconds': time.time() - verdict.computed_at if verdict else None,
+            'packets_behind': self.store.total - verdict.position if verdict else None,
+        }
+        if len(durations):
+            stats['duration_ms_mean'] = float(durations.mean())
+            stats['duration_ms_p50'], stats['duration_ms_p99'] = np.percentile(durations, [50, 99]).tolist()
+        return stats
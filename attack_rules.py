@@ -0,0 +1,100 @@
+# attack_rules.py - Data-driven attack scoring compiled from attack_signatures
+import json
+import hashlib
+import numpy as np
+
+_OPERATORS = {
+    '>': lambda v: (v, False, np.inf, False),
+    '>=': lambda v: (v, True, np.inf, False),
+    '<': lambda v: (-np.inf, False, v, False),
+    '<=': lambda v: (-np.inf, False, v, True),
+    'between': lambda v: (v[0], True, v[1], True),
+}
+
+
+def rules_fingerprint(signatures):
+    """Content hash of every signature's rules (changes whenever a rule is edited in place)"""
+    rules = {name: signature.get('rules') for name, signature in signatures.items()}
+    return hashlib.sha1(json.dumps(rules, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class CompiledRuleEngine:
+    """Threshold/weight matrices compiled from the ``rules`` of each signature.
+
+    A rule is ``{'metric', 'op', 'value', 'weight', 'label'}`` or
+    ``{'any': [conditions...], 'weight', 'label'}``; ops are ``>``, ``>=``,
+    ``<``, ``<=`` and ``between`` (inclusive range). An attack's score is the
+    sum of the weights of its matching rules, capped at 1.0. Signatures
+    without rules are not scored.
+    """
+
+    def __init__(self, signatures):
+        self.attacks = []
+        self.metric_names = []
+        self.rule_labels = []
+        rule_attack, rule_weight = [], []
+        clause_metric, clause_rule, bounds = [], [], []
+
+        for attack, signature in signatures.items():
+            rules = signature.get('rules') or []
+            if not rules:
+                continue
+            self.attacks.append(attack)
+            for rule in rules:
+                rule_index = len(rule_weight)
+                rule_attack.append(len(self.attacks) - 1)
+                rule_weight.append(float(rule['weight']))
+                self.rule_labels.append(rule.get('label', rule.get('metric', 'rule')))
+                for condition in rule.get('any', [rule]):
+                    if condition['metric'] not in self.metric_names:
+                        self.metric_names.append(condition['metric'])
+                    clause_metric.append(self.metric_names.index(condition['metric']))
+                    clause_rule.append(rule_index)
+                    bounds.append(_OPERATORS[condition['op']](condition['value']))
+
+        self.rule_attack = np.array(rule_attack, dtype=np.intp)
+        self.rule_weight = np.array(rule_weight, dtype=np.float64)
+        self.clause_metric = np.array(clause_metric, dtype=np.intp)
+        lower, lower_inclusive, upper, upper_inclusive = zip(*bounds) if bounds else ((), (), (), ())
+        self.lower = np.array(lower, dtype=np.float64)
+        self.lower_inclusive = np.array(lower_inclusive, dtype=bool)
+        self.upper = np.array(upper, dtype=np.float64)
+        self.upper_inclusive = np.array(upper_inclusive, dtype=bool)
+
+        # Clause -> rule incidence (an 'any' rule fires if one of its clauses does)
+        self.clause_to_rule = np.zeros((len(clause_rule), len(rule_weight)))
+        self.clause_to_rule[np.arange(len(clause_rule)), clause_rule] = 1.0
+        # (n_attacks, max_rules) rule slots per attack, padded with a zero-weight column;
+        # scores are accumulated slot by slot so float sums match the original if-chains
+        counts = np.bincount(self.rule_attack, minlength=len(self.attacks))
+        self.attack_slots = np.full((len(self.attacks), counts.max() if len(counts) else 0), len(rule_weight))
+        for attack_index in range(len(self.attacks)):
+            rules = np.flatnonzero(self.rule_attack == attack_index)
+            self.attack_slots[attack_index, :len(rules)] = rules
+
+    def metric_matrix(self, metrics_list):
+        """(B, n_metrics) matrix of the metrics the rules read"""
+        return np.array([[m[name] for name in self.metric_names] for m in metrics_list], dtype=np.float64)
+
+    def rule_hits(self, metric_matrix):
+        """(B, n_rules) boolean matrix of matching rules"""
+        values = metric_matrix[:, self.clause_metric]
+        above = (values > self.lower) | (self.lower_inclusive & (values == self.lower))
+        below = (values < self.upper) | (self.upper_inclusive & (values == self.upper))
+        return ((above & below) @ self.clause_to_rule) > 0
+
+    def score_matrix(self, metric_matrix):
+        """(B, n_attacks) capped scores plus the (B, n_rules) rule hits"""
+        hits = self.rule_hits(metric_matrix)
+        weighted = np.hstack([hits * self.rule_weight, np.zeros((len(hits), 1))])
+        scores = np.zeros((len(hits), len(self.attacks)))
+        for slot in self.attack_slots.T:
+            scores += weighted[:, slot]
+        return np.minimum(scores, 1.0), hits
+
+    def score(self, metrics):
+        """Scores for one metrics dict: ({attack: score}, [(attack, label, weight), ...])"""
+        scores, hits = self.score_matrix(self.metric_matrix([metrics]))
+        matched = [(self.attacks[self.rule_attack[r]], self.rule_labels[r], self.rule_weight[r])
+                   for r in np.flatnonzero(hits[0])]
+        return dict(zip(self.attacks, scores[0].tolist())), matched
@@ -0,0 +1,598 @@
+#!/usr/bin/env python3
+# benchmark_analyzer.py - Performance and equivalence checks for the analyzer stack
+
+import sys
+import os
+import time
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def time_call(func, repeat):
+    """Mean wall-clock seconds per call"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def bench_quantum(args):
+    """Quantum backend equivalence and per-inference latency"""
+    import numpy as np
+    from quantum_analyzer_simplified_fixed import EnhancedPacketQuantumSecurityAI
+    from quantum_engine import compare_with_pennylane
+
+    analyzer = EnhancedPacketQuantumSecurityAI()
+    analyzer.packet_simulator_active = False
+
+    print("\n🔬 Quantum engine equivalence")
+    failures = 0
+    max_error = compare_with_pennylane(analyzer, trials=args.trials)
+    if max_error is None:
+        print("⚠️  PennyLane not installed - equivalence check skipped")
+    else:
+        failures += not max_error < 1e-10
+        status = "✅" if max_error < 1e-10 else "❌"
+        print(f"{status} NumPy engine vs PennyLane: max |Δ<Z0>| = {max_error:.2e} over {args.trials} circuits")
+
+    rng = np.random.default_rng(2)
+    inputs = rng.uniform(0, 1, (args.trials, analyzer.n_qubits))
+    params = rng.uniform(0, 2 * np.pi, (analyzer.n_layers, analyzer.n_qubits, 3))
+    single = np.array([analyzer.quantum_engine.expval_z0(row, params) for row in inputs])
+    batch_error = float(np.max(np.abs(analyzer.quantum_engine.expval_z0_batch(inputs, params) - single)))
+    failures += not batch_error < 1e-10
+    status = "✅" if batch_error < 1e-10 else "❌"
+    print(f"{status} Batched vs single-circuit engine: max |Δ<Z0>| = {batch_error:.2e} over {args.trials} circuits")
+
+    print("\n⏱️  Per-inference latency")
+    features = np.random.default_rng(0).uniform(0, 1, 12).tolist()
+    engine = analyzer.quantum_engine
+
+    def cold_predict():
+        engine.invalidate()
+        analyzer.quantum_predict(features)
+
+    cases = [('numpy (fused, cached)', lambda: analyzer.quantum_predict(features), 'numpy', args.repeat),
+             ('numpy (cache rebuild)', cold_predict, 'numpy', args.repeat)]
+    if analyzer.pennylane_available:
+        cases.append(('pennylane QNode', lambda: analyzer.quantum_predict(features), 'pennylane',
+                      max(args.repeat // 20, 5)))
+    for label, func, backend, repeat in cases:
+        analyzer.quantum_backend = backend
+        latency = time_call(func, repeat)
+        print(f"   {label:24s} {latency * 1e6:10.1f} µs/inference")
+    print(f"   Observable cache: {engine.cache_hits} hits / {engine.cache_misses} misses")
+
+    print(f"\n📦 Batched inference ({args.batch} windows per call)")
+    matrix = np.random.default_rng(1).uniform(0, 1, (args.batch, 12))
+    for backend in ['numpy'] + (['pennylane'] if analyzer.pennylane_available else []):
+        analyzer.quantum_backend = backend
+        latency = time_call(lambda: analyzer.quantum_predict_batch(matrix), 3)
+        print(f"   {backend:24s} {latency * 1e3:10.2f} ms/batch ({latency / args.batch * 1e6:.2f} µs/window)")
+
+    print(f"\n🧮 Lookup-table mode ({args.lut_grid} points per axis)")
+    analyzer.quantum_backend = 'numpy'
+    max_error = analyzer.enable_quantum_lut(args.lut_grid)
+    single = time_call(lambda: analyzer.quantum_predict(features), args.repeat)
+    batch = time_call(lambda: analyzer.quantum_predict_batch(matrix), 3)
+    print(f"   Max interpolation error <Z0>: {max_error:.2e}")
+    print(f"   Measured break-even:     {analyzer.quantum_lut.break_even} windows per batch")
+    print(f"   {'lut mode single':24s} {single * 1e6:10.1f} µs/inference")
+    print(f"   {'lut mode batch':24s} {batch * 1e3:10.2f} ms/batch ({batch / args.batch * 1e6:.2f} µs/window)")
+    analyzer.disable_quantum_lut()
+    return failures
+
+
+ENTRY_POINTS = ['quantum_analyzer_simplified_fixed', 'quantum_server_fixed', 'quantum_client_fixed',
+                'attack_simulator', 'simplified_main_app']
+
+
+def measure_import(module):
+    """Cold import of ``module`` in a fresh interpreter via -X importtime.
+
+    Returns (total_ms, [(cumulative_ms, name), ...]) for its direct dependencies.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_us, name = line.replace('import time:', '').split('|')
+        entries.append((int(cumulative_us) / 1000.0, len(name) - len(name.lstrip()), name.strip()))
+
+    # Children are listed before their parent, one indent level deeper
+    position = max(i for i, (_, depth, name) in enumerate(entries) if name == module)
+    total, depth, _ = entries[position]
+    children = []
+    for ms, child_depth, name in reversed(entries[:position]):
+        if child_depth <= depth:
+            break
+        if child_depth == depth + 2:
+            children.append((ms, name))
+    return total, sorted(children, reverse=True)
+
+
+def bench_imports(args):
+    """Cold-start import time per entry point against a budget"""
+    print(f"\n⏱️  Import-time budget report (budget {args.budget_ms:.0f} ms)")
+    over_budget = 0
+    for module in args.modules or ENTRY_POINTS:
+        try:
+            total, top_level = measure_import(module)
+        except RuntimeError as e:
+            print(f"   ⚠️  {module}: import failed ({e})")
+            continue
+        status = "✅" if total <= args.budget_ms else "❌"
+        over_budget += total > args.budget_ms
+        heaviest = ', '.join(f"{name} {ms:.0f}ms" for ms, name in top_level[:args.top])
+        print(f"   {status} {module:36s} {total:8.1f} ms  [{heaviest}]")
+
+    if args.warm_up:
+        from quantum_analyzer_simplified_fixed import EnhancedPacketQuantumSecurityAI
+        analyzer = EnhancedPacketQuantumSecurityAI(quantum_backend=args.backend)
+        analyzer.packet_simulator_active = False
+        print(f"   First-inference warm-up ({analyzer.quantum_backend}): {analyzer.warm_up() * 1e3:.1f} ms")
+    return over_budget
+
+
+def bench_stress(args):
+    """Concurrent analysis readers against the packet writer thread"""
+    import threading
+    from quantum_analyzer_simplified_fixed import EnhancedPacketQuantumSecurityAI
+
+    analyzer = EnhancedPacketQuantumSecurityAI()
+    analyzer.set_attack_mode(args.mode)
+    time.sleep(1.0)
+
+    def writer_rate():
+        start_total, start = analyzer.packet_history.total, time.perf_counter()
+        time.sleep(args.seconds)
+        return (analyzer.packet_history.total - start_total) / (time.perf_counter() - start)
+
+    print(f"\n🧵 Snapshot stress test: {args.readers} readers, {args.mode}, {args.seconds:.0f}s per phase")
+    baseline = writer_rate()
+
+    errors, torn, reads = [], [], [0] * args.readers
+    stop = threading.Event()
+
+    def reader(index):
+        last_epoch = 0
+        while not stop.is_set():
+            try:
+                analysis = analyzer.analyze_current_pattern()
+                stats = analyzer.get_real_time_packet_stats()
+                if analysis['pattern_type'] in ('analysis_error', 'prediction_error'):
+                    errors.append(analysis['recommendation'])
+                if stats['stats_epoch'] < last_epoch:
+                    torn.append(f"epoch went backwards ({stats['stats_epoch']} < {last_epoch})")
+                last_epoch = stats['stats_epoch']
+                reads[index] += 1
+            except Exception as e:
+                errors.append(repr(e))
+            if args.read_interval:
+                time.sleep(args.read_interval)
+
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(args.readers)]
+    for thread in threads:
+        thread.start()
+    loaded = writer_rate()
+    stop.set()
+    for thread in threads:
+        thread.join()
+    analyzer.packet_simulator_active = False
+
+    print(f"   Writer alone:        {baseline:12,.0f} packets/s")
+    print(f"   Writer with readers: {loaded:12,.0f} packets/s ({(loaded / baseline - 1) * 100:+.1f}%)")
+    print(f"   Reads:               {sum(reads) / args.seconds:12,.0f} analyses/s")
+    cache = analyzer.analysis_cache.stats()
+    print(f"   Analysis cache:      {cache['hits']:,} hits, {cache['joined']:,} joined, {cache['misses']:,} misses "
+          f"({cache['hit_rate']:.1%} served without recomputing)")
+    for label, problems in (('Reader errors', errors), ('Torn snapshots', torn)):
+        status = "✅" if not problems else "❌"
+        print(f"   {status} {label}: {len(problems)}" + (f" (first: {problems[0]})" if problems else ""))
+    return len(errors) + len(torn)
+
+
+def bench_generate(args):
+    """Packets generated per second per attack mode (columns, store write, legacy dicts)"""
+    import numpy as np
+    from packet_store import PacketRingBuffer
+    from packet_generator import MODE_GENERATORS, generate_columns, columns_to_packets
+
+    print(f"\n🏭 Packet generation throughput (seed {args.seed})")
+    print(f"   {'mode':20s} {'columns':>14s} {'+ store write':>14s} {'legacy dicts':>14s}")
+    for mode in list(MODE_GENERATORS) + ['normal']:
+        rates = []
+        for stage in ('columns', 'store', 'dicts'):
+            rng = np.random.default_rng(args.seed)
+            store = PacketRingBuffer(args.capacity)
+            generated = 0
+            start = time.perf_counter()
+            while time.perf_counter() - start < args.seconds:
+                columns = generate_columns(mode, rng, now=0.0)
+                if stage == 'store':
+                    store.extend_columns(columns)
+                elif stage == 'dicts':
+                    columns_to_packets(columns, mode)
+                generated += len(columns['timestamp'])
+            rates.append(generated / (time.perf_counter() - start))
+        print(f"   {mode:20s} " + ' '.join(f"{rate:14,.0f}" for rate in rates) + "  packets/s")
+
+
+def bench_rate(args):
+    """Achieved vs target packet rate of the paced simulator"""
+    from quantum_analyzer_simplified_fixed import EnhancedPacketQuantumSecurityAI
+
+    print(f"\n🎚️  Simulator rate accuracy ({args.mode}, {args.seconds:.0f}s per target, tolerance ±{args.tolerance:g}%)")
+    failures = 0
+    for target in args.pps:
+        analyzer = EnhancedPacketQuantumSecurityAI(history_size=args.history, seed=0,
+                                                   target_pps={args.mode: target})
+        analyzer.set_attack_mode(args.mode)
+        time.sleep(1.0)
+        analyzer.set_target_rate(target)  # Restart the scheduler statistics after warm-up
+        time.sleep(0.1)
+        start_total, start = analyzer.packet_history.total, time.perf_counter()
+        time.sleep(args.seconds)
+        stored = (analyzer.packet_history.total - start_total) / (time.perf_counter() - start)
+        stats = analyzer.rate_scheduler.stats()
+        analyzer.packet_simulator_active = False
+
+        error = (stored / target - 1) * 100
+        ok = abs(error) <= args.tolerance
+        failures += not ok
+        print(f"   {'✅' if ok else '❌'} target {target:12,.1f} pps  achieved {stored:12,.1f} pps ({error:+.2f}%)  "
+              f"batch {stats['batch_size']}, shortfall {stats['shortfall']:,}")
+        time.sleep(0.2)
+    status = "✅" if not failures else "❌"
+    print(f"   {status} {failures} of {len(args.pps)} targets outside ±{args.tolerance:g}%")
+    return failures
+
+
+def bench_latency(args):
+    """Analysis request latency under simulated attack load, generator thread vs producer process"""
+    import numpy as np
+    from quantum_analyzer_simplified_fixed import EnhancedPacketQuantumSecurityAI
+
+    print(f"\n⏱️  Request latency under load ({args.mode}, {args.requests} requests per run)")
+    print(f"   {'source':8s} {'target pps':>12s} {'stored pps':>12s} {'p50 ms':>8s} {'p99 ms':>8s} {'dropped':>9s}")
+    for source in args.sources:
+        for target in args.pps:
+            analyzer = EnhancedPacketQuantumSecurityAI(history_size=args.history, seed=0, packet_source=source,
+                                                       target_pps={args.mode: target})
+            analyzer.set_attack_mode(args.mode)
+            time.sleep(1.5)  # Producer start-up (spawn) and warm-up
+            start_total = analyzer.packet_history.total
+            start = time.perf_counter()
+            latencies = []
+            for _ in range(args.requests):
+                began = time.perf_counter()
+                analyzer.analyze_current_pattern()
+                analyzer.get_real_time_packet_stats()
+                latencies.append(time.perf_counter() - began)
+                time.sleep(args.interval)
+            stored = (analyzer.packet_history.total - start_total) / (time.perf_counter() - start)
+            rate = analyzer.get_real_time_packet_stats()['simulator_rate']
+            analyzer.stop_packet_simulation()
+            p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+            print(f"   {source:8s} {target:12,.0f} {stored:12,.0f} {p50:8.2f} {p99:8.2f} {rate.get('dropped', 0):9,}")
+            time.sleep(0.2)
+
+
+def bench_recovery(args):
+    """Analysis keeps working after a pool worker is killed"""
+    import signal
+    from quantum_analyzer_simplified_fixed import EnhancedPacketQuantumSecurityAI
+
+    analyzer = EnhancedPacketQuantumSecurityAI(seed=0, analysis_workers=1, analysis_interval=args.interval)
+    analyzer.set_attack_mode('ddos_volumetric')
+    time.sleep(1.0)
+    analyzer.latest_analysis(timeout=30)  # Wait for the spawned worker to come up
+    executor = analyzer.analysis_executor
+
+    print(f"\n💀 Pool recovery ({args.kills} worker kills)")
+    failures = 0
+    for _ in range(args.kills):
+        completed, runs = executor.stats()['completed'], analyzer.continuous_analysis.runs
+        for pid in list(executor.pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        time.sleep(0.5)
+        problems = []
+        try:
+            analysis = analyzer.latest_analysis(timeout=30)
+            if analysis['pattern_type'] in ('analysis_error', 'prediction_error', 'insufficient_data'):
+                problems.append(f"analysis returned {analysis['pattern_type']}")
+        except Exception as e:
+            problems.append(f"latest_analysis raised {e!r}")
+        done = []
+        try:
+            analyzer.submit_analysis(done.append)
+        except Exception as e:
+            problems.append(f"submit_analysis raised {e!r}")
+        time.sleep(max(args.interval * 4, 1.0))
+        stats = executor.stats()
+        if not done:
+            problems.append("submitted analysis never completed")
+        if stats['completed'] <= completed:
+            problems.append("no task completed after the kill")
+        if analyzer.continuous_analysis.runs <= runs + 1:
+            problems.append("continuous analysis stalled")
+        failures += bool(problems)
+        status = "✅" if not problems else "❌"
+        print(f"   {status} restarts {stats['pool_restarts']}, inline fallbacks {stats['inline_fallbacks']}, "
+              f"completed {stats['completed']}, continuous errors {analyzer.continuous_analysis.errors}"
+              + (f" ({'; '.join(problems)})" if problems else ""))
+
+    print(f"\n🧊 Hung worker recovery ({args.hangs} stopped workers, task timeout {args.task_timeout:g}s)")
+    executor.task_timeout = args.task_timeout
+    for _ in range(args.hangs):
+        stuck, restarts = executor.stats()['stuck'], executor.stats()['pool_restarts']
+        for pid in list(executor.pool._processes):
+            os.kill(pid, signal.SIGSTOP)
+        time.sleep(args.task_timeout + 1.0)
+        problems = []
+        done = []
+        analyzer.submit_analysis(done.append)
+        deadline = time.time() + 30
+        while not done and time.time() < deadline:
+            time.sleep(0.1)
+        stats = executor.stats()
+        if stats['stuck'] <= stuck or stats['pool_restarts'] <= restarts:
+            problems.append("hung task was never recycled")
+        if not done:
+            problems.append("submitted analysis never completed")
+        elif done[0]['pattern_type'] in ('analysis_error', 'prediction_error', 'insufficient_data'):
+            problems.append(f"analysis returned {done[0]['pattern_type']}")
+        failures += bool(problems)
+        status = "✅" if not problems else "❌"
+        print(f"   {status} stuck {stats['stuck']}, restarts {stats['pool_restarts']}, pending {stats['pending']}, "
+              f"completed {stats['completed']}" + (f" ({'; '.join(problems)})" if problems else ""))
+    analyzer.stop_packet_simulation()
+    analyzer.shutdown_analysis()
+    return failures
+
+
+def bench_updates(args):
+    """Sustained /update throughput: connection per operation vs persistent WAL connections"""
+    import os
+    import tempfile
+    import threading
+    import numpy as np
+    from quantum_analyzer_simplified_fixed import EnhancedPacketQuantumSecurityAI
+    from quantum_server_fixed import QuantumNetworkMonitorServer
+    from db_connections import SQLiteConnectionManager
+
+    # Continuous analysis keeps the analysis itself off the measured request path
+    analyzer = EnhancedPacketQuantumSecurityAI(seed=0, analysis_interval=0.25)
+    configs = {
+        'legacy': dict(journal_mode=None, synchronous=None, persistent=False),
+        'persistent': dict(),
+    }
+    entries = [{'id': i, 'random_value': 0.5, 'client_timestamp': '2026-01-01T00:00:00'} for i in range(1, 6)]
+
+    print(f"\n🗄️  /update throughput ({args.clients} concurrent clients, thread per request, {args.seconds:.0f}s per config)")
+    for name in args.configs:
+        directory = tempfile.mkdtemp(prefix='qml_bench_')
+        db_path = os.path.join(directory, 'bench.db')
+        server = QuantumNetworkMonitorServer(analyzer, db_path, db=SQLiteConnectionManager(db_path, **configs[name]))
+        latencies = []
+        deadline = time.perf_counter() + args.seconds
+
+        def handle():
+            # What the /update route does
+            started = time.perf_counter()
+            server.update_client_data(entries)
+            server.log_event("CLIENT_UPDATE", f"Received {len(entries)} entries")
+            latencies.append(time.perf_counter() - started)
+
+        def client():
+            while time.perf_counter() < deadline:
+                request = threading.Thread(target=handle)
+                request.start()
+                request.join()
+
+        clients = [threading.Thread(target=client) for _ in range(args.clients)]
+        start = time.perf_counter()
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stats = server.db.stats()
+        server.close()
+        p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+        print(f"   {name:10s} {len(latencies) / elapsed:10,.0f} updates/s  p50 {p50:6.2f} ms  p99 {p99:7.2f} ms  "
+              f"connections opened {stats['opened']:,}, reused {stats['reused']:,}")
+    analyzer.stop_packet_simulation()
+    analyzer.shutdown_analysis()
+
+
+def bench_writes(args):
+    """Analysis rows committed per second: one transaction per row vs group commit"""
+    import os
+    import tempfile
+    from quantum_server_fixed import QuantumNetworkMonitorServer
+    from db_connections import SQLiteConnectionManager
+
+    analysis = {'pattern_type': 'ddos_volumetric', 'quantum_score': 0.61, 'classical_score': 0.9,
+                'confidence': 0.73, 'attack_detected': True, 'features': [0.5] * 12}
+    print(f"\n✍️  Analysis row writes ({args.rows:,} rows, synchronous={args.synchronous})")
+    for name, options in (('per-row', {'max_batch': 1}), ('group', {'max_batch': args.batch,
+                                                                   'max_delay_ms': args.delay_ms})):
+        db_path = os.path.join(tempfile.mkdtemp(prefix='qml_bench_'), 'bench.db')
+        db = SQLiteConnectionManager(db_path, synchronous=args.synchronous)
+        server = QuantumNetworkMonitorServer(None, db_path, db=db, writer_options=options)
+        start = time.perf_counter()
+        for _ in range(args.rows):
+            server.store_quantum_analysis(analysis)
+        enqueued = time.perf_counter() - start
+        server.writer.flush()
+        elapsed = time.perf_counter() - start
+        stats = server.writer.stats()
+        server.close()
+        print(f"   {name:8s} {args.rows / elapsed:10,.0f} rows/s  (caller {enqueued / args.rows * 1e6:5.1f} µs/row, "
+              f"mean batch {stats.get('mean_batch_size', 0):6.1f}, commit p50 {stats.get('commit_ms_p50', 0):.2f} ms, "
+              f"max queue {stats['max_queue_depth']:,})")
+
+
+def bench_history(args):
+    """get_status and trend queries on weeks of history: unindexed vs indexed, raw vs rollups, after retention"""
+    import os
+    import json
+    import tempfile
+    from datetime import datetime, timedelta
+    import numpy as np
+    from quantum_server_fixed import QuantumNetworkMonitorServer
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='qml_bench_'), 'bench.db')
+    server = QuantumNetworkMonitorServer(None, db_path, retention_options={'retention_days': 0})
+    server.setup_incremental_vacuum()  # Retention is switched on below; rebuild while the file is still empty
+    rows = int(args.days * args.rows_per_day)
+    start = datetime.now() - timedelta(days=args.days)
+    step = timedelta(days=args.days) / rows
+    features = json.dumps([0.5] * 12)
+    with server.db.transaction() as cursor:
+        stamps = [(start + step * i).isoformat() for i in range(rows)]
+        cursor.executemany("INSERT INTO quantum_analysis (timestamp, pattern_type, quantum_score, classical_score, "
+                           "confidence, attack_detected, features) VALUES (?, 'normal', 0.2, 0.1, 0.8, 0, ?)",
+                           [(stamp, features) for stamp in stamps])
+        cursor.executemany("INSERT INTO connection_log (event_type, timestamp, details) "
+                           "VALUES ('CLIENT_UPDATE', ?, 'Received 5 entries')", [(stamp,) for stamp in stamps])
+
+    def status_ms():
+        samples = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            server.get_status()
+            samples.append((time.perf_counter() - started) * 1e3)
+        return np.percentile(samples, [50, 99])
+
+    print(f"\n📚 get_status with {args.days:.0f} days of history ({rows:,} rows per table, "
+          f"{os.path.getsize(db_path) / 1e6:.0f} MB)")
+    with server.db.transaction() as cursor:
+        for table in ('quantum_analysis', 'connection_log', 'client_state_snapshots'):
+            cursor.execute(f"DROP INDEX idx_{table}_timestamp")
+    print("   no index         p50 {:8.2f} ms  p99 {:8.2f} ms".format(*status_ms()))
+    with server.db.transaction() as cursor:
+        for table in ('quantum_analysis', 'connection_log', 'client_state_snapshots'):
+            cursor.execute(f"CREATE INDEX idx_{table}_timestamp ON {table} (timestamp)")
+    print("   timestamp index  p50 {:8.2f} ms  p99 {:8.2f} ms".format(*status_ms()))
+
+    def timed_ms(query):
+        samples = []
+        for _ in range(max(args.requests // 10, 3)):
+            started = time.perf_counter()
+            result = query()
+            samples.append((time.perf_counter() - started) * 1e3)
+        return float(np.median(samples)), len(result)
+
+    def raw_hourly():
+        with server.db.transaction() as cursor:
+            cursor.execute("SELECT substr(timestamp, 1, 13), pattern_type, count(*), sum(attack_detected), "
+                           "min(quantum_score), avg(quantum_score), max(quantum_score) "
+                           "FROM quantum_analysis GROUP BY 1, 2")
+            return cursor.fetchall()
+
+    print("   hourly trend     raw GROUP BY {:8.2f} ms  rollup {:8.2f} ms  ({} buckets)".format(
+        timed_ms(raw_hourly)[0], *timed_ms(lambda: server.get_analysis_trends('hour'))))
+
+    server.retention.retention_days = args.keep_days
+    started = time.perf_counter()
+    removed = server.retention.run_once()
+    elapsed = time.perf_counter() - started
+    stats = server.retention.stats()
+    print(f"   retention ({args.keep_days:g} days) removed {sum(removed.values()):,} rows in {elapsed:.1f}s, "
+          f"batch p99 {stats['batch_ms_p99']:.1f} ms, vacuumed {stats['vacuumed_pages']:,} pages "
+          f"→ {os.path.getsize(db_path) / 1e6:.0f} MB")
+    print("   after retention  p50 {:8.2f} ms  p99 {:8.2f} ms".format(*status_ms()))
+    server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantum analyzer benchmarks")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    quantum = sub.add_parser('quantum', help=bench_quantum.__doc__)
+    quantum.add_argument('--trials', type=int, default=200)
+    quantum.add_argument('--repeat', type=int, default=2000)
+    quantum.add_argument('--batch', type=int, default=10000)
+    quantum.add_argument('--lut-grid', type=int, default=32)
+    quantum.set_defaults(func=bench_quantum)
+
+    imports = sub.add_parser('imports', help=bench_imports.__doc__)
+    imports.add_argument('modules', nargs='*')
+    imports.add_argument('--budget-ms', type=float, default=500.0)
+    imports.add_argument('--top', type=int, default=3)
+    imports.add_argument('--warm-up', action='store_true', help='also time the first quantum inference')
+    imports.add_argument('--backend', default='numpy', choices=['numpy', 'pennylane'])
+    imports.set_defaults(func=bench_imports)
+
+    stress = sub.add_parser('stress', help=bench_stress.__doc__)
+    stress.add_argument('--readers', type=int, default=16)
+    stress.add_argument('--seconds', type=float, default=5.0)
+    stress.add_argument('--read-interval', type=float, default=0.1, help='pause between reads per reader (s)')
+    stress.add_argument('--mode', default='ddos_volumetric')
+    stress.set_defaults(func=bench_stress)
+
+    generate = sub.add_parser('generate', help=bench_generate.__doc__)
+    generate.add_argument('--seconds', type=float, default=1.0, help='time per mode and stage')
+    generate.add_argument('--seed', type=int, default=0)
+    generate.add_argument('--capacity', type=int, default=2000)
+    generate.set_defaults(func=bench_generate)
+
+    rate = sub.add_parser('rate', help=bench_rate.__doc__)
+    rate.add_argument('pps', nargs='*', type=float, default=[50000, 100000, 250000, 500000])
+    rate.add_argument('--mode', default='ddos_volumetric')
+    rate.add_argument('--seconds', type=float, default=5.0)
+    rate.add_argument('--history', type=int, default=10000, help='packet ring capacity (max batch size)')
+    rate.add_argument('--tolerance', type=float, default=2.0, help='allowed error in percent')
+    rate.set_defaults(func=bench_rate)
+
+    latency = sub.add_parser('latency', help=bench_latency.__doc__)
+    latency.add_argument('pps', nargs='*', type=float, default=[1000, 50000, 200000])
+    latency.add_argument('--sources', nargs='+', default=['thread', 'process'], choices=['thread', 'process'])
+    latency.add_argument('--mode', default='ddos_volumetric')
+    latency.add_argument('--requests', type=int, default=200)
+    latency.add_argument('--interval', type=float, default=0.01, help='pause between requests (s)')
+    latency.add_argument('--history', type=int, default=10000)
+    latency.set_defaults(func=bench_latency)
+
+    recovery = sub.add_parser('recovery', help=bench_recovery.__doc__)
+    recovery.add_argument('--kills', type=int, default=2)
+    recovery.add_argument('--interval', type=float, default=0.25, help='continuous analysis cadence')
+    recovery.add_argument('--hangs', type=int, default=1, help='workers to freeze with SIGSTOP')
+    recovery.add_argument('--task-timeout', type=float, default=3.0, help='executor task_timeout for the hang test')
+    recovery.set_defaults(func=bench_recovery)
+
+    updates = sub.add_parser('updates', help=bench_updates.__doc__)
+    updates.add_argument('--configs', nargs='+', default=['legacy', 'persistent'], choices=['legacy', 'persistent'])
+    updates.add_argument('--clients', type=int, default=4)
+    updates.add_argument('--seconds', type=float, default=5.0)
+    updates.set_defaults(func=bench_updates)
+
+    writes = sub.add_parser('writes', help=bench_writes.__doc__)
+    writes.add_argument('--rows', type=int, default=5000)
+    writes.add_argument('--batch', type=int, default=500)
+    writes.add_argument('--delay-ms', type=float, default=50)
+    writes.add_argument('--synchronous', default='FULL', choices=['OFF', 'NORMAL', 'FULL'])
+    writes.set_defaults(func=bench_writes)
+
+    history = sub.add_parser('history', help=bench_history.__doc__)
+    history.add_argument('--days', type=float, default=14)
+    history.add_argument('--rows-per-day', type=int, default=20000)
+    history.add_argument('--keep-days', type=float, default=2)
+    history.add_argument('--requests', type=int, default=50)
+    history.set_defaults(func=bench_history)
+
+    args = parser.parse_args()
+    # Checks return their failure count, which becomes the exit status
+    sys.exit(args.func(args) or 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# cardinality_sketch.py - Mergeable HyperLogLog distinct counters
+import math
+import numpy as np
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+
+def hash64(values):
+    """SplitMix64 finalizer over an integer array (uint64 arithmetic wraps)"""
+    z = np.asarray(values).astype(np.uint64) + _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * _MIX1
+    z = (z ^ (z >> np.uint64(27))) * _MIX2
+    return z ^ (z >> np.uint64(31))
+
+
+def _bit_length(x):
+    """Exact bit length of every uint64 in ``x``"""
+    length = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= np.uint64(1 << shift)
+        length += high * shift
+        x = np.where(high, x >> np.uint64(shift), x)
+    return length + (x > 0)
+
+
+def precision_for(error_rate):
+    """Register-index bits p so that 1.04 / sqrt(2^p) <= error_rate"""
+    return min(max(math.ceil(math.log2((1.04 / error_rate) ** 2)), 4), 18)
+
+
+def _registers_for(values, precision):
+    """(register index, rank) of every value's hash"""
+    hashed = hash64(values)
+    index = (hashed >> np.uint64(64 - precision)).astype(np.intp)
+    remainder = hashed & np.uint64((1 << (64 - precision)) - 1)
+    return index, (64 - precision) - _bit_length(remainder) + 1
+
+
+def _estimate(registers):
+    """Raw HLL estimate with linear counting for the small range"""
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.ldexp(1.0, -registers.astype(np.int64)), axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    small = (estimate <= 2.5 * m) & (zeros > 0)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    return np.where(small, linear, estimate)
+
+
+class HyperLogLog:
+    """Distinct-count sketch with a fixed ``2^p``-byte footprint.
+
+    ``error_rate`` is the target relative standard error (1.04 / sqrt(m)).
+    Sketches with the same precision merge losslessly by register-wise max,
+    so per-thread or per-interval sketches can be combined afterwards.
+    """
+
+    def __init__(self, error_rate=0.01, precision=None):
+        self.precision = precision or precision_for(error_rate)
+        self.m = 1 << self.precision
+        self.registers = np.zeros(self.m, dtype=np.uint8)
+
+    @property
+    def standard_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, values):
+        """Add an array of integer keys (IPs as ints, ports, ...)"""
+        values = np.asarray(values)
+        if values.size:
+            index, rank = _registers_for(values.ravel(), self.precision)
+            np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge HyperLogLog p={other.precision} into p={self.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def __or__(self, other):
+        return self.copy().merge(other)
+
+    def copy(self):
+        clone = HyperLogLog(precision=self.precision)
+        clone.registers = self.registers.copy()
+        return clone
+
+    def count(self):
+        return float(_estimate(self.registers))
+
+    def __len__(self):
+        return int(round(self.count()))
+
+    def summary(self, z=2.0):
+        """Estimate with a +/- z standard-error band"""
+        estimate = self.count()
+        margin = z * self.standard_error * estimate
+        return {'estimate': int(round(estimate)), 'lower': int(max(estimate - margin, 0)),
+                'upper': int(math.ceil(estimate + margin)), 'relative_error': z * self.standard_error}
+
+    def clear(self):
+        self.registers[:] = 0
+
+
+class SlidingHyperLogLog:
+    """Ring of HyperLogLog segments for distinct counts over a sliding range.
+
+    Segment ``k`` holds the keys added with segment index ``k`` (a time bucket
+    or a block of packet sequence numbers); like the traffic counter rings,
+    each slot remembers its index and is recycled lazily. ``count(first, last)``
+    merges the live segments in that range.
+    """
+
+    def __init__(self, n_segments, error_rate=0.01, precision=None):
+        self.precision = precision or precision_for(error_rate)
+        self.m = 1 << self.precision
+        self.n_segments = int(n_segments)
+        self.segment_ids = np.full(self.n_segments, -1, dtype=np.int64)
+        self.registers = np.zeros((self.n_segments, self.m), dtype=np.uint8)
+
+    @property
+    def standard_error(self):
+        return 1.04 / math.sqrt(self.m)
+
+    def add(self, values, segments):
+        """Add keys with their segment indices (an array, or one index for all)"""
+        values = np.asarray(values).ravel()
+        if not values.size:
+            return
+        segments = np.broadcast_to(np.asarray(segments, dtype=np.int64), values.shape)
+        newest = segments.max()
+        keep = segments > newest - self.n_segments
+        values, segments = values[keep], segments[keep]
+        for segment in np.unique(segments).tolist():
+            slot = segment % self.n_segments
+            if self.segment_ids[slot] > segment:
+                continue  # Slot already recycled for a newer segment
+            if self.segment_ids[slot] != segment:
+                self.segment_ids[slot] = segment
+                self.registers[slot] = 0
+            index, rank = _registers_for(values[segments == segment], self.precision)
+            np.maximum.at(self.registers[slot], index, rank.astype(np.uint8))
+
+    def merged(self, first, last):
+        """HyperLogLog of every live segment with index in [first, last]"""
+        sketch = HyperLogLog(precision=self.precision)
+        live = (self.segment_ids >= first) & (self.segment_ids <= last)
+        if live.any():
+            sketch.registers = self.registers[live].max(axis=0)
+        return sketch
+
+    def count(self, first, last):
+        return self.merged(first, last).count()
+
+    def clear(self):
+        self.segment_ids[:] = -1
+        self.registers[:] = 0
@@ -0,0 +1,155 @@
+# db_retention.py - Background retention and compaction for the append-only tables
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta
+import numpy as np
+
+
+class RetentionCompactor:
+    """Deletes (or archives) rows older than ``retention_days`` in small batches, then reclaims pages.
+
+    Every ``interval`` seconds each table in ``tables`` is pruned
+    ``batch_size`` rows at a time, oldest first, using the timestamp index.
+    Each batch is its own short transaction, with ``batch_pause`` seconds
+    between batches so the group-commit writer is never locked out for
+    long. With ``archive_path`` set, rows are copied into the same table in
+    that database before they are deleted. Each pass ends with
+    ``PRAGMA incremental_vacuum``, returning up to ``vacuum_pages`` free
+    pages to the filesystem (needs auto_vacuum=INCREMENTAL, see
+    db_schema.enable_incremental_vacuum), so a large backlog of freed
+    space is handed back over several passes instead of one long lock.
+
+    Retention is off unless ``retention_days`` is set; the first pass logs
+    how many existing rows it is about to remove.
+    """
+
+    def __init__(self, db, retention_days=None, tables=('quantum_analysis', 'connection_log'), batch_size=500,
+                 interval=300.0, batch_pause=0.01, vacuum_pages=2048, archive_path=None):
+        self.db = db
+        self.retention_days = retention_days
+        self.tables = tuple(tables)
+        self.batch_size = int(batch_size)
+        self.interval = interval
+        self.batch_pause = batch_pause
+        self.vacuum_pages = int(vacuum_pages)
+        self.archive_path = archive_path
+        self.lock = threading.Lock()
+        self.counters = {'passes': 0, 'batches': 0, 'deleted': 0, 'archived': 0, 'vacuumed_pages': 0, 'errors': 0}
+        self.deleted_by_table = dict.fromkeys(self.tables, 0)
+        self.last_pass = None
+        self._batch_seconds = deque(maxlen=512)
+        self.active = False
+        self.thread = None
+        self._wake = threading.Event()
+
+    def start(self):
+        if self.active or not self.retention_days:
+            return
+        self.active = True
+        self.thread = threading.Thread(target=self._loop, name='db-retention', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=5.0):
+        self.active = False
+        self._wake.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def _loop(self):
+        while self.active:
+            try:
+                self.run_once()
+            except Exception as e:
+                with self.lock:
+                    self.counters['errors'] += 1
+                print(f"❌ Retention compaction error: {e}")
+            self._wake.wait(self.interval)
+
+    def cutoff(self, now=None):
+        """ISO timestamp before which rows are expired (timestamps are stored as isoformat text)"""
+        return ((now or datetime.now()) - timedelta(days=self.retention_days)).isoformat()
+
+    def run_once(self, now=None):
+        """One pruning pass over every table; returns {table: rows removed}"""
+        started = time.perf_counter()
+        cutoff = self.cutoff(now)
+        removed = {}
+        if not self.counters['passes']:
+            self._announce(cutoff)
+        if self.archive_path:
+            self._attach_archive()
+        try:
+            for table in self.tables:
+                removed[table] = self._prune(table, cutoff)
+        finally:
+            if self.archive_path:
+                with self.db.transaction() as cursor:
+                    cursor.execute("DETACH DATABASE archive")
+        vacuumed = self._incremental_vacuum()
+        with self.lock:
+            self.counters['passes'] += 1
+            self.counters['vacuumed_pages'] += vacuumed
+            self.last_pass = {'at': datetime.now().isoformat(), 'cutoff': cutoff, 'removed': removed,
+                              'vacuumed_pages': vacuumed, 'seconds': time.perf_counter() - started}
+        return removed
+
+    def _announce(self, cutoff):
+        """Log what the first pass will remove (mostly history from before retention was enabled)"""
+        with self.db.transaction() as cursor:
+            expired = {}
+            for table in self.tables:
+                cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE timestamp < ?", (cutoff,))
+                expired[table] = cursor.fetchone()[0]
+        action = f"archiving to {self.archive_path} and deleting" if self.archive_path else "deleting"
+        print(f"🧹 Retention {self.retention_days:g} days: {action} " +
+              ', '.join(f"{count:,} {table} rows" for table, count in expired.items()) + f" older than {cutoff}")
+
+    def _attach_archive(self):
+        with self.db.transaction() as cursor:
+            cursor.execute("ATTACH DATABASE ? AS archive", (self.archive_path,))
+            for table in self.tables:
+                cursor.execute(f"CREATE TABLE IF NOT EXISTS archive.{table} AS SELECT * FROM main.{table} WHERE 0")
+
+    def _prune(self, table, cutoff):
+        expired = f"SELECT id FROM main.{table} WHERE timestamp < ? ORDER BY timestamp LIMIT ?"
+        total = 0
+        while True:
+            started = time.perf_counter()
+            with self.db.transaction() as cursor:
+                if self.archive_path:
+                    cursor.execute(f"INSERT INTO archive.{table} SELECT * FROM main.{table} WHERE id IN ({expired})",
+                                   (cutoff, self.batch_size))
+                cursor.execute(f"DELETE FROM main.{table} WHERE id IN ({expired})", (cutoff, self.batch_size))
+                deleted = cursor.rowcount
+            with self.lock:
+                self._batch_seconds.append(time.perf_counter() - started)
+                if deleted:
+                    self.counters['batches'] += 1
+                    self.counters['deleted'] += deleted
+                    self.counters['archived'] += deleted if self.archive_path else 0
+                    self.deleted_by_table[table] += deleted
+            total += deleted
+            if deleted < self.batch_size or self._wake.is_set():
+                break
+            time.sleep(self.batch_pause)
+        return total
+
+    def _incremental_vacuum(self):
+        with self.db.transaction() as cursor:
+            cursor.execute("PRAGMA freelist_count")
+            before = cursor.fetchone()[0]
+            # The pragma frees one page per step and execute() only steps a row-less statement once
+            cursor.executescript(f"PRAGMA incremental_vacuum({self.vacuum_pages});")
+            cursor.execute("PRAGMA freelist_count")
+            return before - cursor.fetchone()[0]
+
+    def stats(self):
+        with self.lock:
+            batches = np.array(self._batch_seconds) * 1e3
+            stats = dict(self.counters, active=self.active, retention_days=self.retention_days,
+                         batch_size=self.batch_size, interval=self.interval, archive_path=self.archive_path,
+                         deleted_by_table=dict(self.deleted_by_table), last_pass=self.last_pass)
+        if len(batches):
+            stats['batch_ms_p50'], stats['batch_ms_p99'] = np.percentile(batches, [50, 99]).tolist()
+        return stats
@@ -0,0 +1,173 @@
+# db_schema.py - Versioned schema migrations for the monitor database
+from datetime import datetime
+
+
+def table_columns(cursor, table):
+    """Column names of ``table`` (empty if it does not exist)"""
+    cursor.execute(f"PRAGMA table_info({table})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def _create_core_tables(cursor):
+    """client_data, connection_log, quantum_analysis and client_state_snapshots, plus the 5 client rows"""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS client_data (
+            id INTEGER PRIMARY KEY,
+            random_value REAL,
+            timestamp TEXT,
+            client_timestamp TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS connection_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_type TEXT,
+            timestamp TEXT,
+            details TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS quantum_analysis (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            pattern_type TEXT,
+            quantum_score REAL,
+            classical_score REAL,
+            confidence REAL,
+            attack_detected BOOLEAN,
+            features TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS client_state_snapshots (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            state_data TEXT,
+            trigger_reason TEXT,
+            quantum_analysis TEXT
+        )
+    ''')
+    cursor.execute("SELECT COUNT(*) FROM client_data")
+    if cursor.fetchone()[0] == 0:
+        now = datetime.now().isoformat()
+        cursor.executemany(
+            "INSERT INTO client_data (id, random_value, timestamp, client_timestamp) VALUES (?, ?, ?, ?)",
+            [(i, 0.0, now, now) for i in range(1, 6)]
+        )
+
+
+def _add_snapshot_columns(cursor):
+    """Databases from the all-in-one demo have snapshots without trigger_reason/quantum_analysis"""
+    columns = table_columns(cursor, 'client_state_snapshots')
+    for column in ('trigger_reason', 'quantum_analysis'):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE client_state_snapshots ADD COLUMN {column} TEXT")
+
+
+def _add_timestamp_indexes(cursor):
+    """get_status and retention both walk these tables newest/oldest first by timestamp"""
+    for table in ('quantum_analysis', 'connection_log', 'client_state_snapshots'):
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_timestamp ON {table} (timestamp)")
+
+
+# granularity -> (table, length of the isoformat timestamp prefix that names the bucket)
+ROLLUPS = {
+    'minute': ('analysis_rollup_minute', 16),  # 2026-01-01T12:34
+    'hour': ('analysis_rollup_hour', 13),      # 2026-01-01T12
+}
+SCORES = ('quantum_score', 'classical_score', 'confidence')
+
+
+def _create_analysis_rollups(cursor):
+    """Per-minute/per-hour rollups of quantum_analysis kept current by an insert trigger, backfilled once"""
+    for granularity, (table, width) in ROLLUPS.items():
+        stats = ',\n'.join(f"{score}_min REAL, {score}_sum REAL, {score}_max REAL" for score in SCORES)
+        cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {table} (
+                bucket TEXT,
+                pattern_type TEXT,
+                count INTEGER,
+                attack_count INTEGER,
+                {stats},
+                PRIMARY KEY (bucket, pattern_type)
+            ) WITHOUT ROWID
+        ''')
+        aggregates = ', '.join(f"min({score}), sum({score}), max({score})" for score in SCORES)
+        cursor.execute(f'''
+            INSERT OR REPLACE INTO {table}
+            SELECT substr(timestamp, 1, {width}), pattern_type, count(*),
+                   sum(CASE WHEN attack_detected THEN 1 ELSE 0 END), {aggregates}
+            FROM quantum_analysis GROUP BY 1, 2
+        ''')
+        values = ', '.join(f"NEW.{score}, NEW.{score}, NEW.{score}" for score in SCORES)
+        updates = ',\n'.join(f"{score}_min = min({score}_min, excluded.{score}_min), "
+                              f"{score}_sum = {score}_sum + excluded.{score}_sum, "
+                              f"{score}_max = max({score}_max, excluded.{score}_max)" for score in SCORES)
+        # Same transaction as the insert, so rollups never disagree with the raw rows
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON quantum_analysis
+            BEGIN
+                INSERT INTO {table} VALUES (
+                    substr(NEW.timestamp, 1, {width}), NEW.pattern_type, 1,
+                    CASE WHEN NEW.attack_detected THEN 1 ELSE 0 END, {values}
+                )
+                ON CONFLICT (bucket, pattern_type) DO UPDATE SET
+                    count = count + 1,
+                    attack_count = attack_count + excluded.attack_count,
+                    {updates};
+            END
+        ''')
+
+
+# (version, description, apply(cursor)); append new steps, never edit applied ones
+MIGRATIONS = [
+    (1, 'core tables', _create_core_tables),
+    (2, 'snapshot trigger and analysis columns', _add_snapshot_columns),
+    (3, 'timestamp indexes', _add_timestamp_indexes),
+    (4, 'analysis rollups', _create_analysis_rollups),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def enable_incremental_vacuum(cursor):
+    """Switch to auto_vacuum=INCREMENTAL; returns True if the file had to be rebuilt.
+
+    New databases take the setting directly. Existing ones only pick it up
+    through a one-off VACUUM that rewrites the whole file and blocks every
+    writer meanwhile, so this must run outside a transaction and only when
+    retention is enabled.
+    """
+    cursor.execute("PRAGMA auto_vacuum")
+    if cursor.fetchone()[0] == 2:
+        return False
+    cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    cursor.execute("PRAGMA auto_vacuum")
+    if cursor.fetchone()[0] == 2:
+        return False
+    cursor.execute("PRAGMA page_count")
+    print(f"🔧 Migrating to auto_vacuum=INCREMENTAL: rebuilding {cursor.fetchone()[0]:,} pages with VACUUM")
+    cursor.execute("VACUUM")
+    return True
+
+
+def migrate(cursor):
+    """Bring the database up to SCHEMA_VERSION; returns (old_version, new_version).
+
+    The version lives in ``PRAGMA user_version``, so databases created
+    before migrations existed start at 0. Every step is idempotent against
+    those, e.g. tables that already exist are left alone. All pending steps
+    and the version bump run in one ``BEGIN IMMEDIATE`` transaction, so two
+    servers starting on the same file cannot both migrate it.
+    """
+    cursor.execute("BEGIN IMMEDIATE")
+    cursor.execute("PRAGMA user_version")
+    current = cursor.fetchone()[0]
+    if current > SCHEMA_VERSION:
+        raise RuntimeError(f"database schema v{current} is newer than this server (v{SCHEMA_VERSION})")
+    for version, description, apply in MIGRATIONS:
+        if version > current:
+            apply(cursor)
+            print(f"🔧 Schema migration v{version}: {description}")
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    return current, SCHEMA_VERSION
@@ -0,0 +1,150 @@
+# db_writer.py - Background group-commit writer for SQLite inserts
+import queue
+import threading
+import time
+from collections import deque
+from itertools import groupby
+import numpy as np
+
+
+class _Barrier:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class GroupCommitWriter:
+    """Writes queued statements on one background thread, many rows per transaction.
+
+    ``execute(sql, params)`` only enqueues. The writer thread takes the first
+    waiting row, keeps collecting until it has ``max_batch`` rows or
+    ``max_delay_ms`` has passed, and commits the lot in one transaction
+    (consecutive rows with the same SQL go through ``executemany``). One
+    fsync then covers the whole batch instead of one per row.
+
+    The queue holds at most ``max_queue`` rows; when it is full ``execute``
+    waits up to ``put_timeout`` seconds and then drops the row (counted in
+    ``dropped``). If a batch fails it is retried row by row so one bad row
+    does not lose the others. ``flush()`` returns once everything enqueued
+    before it is committed.
+    """
+
+    def __init__(self, db, max_batch=500, max_delay_ms=50, max_queue=10000, put_timeout=1.0):
+        self.db = db
+        self.max_batch = int(max_batch)
+        self.max_delay = max_delay_ms / 1000.0
+        self.put_timeout = put_timeout
+        self.queue = queue.Queue(maxsize=int(max_queue))
+        self.lock = threading.Lock()
+        self.counters = {'enqueued': 0, 'written': 0, 'batches': 0, 'dropped': 0, 'failed_rows': 0,
+                         'max_queue_depth': 0, 'max_batch_size': 0}
+        self._commit_seconds = deque(maxlen=512)
+        self._batch_sizes = deque(maxlen=512)
+        self.active = True
+        self.thread = threading.Thread(target=self._run, name='db-group-commit', daemon=True)
+        self.thread.start()
+
+    def execute(self, sql, params=()):
+        """Queue one statement; returns False if it was dropped because the queue stayed full"""
+        if not self.active:
+            return False
+        try:
+            self.queue.put((sql, params), timeout=self.put_timeout)
+        except queue.Full:
+            with self.lock:
+                self.counters['dropped'] += 1
+            return False
+        with self.lock:
+            self.counters['enqueued'] += 1
+            depth = self.queue.qsize()
+            if depth > self.counters['max_queue_depth']:
+                self.counters['max_queue_depth'] = depth
+        return True
+
+    def flush(self, timeout=None):
+        """Block until every row queued before this call is committed; False on timeout"""
+        if not self.thread.is_alive():
+            return self.queue.empty()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        barrier = _Barrier()
+        try:
+            # The queue may be full (back-pressure), so queueing the barrier counts against the timeout too
+            self.queue.put(barrier, timeout=timeout)
+        except queue.Full:
+            return False
+        remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+        return barrier.done.wait(remaining)
+
+    def _collect(self):
+        """Next batch: (rows, barriers) after waiting for the first item"""
+        try:
+            first = self.queue.get(timeout=0.1)
+        except queue.Empty:
+            return [], []
+        rows, barriers = [], []
+        deadline = time.monotonic() + self.max_delay
+        item = first
+        while True:
+            if isinstance(item, _Barrier):
+                barriers.append(item)
+                break  # Commit now so the barrier's waiter is released promptly
+            rows.append(item)
+            if len(rows) >= self.max_batch:
+                break
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+        return rows, barriers
+
+    def _run(self):
+        while self.active or not self.queue.empty():
+            rows, barriers = self._collect()
+            if rows:
+                self._write(rows)
+            for barrier in barriers:
+                barrier.done.set()
+
+    def _write(self, rows):
+        started = time.perf_counter()
+        try:
+            with self.db.transaction() as cursor:
+                for sql, group in groupby(rows, key=lambda row: row[0]):
+                    cursor.executemany(sql, [params for _, params in group])
+            failed = 0
+        except Exception as e:
+            print(f"❌ Group commit error ({len(rows)} rows, retrying one by one): {e}")
+            failed = 0
+            for sql, params in rows:
+                try:
+                    with self.db.transaction() as cursor:
+                        cursor.execute(sql, params)
+                except Exception as row_error:
+                    failed += 1
+                    print(f"❌ Dropped row: {row_error}")
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.counters['batches'] += 1
+            self.counters['written'] += len(rows) - failed
+            self.counters['failed_rows'] += failed
+            self.counters['max_batch_size'] = max(self.counters['max_batch_size'], len(rows))
+            self._commit_seconds.append(elapsed)
+            self._batch_sizes.append(len(rows))
+
+    def stats(self):
+        with self.lock:
+            stats = dict(self.counters, queue_depth=self.queue.qsize(), max_batch=self.max_batch,
+                         max_delay_ms=self.max_delay * 1000)
+            commits = np.array(self._commit_seconds) * 1e3
+            sizes = np.array(self._batch_sizes)
+        if len(commits):
+            stats['mean_batch_size'] = float(sizes.mean())
+            stats['commit_ms_p50'], stats['commit_ms_p99'] = np.percentile(commits, [50, 99]).tolist()
+        return stats
+
+    def close(self, timeout=5.0):
+        """Commit everything still queued and stop the writer thread, within ``timeout`` seconds overall"""
+        deadline = time.monotonic() + timeout
+        self.flush(timeout)
+        self.active = False
+        self.thread.join(max(deadline - time.monotonic(), 0))
@@ -0,0 +1,186 @@
+# event_trace.py - Leveled, sampled event tracing for analyzer, server and client
+import os
+import json
+import time
+import queue
+import atexit
+import itertools
+import threading
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+_LEVELS_BY_NAME = {name: level for level, name in LEVEL_NAMES.items()}
+
+
+def _json_default(value):
+    """Serialize numpy scalars/arrays and anything else JSON does not know"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class JsonLinesSink:
+    """Appends events to a JSON-lines file from a background writer thread"""
+
+    def __init__(self, path, max_queue=10000):
+        self.path = path
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        try:
+            f = open(self.path, 'a', encoding='utf-8')
+        except OSError as e:
+            print(f"❌ Trace file error ({self.path}): {e} - trace events will be dropped")
+            f = None
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    break
+                if f is None:
+                    self.dropped += 1
+                    continue
+                f.write(json.dumps(record, default=_json_default) + '\n')
+                # Flush once the backlog is drained, not per event
+                if self.queue.empty():
+                    f.flush()
+            except (OSError, ValueError) as e:
+                self.dropped += 1
+                if self.dropped == 1:
+                    print(f"❌ Trace write error ({self.path}): {e}")
+            finally:
+                # Always, so flush() never waits on a record the writer gave up on
+                self.queue.task_done()
+        if f is not None:
+            try:
+                f.close()
+            except OSError:
+                pass
+
+    def flush(self, timeout=5.0):
+        """Wait until queued events are written; False on timeout or if the writer thread is gone"""
+        deadline = time.monotonic() + timeout
+        with self.queue.all_tasks_done:
+            while self.queue.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.thread.is_alive():
+                    return False
+                self.queue.all_tasks_done.wait(min(remaining, 0.1))
+        return True
+
+    def close(self, timeout=5.0):
+        if self.thread.is_alive():
+            try:
+                self.queue.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+        self.thread.join(timeout=timeout)
+
+
+class Tracer:
+    """Per-component event emitter.
+
+    Messages are ``str.format`` templates; nothing is formatted or allocated
+    when the level is disabled, and ``tracer.debug_enabled`` lets callers skip
+    computing expensive arguments altogether. ``sample=N`` keeps 1 in N events
+    of that name (the configured debug sampling applies to all debug events).
+    """
+
+    def __init__(self, component):
+        self.component = component
+        self._counters = {}
+        self._refresh()
+
+    def _refresh(self):
+        self.level = _config['level']
+        self.debug_enabled = self.level <= DEBUG
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def debug(self, event, message, *args, sample=None, **fields):
+        if self.debug_enabled:
+            self._emit(DEBUG, event, message, args, fields, sample or _config['debug_sample'])
+
+    def info(self, event, message, *args, sample=None, **fields):
+        if INFO >= self.level:
+            self._emit(INFO, event, message, args, fields, sample)
+
+    def warning(self, event, message, *args, sample=None, **fields):
+        if WARNING >= self.level:
+            self._emit(WARNING, event, message, args, fields, sample)
+
+    def error(self, event, message, *args, sample=None, **fields):
+        if ERROR >= self.level:
+            self._emit(ERROR, event, message, args, fields, sample)
+
+    def _emit(self, level, event, message, args, fields, sample):
+        if sample and sample > 1:
+            counter = self._counters.get(event)
+            if counter is None:
+                counter = self._counters[event] = itertools.count()
+            if next(counter) % sample:
+                return
+        text = message.format(*args) if args else message
+        if _config['console']:
+            print(text)
+        sink = _config['sink']
+        if sink is not None:
+            record = {'ts': time.time(), 'level': LEVEL_NAMES[level], 'component': self.component,
+                      'event': event, 'message': text}
+            record.update(fields)
+            sink.emit(record)
+
+
+_config = {
+    'level': _LEVELS_BY_NAME.get(os.environ.get('QML_TRACE_LEVEL', 'INFO').upper(), INFO),
+    'debug_sample': max(int(os.environ.get('QML_TRACE_SAMPLE', '1')), 1),
+    'console': os.environ.get('QML_TRACE_CONSOLE', '1') != '0',
+    'sink': None,
+}
+_tracers = {}
+_lock = threading.Lock()
+
+
+def get_tracer(component):
+    with _lock:
+        tracer = _tracers.get(component)
+        if tracer is None:
+            tracer = _tracers[component] = Tracer(component)
+        return tracer
+
+
+def configure(level=None, jsonl_path=None, debug_sample=None, console=None):
+    """Reconfigure every tracer; ``level`` accepts a name ('DEBUG') or a number"""
+    with _lock:
+        if level is not None:
+            _config['level'] = _LEVELS_BY_NAME[level.upper()] if isinstance(level, str) else int(level)
+        if debug_sample is not None:
+            _config['debug_sample'] = max(int(debug_sample), 1)
+        if console is not None:
+            _config['console'] = bool(console)
+        if jsonl_path is not None:
+            if _config['sink'] is not None:
+                _config['sink'].close()
+            _config['sink'] = JsonLinesSink(jsonl_path) if jsonl_path else None
+        for tracer in _tracers.values():
+            tracer._refresh()
+
+
+def flush():
+    if _config['sink'] is not None:
+        _config['sink'].flush()
+
+
+if os.environ.get('QML_TRACE_FILE'):
+    configure(jsonl_path=os.environ['QML_TRACE_FILE'])
+atexit.register(flush)
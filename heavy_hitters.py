@@ -0,0 +1,239 @@
+# heavy_hitters.py - Bounded-memory top-K sources, destinations and ports
+import threading
+import time
+import numpy as np
+from cardinality_sketch import hash64
+from packet_store import int_to_ip
+
+METRICS = ('packets', 'bytes')
+
+
+def _pair_key(block):
+    return (block['src_ip'].astype(np.uint64) << np.uint64(32)) | \
+        block['dst_port'].astype(np.uint32).astype(np.uint64)
+
+
+def _format_pair(key):
+    return f"{int_to_ip(key >> 32)}:{key & 0xFFFFFFFF}"
+
+
+# name -> (key column(s) -> uint64 keys, key -> display label)
+DIMENSIONS = {
+    'src_ip': (lambda block: block['src_ip'].astype(np.uint64), int_to_ip),
+    'dst_ip': (lambda block: block['dst_ip'].astype(np.uint64), int_to_ip),
+    'dst_port': (lambda block: block['dst_port'].astype(np.uint64), int),
+    'src_dst_port': (_pair_key, _format_pair),
+}
+
+
+class CountMinSketch:
+    """``depth`` x ``width`` counters per metric; estimates never undercount.
+
+    All row indices come from one 64-bit hash (16 bits per row), so ``width``
+    is at most 65536 and ``depth`` at most 4.
+    """
+
+    def __init__(self, width=2048, depth=4, n_metrics=2):
+        if width > 1 << 16 or depth > 4:
+            raise ValueError("CountMinSketch supports width <= 65536 and depth <= 4")
+        self.width = int(width)
+        self.depth = int(depth)
+        self.table = np.zeros((self.depth, self.width, n_metrics), dtype=np.int64)
+
+    def _columns(self, keys):
+        hashed = hash64(keys)
+        return [((hashed >> np.uint64(16 * row)) & np.uint64(0xFFFF)).astype(np.intp) % self.width
+                for row in range(self.depth)]
+
+    def add(self, keys, weights):
+        """Add a (n_keys, n_metrics) weight matrix"""
+        for row, columns in enumerate(self._columns(keys)):
+            np.add.at(self.table[row], columns, weights)
+
+    def estimate(self, keys, table=None):
+        """(n_keys, n_metrics) upper-bound counts; ``table`` may be a sum of compatible tables"""
+        table = self.table if table is None else table
+        return np.min([table[row][columns] for row, columns in enumerate(self._columns(keys))], axis=0)
+
+    def clear(self):
+        self.table[:] = 0
+
+
+class SpaceSaving:
+    """Space-Saving summary of the ``capacity`` heaviest keys.
+
+    Batches are merged as exact summaries (Agarwal et al. mergeable
+    summaries): a key the summary does not monitor may have been evicted
+    with up to ``floor`` (the minimum monitored count) occurrences, so it
+    enters with that much count and error. ``count - error`` is a guaranteed
+    lower bound and ``count`` an upper bound.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = int(capacity)
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.errors = np.zeros(0, dtype=np.int64)
+
+    @property
+    def floor(self):
+        return int(self.counts.min()) if len(self.keys) >= self.capacity else 0
+
+    def update(self, keys, weights):
+        """Add aggregated (unique ``keys``, ``weights``) for one batch"""
+        SpaceSaving.merge_into(self, [self, _exact(keys, weights)])
+
+    @staticmethod
+    def merge_into(target, summaries):
+        keys = np.concatenate([s.keys for s in summaries])
+        if not len(keys):
+            return target
+        floors = np.array([s.floor for s in summaries], dtype=np.int64)
+        source = np.repeat(np.arange(len(summaries)), [len(s.keys) for s in summaries])
+        unique, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, np.concatenate([s.counts for s in summaries]), len(unique))
+        errors = np.bincount(inverse, np.concatenate([s.errors for s in summaries]), len(unique))
+        # Summaries that do not monitor a key may still have seen up to their floor of it
+        missing = floors.sum() - np.bincount(inverse, floors[source], len(unique))
+        counts += missing
+        errors += missing
+
+        if len(unique) > target.capacity:
+            keep = np.argpartition(-counts, target.capacity - 1)[:target.capacity]
+            unique, counts, errors = unique[keep], counts[keep], errors[keep]
+        target.keys = unique
+        target.counts = counts.astype(np.int64)
+        target.errors = errors.astype(np.int64)
+        return target
+
+    def clear(self):
+        self.__init__(self.capacity)
+
+
+def _exact(keys, weights):
+    """Exact batch summary (no floor: it monitors every key it saw)"""
+    summary = SpaceSaving(len(keys) + 1)
+    summary.keys, summary.counts, summary.errors = keys, weights, np.zeros(len(keys), dtype=np.int64)
+    return summary
+
+
+class _Slice:
+    def __init__(self, capacity, cms_width, cms_depth):
+        self.epoch = -1
+        self.summaries = {(dim, metric): SpaceSaving(capacity) for dim in DIMENSIONS for metric in METRICS}
+        self.sketches = {dim: CountMinSketch(cms_width, cms_depth, len(METRICS)) for dim in DIMENSIONS}
+
+    def reset(self, epoch):
+        self.epoch = epoch
+        for summary in self.summaries.values():
+            summary.clear()
+        for sketch in self.sketches.values():
+            sketch.clear()
+
+
+class HeavyHitterTracker:
+    """Top-K src IPs, dst IPs, dst ports and (src, dst_port) pairs by packets and bytes.
+
+    Traffic is split into ``n_slices`` time slices of ``slice_seconds``; each
+    slice keeps a Space-Saving summary per dimension and metric plus a
+    Count-Min sketch per dimension, recycled lazily by epoch like the traffic
+    counter buckets. A window query merges the live slices' summaries and
+    clamps every count by the summed Count-Min estimate. Syncs from the
+    packet ring buffer like SlidingWindowAggregator; new packets are staged
+    and folded in blocks of ``batch_size`` (or on the next query) so the
+    per-call overhead is amortized at flood rates. Only the thread that
+    writes the store may call ``sync()``; queries never touch the store.
+    """
+
+    COLUMNS = ('timestamp', 'size', 'src_ip', 'dst_ip', 'dst_port')
+
+    def __init__(self, store, k=10, capacity=None, slice_seconds=1.0, n_slices=60,
+                 cms_width=2048, cms_depth=4, batch_size=4096):
+        self.store = store
+        self.k = int(k)
+        self.capacity = int(capacity or 8 * self.k)
+        self.slice_seconds = float(slice_seconds)
+        self.slices = [_Slice(self.capacity, cms_width, cms_depth) for _ in range(int(n_slices))]
+        self.batch_size = int(batch_size)
+        self.lock = threading.Lock()
+        self.position = store.total
+        self.missed = 0
+        self._pending = []
+        self._pending_count = 0
+
+    def sync(self):
+        with self.lock:
+            total = self.store.total
+            if total == self.position:
+                return
+            start = max(self.position, total - len(self.store))
+            self.missed += start - self.position
+            block = self.store.span(start, total)
+            self.position = total
+            self._pending.append({name: block[name].copy() for name in self.COLUMNS})
+            self._pending_count += total - start
+            if self._pending_count >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        block = {name: np.concatenate([part[name] for part in self._pending]) for name in self.COLUMNS}
+        self._pending = []
+        self._pending_count = 0
+        self._add(block)
+
+    def _add(self, block):
+        epochs = np.floor(block['timestamp'] / self.slice_seconds).astype(np.int64)
+        sizes = block['size']
+        n_slices = len(self.slices)
+        for epoch in np.unique(epochs).tolist():
+            current = self.slices[epoch % n_slices]
+            if current.epoch > epoch:
+                continue  # Older than the window the ring still holds
+            if current.epoch != epoch:
+                current.reset(epoch)
+            rows = epochs == epoch
+            part = {name: block[name][rows] for name in ('src_ip', 'dst_ip', 'dst_port')}
+            part_sizes = sizes[rows]
+            for dim, (key_of, _) in DIMENSIONS.items():
+                keys, inverse = np.unique(key_of(part), return_inverse=True)
+                weights = np.stack([np.bincount(inverse, minlength=len(keys)),
+                                    np.bincount(inverse, part_sizes, len(keys)).astype(np.int64)], axis=1)
+                current.sketches[dim].add(keys, weights)
+                for column, metric in enumerate(METRICS):
+                    current.summaries[(dim, metric)].update(keys, weights[:, column])
+
+    def top(self, dimension, metric='packets', seconds=10.0, n=None, now=None):
+        """Heaviest keys over the last ``seconds`` before ``now`` (default: the current time):
+        [{key, count, lower_bound}, ...], heaviest first"""
+        if dimension not in DIMENSIONS or metric not in METRICS:
+            raise KeyError(f"{dimension}/{metric}")
+        n = self.k if n is None else n
+        now = time.time() if now is None else now
+        column = METRICS.index(metric)
+        now_epoch = int(np.floor(now / self.slice_seconds))
+        first_epoch = now_epoch - min(max(int(np.ceil(seconds / self.slice_seconds)), 1), len(self.slices)) + 1
+        with self.lock:
+            self._flush()
+            live = [s for s in self.slices if first_epoch <= s.epoch <= now_epoch]
+            if not live:
+                return []
+            merged = SpaceSaving.merge_into(SpaceSaving(self.capacity),
+                                            [s.summaries[(dimension, metric)] for s in live])
+            sketch = live[0].sketches[dimension]
+            table = np.sum([s.sketches[dimension].table for s in live], axis=0)
+            cms = sketch.estimate(merged.keys, table)[:, column] if len(merged.keys) else merged.counts
+
+        counts = np.minimum(merged.counts, cms)
+        lower = np.maximum(merged.counts - merged.errors, 0)
+        order = np.lexsort((-lower, -counts))[:n]
+        label = DIMENSIONS[dimension][1]
+        return [{'key': label(int(merged.keys[i])), 'count': int(counts[i]), 'lower_bound': int(lower[i])}
+                for i in order]
+
+    def report(self, seconds=10.0, n=None, now=None):
+        """Top-K for every dimension and metric"""
+        now = time.time() if now is None else now
+        return {dim: {metric: self.top(dim, metric, seconds, n, now) for metric in METRICS}
+                for dim in DIMENSIONS}
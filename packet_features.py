@@ -0,0 +1,267 @@
+# packet_features.py - Vectorized feature kernel over packet windows
+import threading
+import numpy as np
+from packet_store import PacketWindow
+from cardinality_sketch import SlidingHyperLogLog
+
+N_FEATURES = 12
+
+
+def as_packet_window(packets):
+    """Accept either a PacketWindow or a list of packet dicts"""
+    if isinstance(packets, PacketWindow):
+        return packets
+    return PacketWindow.from_packets(list(packets))
+
+
+def compute_window_metrics(window):
+    """Compute every feature and rule-engine ratio in one pass over the columns.
+
+    Arithmetic mirrors the original list-based code step for step, so the
+    resulting feature vector is bit-for-bit identical on the same window.
+    """
+    n = len(window)
+    if n == 0:
+        return None
+
+    store = window.store
+    timestamps = window['timestamp']
+    sizes = window['size']
+    dst_ports = window['dst_port']
+
+    time_span = (timestamps.max() - timestamps.min()) + 0.1
+
+    protocol_counts = np.bincount(window['protocol'], minlength=len(store.protocols.values))
+    tcp_count = int(protocol_counts[store.protocols.codes['TCP']])
+    udp_count = int(protocol_counts[store.protocols.codes['UDP']])
+    icmp_count = int(protocol_counts[store.protocols.codes['ICMP']])
+
+    _, port_counts = np.unique(dst_ports, return_counts=True)
+    unique_ips = np.unique(window['src_ip']).size
+
+    syn_count = int(np.count_nonzero(window['flags'] == store.flags.codes['SYN']))
+    outbound_count = int(np.count_nonzero(window['direction'] == store.directions.codes['outbound']))
+    large_count = int(np.count_nonzero(sizes > 1000))
+    attack_indicators = int(np.count_nonzero(
+        window['attack_signature'] != store.signatures.codes['normal_business']))
+
+    return {
+        'packet_count': n,
+        'time_span': time_span,
+        'packet_rate_raw': n / time_span,
+        'avg_size': np.mean(sizes),
+        'size_variance_raw': np.var(sizes),
+        'avg_entropy': np.mean(window['payload_entropy']),
+        'ip_diversity': unique_ips / n,
+        'port_diversity': port_counts.size / n,
+        'tcp_ratio': tcp_count / n,
+        'udp_ratio': udp_count / n,
+        'icmp_ratio': icmp_count / n,
+        'protocol_ratio': tcp_count / (tcp_count + udp_count + 1),
+        'syn_ratio': syn_count / n,
+        'large_packet_ratio': large_count / n,
+        'outbound_ratio': outbound_count / n,
+        'same_dst_ratio': int(port_counts.max()) / n,
+        'dst_port_53_ratio': int(np.count_nonzero(dst_ports == 53)) / n,
+        'attack_signature_score': attack_indicators / n
+    }
+
+
+def metrics_to_features(metrics):
+    """Project window metrics onto the 12-feature vector used by the models"""
+    if metrics is None or metrics['packet_count'] < 5:
+        return [0.0] * N_FEATURES
+
+    return [
+        (metrics['packet_count'] / metrics['time_span']) / 100.0,
+        metrics['avg_size'] / 1500.0,
+        metrics['ip_diversity'],
+        metrics['port_diversity'],
+        metrics['protocol_ratio'],
+        metrics['avg_entropy'],
+        metrics['size_variance_raw'] / 100000.0,
+        metrics['syn_ratio'],
+        metrics['large_packet_ratio'],
+        metrics['outbound_ratio'],
+        metrics['same_dst_ratio'],
+        metrics['attack_signature_score']
+    ]
+
+
+class SlidingWindowAggregator:
+    """Running aggregates over the newest ``window_size`` packets of a ring buffer.
+
+    ``sync()`` folds packets that entered the window in and retracts the ones
+    that left it, so the cost is proportional to the packets that arrived since
+    the last call and ``metrics()`` is O(1) regardless of the window length.
+    Values match ``compute_window_metrics`` up to float rounding.
+
+    Windows of at least ``sketch_threshold`` packets track distinct source IPs
+    in a segmented HyperLogLog instead of an exact per-IP dict, so memory
+    stays fixed when sources are random; ``ip_diversity`` is then an estimate
+    over the window rounded out to whole segments.
+    """
+
+    RESYNC_EVERY = 8  # Recompute the float entropy sum every N windows to cap drift
+    SKETCH_SEGMENTS = 16  # Segments per window in sketch mode
+
+    def __init__(self, store, window_size=50, sketch_threshold=4096, sketch_error=0.01):
+        self.store = store
+        self.window_size = int(window_size)
+        self.sketch_threshold = sketch_threshold
+        self.sketch_error = sketch_error
+        self.lock = threading.Lock()
+        self.rebuild()
+
+    def _reset_counters(self):
+        self.count = 0
+        self.size_sum = 0
+        self.size_sq_sum = 0
+        self.entropy_sum = 0.0
+        self.syn_count = 0
+        self.outbound_count = 0
+        self.large_count = 0
+        self.attack_count = 0
+        self.protocol_counts = np.zeros(256, dtype=np.int64)
+        self.ip_counts = {}
+        self.port_counts = {}
+        self.port_count_freq = {}  # multiplicity -> number of ports with it
+        self.max_port_count = 0
+        self.retracted_since_resync = 0
+        self.ip_sketch = None
+        if self.window_size >= self.sketch_threshold:
+            self.segment_size = max(self.window_size // self.SKETCH_SEGMENTS, 1)
+            self.ip_sketch = SlidingHyperLogLog(self.window_size // self.segment_size + 2, self.sketch_error)
+
+    def rebuild(self):
+        """Recompute every aggregate from the packets currently in the window"""
+        with self.lock:
+            self._rebuild()
+
+    def _rebuild(self):
+        self._reset_counters()
+        self.position = self.store.total
+        start = self.position - min(self.window_size, len(self.store))
+        self.sketch_floor = start  # Oldest sequence number the IP sketch has seen
+        if start < self.position:
+            self._apply(self.store.span(start, self.position), 1, start)
+
+    def resize(self, window_size):
+        self.window_size = int(window_size)
+        self.rebuild()
+
+    def sync(self):
+        """Fold in every packet appended to the store since the last call"""
+        with self.lock:
+            total = self.store.total
+            if total == self.position:
+                return
+            old_start = max(self.position - self.window_size, 0)
+            new_start = max(total - self.window_size, 0)
+            if old_start < total - self.store.capacity or new_start > self.position:
+                # Fell too far behind (or the window turned over completely)
+                self._rebuild()
+                return
+
+            self._apply(self.store.span(self.position, total), 1, self.position)
+            if new_start > old_start:
+                self._apply(self.store.span(old_start, new_start), -1, old_start)
+                self.retracted_since_resync += new_start - old_start
+            self.position = total
+
+            if self.retracted_since_resync >= self.RESYNC_EVERY * self.window_size:
+                self.entropy_sum = float(np.sum(self.store.span(new_start, total)['payload_entropy']))
+                self.retracted_since_resync = 0
+
+    def _apply(self, block, sign, start):
+        """Add (sign=1) or retract (sign=-1) the block of packets starting at sequence ``start``"""
+        store = self.store
+        sizes = block['size']
+        self.count += sign * len(block)
+        self.size_sum += sign * int(sizes.sum())
+        self.size_sq_sum += sign * int(np.dot(sizes, sizes))
+        self.entropy_sum += sign * float(block['payload_entropy'].sum())
+        self.syn_count += sign * int(np.count_nonzero(block['flags'] == store.flags.codes['SYN']))
+        self.outbound_count += sign * int(np.count_nonzero(
+            block['direction'] == store.directions.codes['outbound']))
+        self.large_count += sign * int(np.count_nonzero(sizes > 1000))
+        self.attack_count += sign * int(np.count_nonzero(
+            block['attack_signature'] != store.signatures.codes['normal_business']))
+        self.protocol_counts += sign * np.bincount(block['protocol'], minlength=256)
+
+        if self.ip_sketch is not None:
+            # Departing packets expire with their segment; nothing to retract
+            if sign > 0:
+                segments = (start + np.arange(len(block))) // self.segment_size
+                self.ip_sketch.add(block['src_ip'], segments)
+        else:
+            ips, ip_counts = np.unique(block['src_ip'], return_counts=True)
+            for ip, k in zip(ips.tolist(), ip_counts.tolist()):
+                remaining = self.ip_counts.get(ip, 0) + sign * k
+                if remaining:
+                    self.ip_counts[ip] = remaining
+                else:
+                    del self.ip_counts[ip]
+
+        ports, port_counts = np.unique(block['dst_port'], return_counts=True)
+        freq = self.port_count_freq
+        for port, k in zip(ports.tolist(), port_counts.tolist()):
+            old = self.port_counts.get(port, 0)
+            new = old + sign * k
+            if old:
+                freq[old] -= 1
+                if not freq[old]:
+                    del freq[old]
+            if new:
+                self.port_counts[port] = new
+                freq[new] = freq.get(new, 0) + 1
+                if new > self.max_port_count:
+                    self.max_port_count = new
+            else:
+                del self.port_counts[port]
+        # Each retracted packet lowers the mode by at most one, so this walk is amortized O(1)
+        while self.max_port_count and self.max_port_count not in freq:
+            self.max_port_count -= 1
+
+    def metrics(self):
+        """Window metrics in the same shape as compute_window_metrics"""
+        with self.lock:
+            n = self.count
+            if n == 0:
+                return None
+            store = self.store
+            timestamps = store.span(self.position - n, self.position)['timestamp']
+            time_span = (float(timestamps[-1]) - float(timestamps[0])) + 0.1
+            tcp_count = int(self.protocol_counts[store.protocols.codes['TCP']])
+            udp_count = int(self.protocol_counts[store.protocols.codes['UDP']])
+            icmp_count = int(self.protocol_counts[store.protocols.codes['ICMP']])
+            if self.ip_sketch is not None:
+                first = (self.position - n) // self.segment_size
+                covered = self.position - max(first * self.segment_size, self.sketch_floor)
+                ip_diversity = min(self.ip_sketch.count(first, (self.position - 1) // self.segment_size) / covered, 1.0)
+            else:
+                ip_diversity = len(self.ip_counts) / n
+
+            return {
+                'packet_count': n,
+                'time_span': time_span,
+                'packet_rate_raw': n / time_span,
+                'avg_size': self.size_sum / n,
+                'size_variance_raw': (n * self.size_sq_sum - self.size_sum ** 2) / (n * n),
+                'avg_entropy': self.entropy_sum / n,
+                'ip_diversity': ip_diversity,
+                'port_diversity': len(self.port_counts) / n,
+                'tcp_ratio': tcp_count / n,
+                'udp_ratio': udp_count / n,
+                'icmp_ratio': icmp_count / n,
+                'protocol_ratio': tcp_count / (tcp_count + udp_count + 1),
+                'syn_ratio': self.syn_count / n,
+                'large_packet_ratio': self.large_count / n,
+                'outbound_ratio': self.outbound_count / n,
+                'same_dst_ratio': self.max_port_count / n,
+                'dst_port_53_ratio': self.port_counts.get(53, 0) / n,
+                'attack_signature_score': self.attack_count / n
+            }
+
+    def features(self):
+        return metrics_to_features(self.metrics())
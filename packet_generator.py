@@ -0,0 +1,173 @@
+# packet_generator.py - Vectorized per-mode packet generation straight into store columns
+import time
+import numpy as np
+from packet_store import PROTOCOLS, FLAGS, DIRECTIONS, SIGNATURES, PACKET_COLUMNS, COLUMN_NAMES, int_to_ip
+
+# The leading codebook entries are fixed, so these codes match every PacketRingBuffer
+PROTOCOL = {name: code for code, name in enumerate(PROTOCOLS)}
+FLAG = {name: code for code, name in enumerate(FLAGS)}
+DIRECTION = {name: code for code, name in enumerate(DIRECTIONS)}
+SIGNATURE = {name: code for code, name in enumerate(SIGNATURES)}
+
+VICTIM_IP = (192 << 24) | (168 << 16) | (1 << 8) | 100  # 192.168.1.100
+
+# Seconds between batches per mode (the legacy 'packet_interval' field)
+PACKET_INTERVALS = {'ddos_volumetric': 0.001, 'port_scan': 0.1, 'data_exfiltration': 0.5,
+                    'botnet_c2': 2.0, 'syn_flood': 0.05}
+NORMAL_INTERVAL = 0.3
+
+
+def ipv4(a, b, c, d):
+    """Integer IPv4 address from octets (scalars or arrays)"""
+    return (np.asarray(a, dtype=np.uint32) << 24) | (np.asarray(b, dtype=np.uint32) << 16) | \
+        (np.asarray(c, dtype=np.uint32) << 8) | np.asarray(d, dtype=np.uint32)
+
+
+def _columns(n, now, **values):
+    """Broadcast scalars to ``n`` rows and cast every column to its store dtype"""
+    values.setdefault('payload_entropy', 0.0)
+    values['timestamp'] = now
+    return {name: np.broadcast_to(np.asarray(values[name], dtype=dtype), (n,)) for name, dtype in PACKET_COLUMNS}
+
+
+def _ddos_volumetric(rng, now, n=None):
+    # Massive flood from many IPs
+    n = int(rng.integers(100, 201)) if n is None else n
+    return _columns(
+        n, now,
+        size=rng.choice([64, 64, 64, 128, 1500], n),
+        protocol=rng.choice([PROTOCOL['UDP']] * 3 + [PROTOCOL['ICMP']], n),
+        src_ip=ipv4(10, *rng.integers(1, 256, (3, n))),
+        dst_ip=VICTIM_IP,
+        src_port=rng.integers(1024, 65536, n),
+        dst_port=rng.choice([80, 443, 53], n),
+        flags=rng.choice([FLAG[''], FLAG['SYN'], FLAG['ACK']], n),
+        payload_entropy=rng.uniform(0.1, 0.3, n),
+        direction=DIRECTION['inbound'],
+        attack_signature=SIGNATURE['ddos_volumetric'])
+
+
+def _port_scan(rng, now, n=None):
+    # Sequential ports from one scanner
+    base_port = int(rng.integers(1, 65501))
+    scanner_ip = ipv4(172, 16, rng.integers(1, 11), rng.integers(1, 51))
+    n = int(rng.integers(20, 41)) if n is None else n
+    return _columns(
+        n, now,
+        size=rng.integers(60, 81, n),
+        protocol=PROTOCOL['TCP'],
+        src_ip=scanner_ip,
+        dst_ip=VICTIM_IP,
+        src_port=rng.integers(1024, 65536, n),
+        dst_port=base_port + np.arange(n),
+        flags=FLAG['SYN'],
+        direction=DIRECTION['inbound'],
+        attack_signature=SIGNATURE['port_scan'])
+
+
+def _data_exfiltration(rng, now, n=None):
+    # Large, high-entropy outbound packets
+    n = int(rng.integers(5, 16)) if n is None else n
+    return _columns(
+        n, now,
+        size=rng.integers(1200, 1501, n),
+        protocol=rng.choice([PROTOCOL['TCP'], PROTOCOL['HTTPS']], n),
+        src_ip=VICTIM_IP,
+        dst_ip=ipv4(8, 8, *rng.integers(1, 256, (2, n))),
+        src_port=rng.integers(1024, 65536, n),
+        dst_port=rng.choice([443, 80, 53], n),
+        flags=FLAG['PSH'],
+        payload_entropy=rng.uniform(0.8, 1.0, n),
+        direction=DIRECTION['outbound'],
+        attack_signature=SIGNATURE['data_exfiltration'])
+
+
+def _botnet_c2(rng, now, n=None):
+    # Periodic beacons to one C&C server
+    c2_server = ipv4(203, 0, 113, rng.integers(1, 51))
+    n = int(rng.integers(3, 9)) if n is None else n
+    return _columns(
+        n, now,
+        size=rng.integers(200, 401, n),
+        protocol=rng.choice([PROTOCOL['TCP'], PROTOCOL['HTTPS']], n),
+        src_ip=VICTIM_IP,
+        dst_ip=c2_server,
+        src_port=rng.integers(1024, 65536, n),
+        dst_port=rng.choice([443, 8080, 8443], n),
+        flags=FLAG['ACK'],
+        payload_entropy=rng.uniform(0.6, 0.8, n),
+        direction=DIRECTION['outbound'],
+        attack_signature=SIGNATURE['botnet_c2'])
+
+
+def _syn_flood(rng, now, n=None):
+    # Many SYNs from random sources to one port
+    n = int(rng.integers(50, 101)) if n is None else n
+    return _columns(
+        n, now,
+        size=rng.integers(60, 75, n),
+        protocol=PROTOCOL['TCP'],
+        src_ip=ipv4(10, *rng.integers(1, 256, (3, n))),
+        dst_ip=VICTIM_IP,
+        src_port=rng.integers(1024, 65536, n),
+        dst_port=80,
+        flags=FLAG['SYN'],
+        direction=DIRECTION['inbound'],
+        attack_signature=SIGNATURE['syn_flood'])
+
+
+def _normal_business(rng, now, n=None):
+    # Mixed internal traffic
+    n = int(rng.integers(3, 9)) if n is None else n
+    return _columns(
+        n, now,
+        size=rng.integers(200, 1201, n),
+        protocol=rng.choice([PROTOCOL['TCP'], PROTOCOL['TCP'], PROTOCOL['UDP'], PROTOCOL['HTTPS']], n),
+        src_ip=ipv4(192, 168, 1, rng.integers(10, 51, n)),
+        dst_ip=ipv4(192, 168, 1, rng.integers(10, 51, n)),
+        src_port=rng.integers(1024, 65536, n),
+        dst_port=rng.choice([80, 443, 22, 25, 53], n),
+        flags=rng.choice([FLAG['ACK'], FLAG['PSH'], FLAG['FIN']], n),
+        payload_entropy=rng.uniform(0.4, 0.7, n),
+        direction=rng.integers(0, 2, n),
+        attack_signature=SIGNATURE['normal_business'])
+
+
+MODE_GENERATORS = {
+    'ddos_volumetric': _ddos_volumetric,
+    'port_scan': _port_scan,
+    'data_exfiltration': _data_exfiltration,
+    'botnet_c2': _botnet_c2,
+    'syn_flood': _syn_flood,
+}
+
+
+def generate_columns(mode, rng, now=None, n=None):
+    """One batch for ``mode`` as store columns; unknown modes produce normal traffic.
+
+    ``n`` fixes the batch size (the mode's usual random size otherwise) and
+    ``now`` may be one timestamp or an array of ``n`` arrival times.
+    """
+    generator = MODE_GENERATORS.get(mode, _normal_business)
+    return generator(rng, time.time() if now is None else now, n)
+
+
+def columns_to_packets(columns, mode=None):
+    """Decode a column batch into the legacy list of packet dicts"""
+    interval = PACKET_INTERVALS.get(mode, NORMAL_INTERVAL)
+    rows = zip(*(columns[name].tolist() for name in COLUMN_NAMES))
+    return [{
+        'timestamp': timestamp,
+        'size': size,
+        'protocol': PROTOCOLS[protocol],
+        'src_ip': int_to_ip(src_ip),
+        'dst_ip': int_to_ip(dst_ip),
+        'src_port': src_port,
+        'dst_port': dst_port,
+        'flags': FLAGS[flags],
+        'payload_entropy': entropy,
+        'packet_interval': interval,
+        'attack_signature': SIGNATURES[signature],
+        'direction': DIRECTIONS[direction]
+    } for (timestamp, size, protocol, src_ip, dst_ip, src_port, dst_port, flags, entropy,
+           direction, signature) in rows]
@@ -0,0 +1,202 @@
+# packet_store.py - Columnar packet ring buffer for the quantum analyzer
+import struct
+import socket
+import zlib
+import numpy as np
+
+# Categorical columns are stored as small integer codes. The first entries of
+# each vocabulary are fixed so codes stay stable across runs; unseen values are
+# appended on demand.
+PROTOCOLS = ['TCP', 'UDP', 'ICMP', 'HTTPS']
+FLAGS = ['', 'SYN', 'ACK', 'PSH', 'FIN']
+DIRECTIONS = ['inbound', 'outbound']
+SIGNATURES = ['normal_business', 'ddos_volumetric', 'port_scan', 'data_exfiltration',
+              'botnet_c2', 'syn_flood', 'dns_amplification', 'normal']
+
+PACKET_COLUMNS = (
+    ('timestamp', np.float64),
+    ('size', np.int64),
+    ('protocol', np.uint8),
+    ('src_ip', np.uint32),
+    ('dst_ip', np.uint32),
+    ('src_port', np.int32),
+    ('dst_port', np.int32),
+    ('flags', np.uint8),
+    ('payload_entropy', np.float64),
+    ('direction', np.uint8),
+    ('attack_signature', np.uint8),
+)
+COLUMN_NAMES = tuple(name for name, _ in PACKET_COLUMNS)
+
+
+class Codebook:
+    """Bidirectional mapping between categorical values and uint8 codes"""
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.codes = {value: code for code, value in enumerate(self.values)}
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            if len(self.values) >= 255:
+                raise ValueError(f"Codebook full, cannot encode {value!r}")
+            code = len(self.values)
+            self.values.append(value)
+            self.codes[value] = code
+        return code
+
+    def decode(self, code):
+        return self.values[int(code)]
+
+
+def ip_to_int(ip):
+    """Convert a dotted IPv4 string to an unsigned 32-bit integer"""
+    try:
+        return struct.unpack('!I', socket.inet_aton(ip))[0]
+    except (OSError, TypeError):
+        # Non-IPv4 identifiers still need a stable, distinct-enough key
+        return zlib.crc32(str(ip).encode())
+
+
+def int_to_ip(value):
+    """Convert an unsigned 32-bit integer back to a dotted IPv4 string"""
+    return socket.inet_ntoa(struct.pack('!I', int(value)))
+
+
+class PacketWindow:
+    """Read-only view over the same run of packets in every column"""
+
+    def __init__(self, columns, store):
+        self.columns = columns
+        self.store = store
+
+    def __len__(self):
+        return len(self.columns['timestamp'])
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def to_dicts(self):
+        """Materialize the window as packet dicts (compatibility path)"""
+        store = self.store
+        c = self.columns
+        return [{
+            'timestamp': float(c['timestamp'][i]),
+            'size': int(c['size'][i]),
+            'protocol': store.protocols.decode(c['protocol'][i]),
+            'src_ip': int_to_ip(c['src_ip'][i]),
+            'dst_ip': int_to_ip(c['dst_ip'][i]),
+            'src_port': int(c['src_port'][i]),
+            'dst_port': int(c['dst_port'][i]),
+            'flags': store.flags.decode(c['flags'][i]),
+            'payload_entropy': float(c['payload_entropy'][i]),
+            'direction': store.directions.decode(c['direction'][i]),
+            'attack_signature': store.signatures.decode(c['attack_signature'][i])
+        } for i in range(len(self))]
+
+    @classmethod
+    def from_packets(cls, packets):
+        """Build a standalone window from a list of packet dicts"""
+        store = PacketRingBuffer(capacity=max(len(packets), 1))
+        store.extend(packets)
+        return store.window(len(packets))
+
+
+class PacketRingBuffer:
+    """Preallocated struct-of-arrays ring buffer of packets.
+
+    Every column is allocated at twice the capacity and each packet is written
+    at ``i`` and ``i + capacity``, so the newest ``n <= capacity`` packets are
+    always one contiguous slice and windows are zero-copy views.
+    """
+
+    def __init__(self, capacity=2000):
+        self.capacity = int(capacity)
+        self.maxlen = self.capacity
+        self._columns = {name: np.zeros(2 * self.capacity, dtype=dtype)
+                         for name, dtype in PACKET_COLUMNS}
+        self.total = 0  # Packets ever appended (monotonic)
+        self.generation = 0  # Bumped by every write and clear; never repeats, so it keys cached results
+        self.protocols = Codebook(PROTOCOLS)
+        self.flags = Codebook(FLAGS)
+        self.directions = Codebook(DIRECTIONS)
+        self.signatures = Codebook(SIGNATURES)
+
+    def __len__(self):
+        return min(self.total, self.capacity)
+
+    def encode_packet(self, packet):
+        """Encode a packet dict into a tuple ordered like COLUMN_NAMES"""
+        return (
+            packet['timestamp'],
+            packet['size'],
+            self.protocols.encode(packet['protocol']),
+            ip_to_int(packet['src_ip']),
+            ip_to_int(packet['dst_ip']),
+            packet.get('src_port', 0),
+            packet['dst_port'],
+            self.flags.encode(packet.get('flags', '')),
+            packet.get('payload_entropy', 0.5),
+            self.directions.encode(packet.get('direction', 'inbound')),
+            self.signatures.encode(packet.get('attack_signature', 'normal'))
+        )
+
+    def append(self, packet):
+        """Append one packet dict in O(1)"""
+        slot = self.total % self.capacity
+        mirror = slot + self.capacity
+        for name, value in zip(COLUMN_NAMES, self.encode_packet(packet)):
+            column = self._columns[name]
+            column[slot] = value
+            column[mirror] = value
+        self.total += 1
+        self.generation += 1
+
+    def extend(self, packets):
+        """Append a batch of packet dicts"""
+        if not packets:
+            return
+        rows = [self.encode_packet(p) for p in packets]
+        self.extend_columns({name: values for name, values in zip(COLUMN_NAMES, zip(*rows))})
+
+    def extend_columns(self, columns):
+        """Append a batch given as a mapping of column name -> array of codes/values"""
+        n = len(columns['timestamp'])
+        if n == 0:
+            return
+        skip = 0
+        if n > self.capacity:
+            # Only the newest `capacity` packets survive anyway
+            skip = n - self.capacity
+            self.total += skip
+            n = self.capacity
+        start = self.total % self.capacity
+        first = min(n, self.capacity - start)
+        for name in COLUMN_NAMES:
+            values = np.asarray(columns[name])[skip:]
+            column = self._columns[name]
+            for offset in (0, self.capacity):
+                column[offset + start:offset + start + first] = values[:first]
+                if first < n:
+                    column[offset:offset + n - first] = values[first:]
+        self.total += n
+        self.generation += 1
+
+    def window(self, n=None):
+        """Zero-copy view of the newest ``n`` packets (all stored packets by default)"""
+        size = len(self)
+        n = size if n is None else max(0, min(int(n), size))
+        end = self.total % self.capacity + self.capacity
+        return PacketWindow({name: column[end - n:end] for name, column in self._columns.items()}, self)
+
+    def span(self, start, end):
+        """Zero-copy view of packets with sequence numbers in [start, end)"""
+        if start < self.total - self.capacity or end > self.total or end < start:
+            raise IndexError(f"Packets [{start}, {end}) are no longer in the ring buffer")
+        begin = start % self.capacity
+        return PacketWindow({name: column[begin:begin + end - start] for name, column in self._columns.items()}, self)
+
+    def clear(self):
+        self.total = 0
+        self.generation += 1
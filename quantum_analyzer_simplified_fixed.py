@@ -7,42 +7,107 @@ import pickle
 import os
 import threading
 import time
-import random
+import importlib.util
+from packet_store import PacketRingBuffer
+from packet_features import (as_packet_window, compute_window_metrics, metrics_to_features,
+                             SlidingWindowAggregator)
+from quantum_engine import StatevectorEngine, QuantumLookupTable
+from attack_rules import CompiledRuleEngine, rules_fingerprint
+from traffic_counters import TrafficCounters, DEFAULT_RESOLUTIONS
+from cardinality_sketch import HyperLogLog
+from heavy_hitters import HeavyHitterTracker
+from stats_snapshot import SnapshotPublisher
+from packet_generator import generate_columns, columns_to_packets
+from rate_scheduler import RateScheduler, MODE_PROFILES
+from shared_ring import PacketProducerProcess
+from analysis_executor import AnalysisExecutor, classical_score, decide_attack, encode_features
+from analysis_cache import SingleFlightCache
+from analysis_scheduler import ContinuousAnalysis
+from event_trace import get_tracer
 warnings.filterwarnings('ignore')
 
-# Packet analysis and Quantum ML
-try:
-    import pennylane as qml
-    from pennylane import numpy as pnp
-    from sklearn.preprocessing import StandardScaler
-    QUANTUM_AVAILABLE = True
-    print("🔬 PennyLane Quantum ML Enterprise Suite loaded successfully!")
-except ImportError as e:
-    QUANTUM_AVAILABLE = False
-    print(f"⚠️  PennyLane not available: {e}")
-    pnp = np
+# Packet analysis and Quantum ML - PennyLane and scikit-learn take seconds to import,
+# so only their presence is checked here; _load_quantum_stack() imports them on first use
+QUANTUM_AVAILABLE = all(importlib.util.find_spec(name) is not None for name in ('pennylane', 'sklearn'))
+trace = get_tracer('analyzer')
+qml = None
+pnp = np
+StandardScaler = None
+
+def _load_quantum_stack():
+    """Import PennyLane and scikit-learn on demand; returns False if unavailable"""
+    global qml, pnp, StandardScaler, QUANTUM_AVAILABLE
+    if qml is not None:
+        return True
+    if not QUANTUM_AVAILABLE:
+        return False
+    try:
+        import pennylane as _qml
+        from pennylane import numpy as _pnp
+        from sklearn.preprocessing import StandardScaler as _StandardScaler
+        qml, pnp, StandardScaler = _qml, _pnp, _StandardScaler
+        print("🔬 PennyLane Quantum ML Enterprise Suite loaded successfully!")
+        return True
+    except ImportError as e:
+        QUANTUM_AVAILABLE = False
+        print(f"⚠️  PennyLane not available: {e}")
+        return False
 
 class EnhancedPacketQuantumSecurityAI:
-    def __init__(self, model_path="enhanced_packet_quantum.pkl", retrain=False):
-        self.quantum_available = QUANTUM_AVAILABLE
-        self.scaler = StandardScaler()
+    def __init__(self, model_path="enhanced_packet_quantum.pkl", retrain=False,
+                 history_size=2000, analysis_window=50, quantum_backend='numpy',
+                 quantum_inference_mode='exact', lut_grid_points=32,
+                 counter_resolutions=DEFAULT_RESOLUTIONS, distinct_error_rate=0.01,
+                 heavy_hitter_k=10, seed=None, target_pps=None, burst_seconds=0.1,
+                 packet_source='thread', ring_capacity=65536, ring_poll_interval=0.005,
+                 analysis_workers=0, analysis_queue_size=4, analysis_timeout=2.0, analysis_cache_size=8,
+                 analysis_interval=None, analysis_every_packets=None):
+        # The built-in NumPy engine always provides quantum scores; PennyLane is optional
+        self.pennylane_available = QUANTUM_AVAILABLE
+        self.quantum_backend = quantum_backend if QUANTUM_AVAILABLE else 'numpy'
+        self.quantum_available = True
+        self._scaler = None
+        self.quantum_inference_mode = quantum_inference_mode  # 'exact' or 'lut'
+        self.lut_grid_points = lut_grid_points
+        self.quantum_lut = None
         self.is_trained = True  # Force trained status
         self.model_path = model_path
         
         # Enhanced packet monitoring with real-time stats
-        self.packet_history = deque(maxlen=2000)
-        self.packet_stats = {
-            'total_packets': 0,
-            'packets_per_second': 0,
-            'unique_src_ips': set(),
-            'unique_dst_ports': set(),
-            'protocol_counts': defaultdict(int),
-            'avg_packet_size': 0,
-            'last_update': time.time()
-        }
+        self.analysis_window = analysis_window  # Packets per analysis window
+        # Ring keeps at least two windows so the aggregator can retract departing packets
+        self.packet_history = PacketRingBuffer(capacity=max(history_size, 2 * analysis_window))
+        self.window_aggregator = SlidingWindowAggregator(self.packet_history, analysis_window)
+        # Time-bucketed rates keep counting traffic the ring buffer has already evicted
+        self.traffic_counters = TrafficCounters(self.packet_history, counter_resolutions)
+        # Distinct sources/ports are HyperLogLog sketches: fixed memory under random-source floods
+        self.distinct_error_rate = distinct_error_rate
+        # Top talkers by packets/bytes for the "block source IP" style mitigations
+        self.heavy_hitters = HeavyHitterTracker(self.packet_history, k=heavy_hitter_k)
+        # packet_stats belongs to the generator (writer) thread; readers use published snapshots
+        self.packet_stats = self._new_packet_stats()
+        self.stats_publisher = SnapshotPublisher()
         self.last_update_time = None
         
-        # Attack simulation state with distinctive patterns
+        # Attack simulation state with distinctive patterns (seed the stream for reproducible runs)
+        self.packet_rng = np.random.default_rng(seed)
+        # Per-mode (target pps, batch size); target_pps={'ddos_volumetric': 250000} overrides rates
+        self.rate_profiles = dict(MODE_PROFILES)
+        for mode, pps in (target_pps or {}).items():
+            self.rate_profiles[mode] = (float(pps), self.rate_profiles.get(mode, MODE_PROFILES['normal'])[1])
+        # Batches never exceed the ring, so every packet reaches the counters and sketches
+        self.rate_scheduler = RateScheduler(*self._rate_profile(None), burst_seconds=burst_seconds,
+                                            max_batch=self.packet_history.capacity)
+        self._scheduled_mode = None
+        # 'process' generates packets in a separate process (its own GIL) and streams them
+        # through a shared-memory ring; this process then only ingests
+        self.packet_source = packet_source
+        self.seed = seed
+        self.burst_seconds = burst_seconds
+        self.ring_capacity = ring_capacity
+        self.ring_poll_interval = ring_poll_interval
+        self.packet_producer = None
+        self._packet_thread = None
         self.attack_mode = None
         self.packet_simulator_active = False
         self.attack_start_time = None
@@ -53,6 +118,16 @@ class EnhancedPacketQuantumSecurityAI:
         self.current_predicted_attack = None
         self.attack_probability_scores = {}
         
+        # Scores per (store generation, window config): repeated analyses of unchanged data are free
+        self.analysis_cache = SingleFlightCache(analysis_cache_size)
+        # analysis_workers > 0 runs window analysis in a process pool (submit_analysis/latest_analysis)
+        self.analysis_executor = None
+        if analysis_workers:
+            self.analysis_executor = AnalysisExecutor(analysis_workers, analysis_queue_size, analysis_timeout)
+        # Background analysis loop publishing the latest verdict (started when a cadence is given)
+        self.continuous_analysis = ContinuousAnalysis(self.latest_analysis, self.packet_history,
+                                                      analysis_interval, analysis_every_packets)
+        
         # Model metrics
         self.model_metrics = {
             'accuracy': 0.85,
@@ -61,92 +136,168 @@ class EnhancedPacketQuantumSecurityAI:
         }
         
         # ENHANCED: Attack type signatures and patterns
+        # 'rules' drive the scoring engine: each reads one window metric (see
+        # packet_features.compute_window_metrics) and adds its weight when it matches
         self.attack_signatures = {
             'ddos_volumetric': {
-                'packet_rate_min': 100,  # Lowered threshold
-                'ip_diversity_min': 0.5,  # Lowered threshold
-                'avg_size_max': 500,
-                'protocols': ['UDP', 'ICMP'],
+                'rules': [
+                    {'metric': 'packet_rate_raw', 'op': '>', 'value': 100, 'weight': 0.4, 'label': 'High packet rate'},
+                    {'metric': 'ip_diversity', 'op': '>', 'value': 0.5, 'weight': 0.3, 'label': 'High IP diversity'},
+                    {'metric': 'avg_size', 'op': '<', 'value': 500, 'weight': 0.2, 'label': 'Small packets'},
+                    {'any': [{'metric': 'udp_ratio', 'op': '>', 'value': 0.4},
+                             {'metric': 'icmp_ratio', 'op': '>', 'value': 0.2}],
+                     'weight': 0.1, 'label': 'UDP/ICMP heavy'}
+                ],
                 'description': 'Distributed Denial of Service - Volumetric Flood',
                 'severity': 'CRITICAL',
                 'mitigation': 'Deploy DDoS protection, rate limiting, and traffic scrubbing'
             },
             'port_scan': {
-                'port_diversity_min': 0.4,  # Lowered threshold
-                'syn_ratio_min': 0.5,
-                'ip_diversity_max': 0.3,
-                'packet_size_range': (60, 200),
+                'rules': [
+                    {'metric': 'port_diversity', 'op': '>', 'value': 0.4, 'weight': 0.4, 'label': 'High port diversity'},
+                    {'metric': 'syn_ratio', 'op': '>', 'value': 0.5, 'weight': 0.3, 'label': 'High SYN ratio'},
+                    {'metric': 'ip_diversity', 'op': '<', 'value': 0.3, 'weight': 0.2, 'label': 'Low IP diversity'},
+                    {'metric': 'avg_size', 'op': 'between', 'value': (60, 200), 'weight': 0.1, 'label': 'Small packet size'}
+                ],
                 'description': 'Network Reconnaissance - Port Scanning',
                 'severity': 'HIGH',
                 'mitigation': 'Block source IP, implement port scan detection rules'
             },
             'data_exfiltration': {
-                'large_packet_ratio_min': 0.4,
-                'entropy_min': 0.6,
-                'packet_rate_max': 100,
-                'outbound_ratio_min': 0.6,
+                'rules': [
+                    {'metric': 'large_packet_ratio', 'op': '>', 'value': 0.4, 'weight': 0.3, 'label': 'Large packets'},
+                    {'metric': 'avg_entropy', 'op': '>', 'value': 0.6, 'weight': 0.3, 'label': 'High entropy'},
+                    {'metric': 'outbound_ratio', 'op': '>', 'value': 0.6, 'weight': 0.2, 'label': 'Outbound traffic'},
+                    {'metric': 'packet_rate_raw', 'op': '<', 'value': 100, 'weight': 0.2, 'label': 'Low packet rate'}
+                ],
                 'description': 'Data Theft - Large File Exfiltration',
                 'severity': 'CRITICAL',
                 'mitigation': 'Block outbound connections, quarantine source, investigate data access'
             },
-            'botnet_c2': {
-                'packet_rate_max': 50,
-                'entropy_range': (0.5, 0.9),
-                'periodic_pattern': True,
-                'external_dst_ratio_min': 0.6,
-                'description': 'Malware Communication - Botnet Command & Control',
-                'severity': 'HIGH',
-                'mitigation': 'Quarantine infected host, block C&C servers, run malware scan'
-            },
             'syn_flood': {
-                'syn_ratio_min': 0.6,
-                'packet_rate_min': 50,
-                'tcp_ratio_min': 0.7,
-                'same_dst_ratio_min': 0.7,
+                'rules': [
+                    {'metric': 'syn_ratio', 'op': '>', 'value': 0.6, 'weight': 0.4, 'label': 'High SYN ratio'},
+                    {'metric': 'packet_rate_raw', 'op': '>', 'value': 50, 'weight': 0.3, 'label': 'High packet rate'},
+                    {'metric': 'tcp_ratio', 'op': '>', 'value': 0.7, 'weight': 0.2, 'label': 'High TCP ratio'},
+                    {'metric': 'same_dst_ratio', 'op': '>', 'value': 0.6, 'weight': 0.1, 'label': 'Same destination'}
+                ],
                 'description': 'Denial of Service - SYN Flood Attack',
                 'severity': 'HIGH',
                 'mitigation': 'Enable SYN cookies, implement connection rate limiting'
             },
+            'botnet_c2': {
+                'rules': [
+                    {'metric': 'packet_rate_raw', 'op': '<', 'value': 50, 'weight': 0.3, 'label': 'Low packet rate'},
+                    {'metric': 'avg_entropy', 'op': 'between', 'value': (0.5, 0.9), 'weight': 0.3, 'label': 'Medium entropy'},
+                    {'metric': 'outbound_ratio', 'op': '>', 'value': 0.6, 'weight': 0.2, 'label': 'Outbound traffic'},
+                    {'metric': 'avg_size', 'op': 'between', 'value': (200, 500), 'weight': 0.2, 'label': 'Medium packet size'}
+                ],
+                'description': 'Malware Communication - Botnet Command & Control',
+                'severity': 'HIGH',
+                'mitigation': 'Quarantine infected host, block C&C servers, run malware scan'
+            },
             'dns_amplification': {
-                'udp_ratio_min': 0.6,
-                'dst_port_53_ratio_min': 0.5,
-                'packet_size_min': 300,
-                'packet_rate_min': 50,
+                'rules': [
+                    {'metric': 'udp_ratio', 'op': '>', 'value': 0.6, 'weight': 0.2, 'label': 'UDP heavy'},
+                    {'metric': 'dst_port_53_ratio', 'op': '>', 'value': 0.5, 'weight': 0.5, 'label': 'DNS port concentration'},
+                    {'metric': 'avg_size', 'op': '>=', 'value': 300, 'weight': 0.2, 'label': 'Large responses'},
+                    {'metric': 'packet_rate_raw', 'op': '>', 'value': 50, 'weight': 0.1, 'label': 'High packet rate'}
+                ],
                 'description': 'Amplification Attack - DNS Reflection',
                 'severity': 'CRITICAL',
                 'mitigation': 'Block DNS traffic from suspicious sources, implement BCP38'
             }
         }
+        self._rule_engine = None
+        self._rule_engine_key = None
+        self._publish_stats()
         
         # Start enhanced packet simulation
         self.start_enhanced_packet_simulation()
         
-        if self.quantum_available:
-            self.setup_enhanced_quantum_circuit()
+        self.setup_enhanced_quantum_circuit()
+        if analysis_interval or analysis_every_packets:
+            self.continuous_analysis.start()
         
         print(f"📦 Enhanced Packet Quantum Security AI Online")
         print(f"📊 Model Performance: {self.model_metrics['accuracy']:.1%} accuracy")
         print(f"🎯 Attack Types Detected: {len(self.attack_signatures)} categories")
         print(f"📈 Real-time Monitoring: Advanced attack type prediction enabled")
     
+    @property
+    def scaler(self):
+        """Feature scaler, created (and scikit-learn imported) on first access"""
+        if self._scaler is None and _load_quantum_stack():
+            self._scaler = StandardScaler()
+        return self._scaler
+    
+    @scaler.setter
+    def scaler(self, value):
+        self._scaler = value
+    
     def setup_enhanced_quantum_circuit(self):
         """Setup enhanced quantum circuit for attack type classification"""
         self.n_qubits = 4
         self.n_layers = 2
         self.n_features = 12
         
-        # Quantum device
-        self.dev = qml.device('default.qubit', wires=self.n_qubits)
-        
         # Enhanced parameters
         self.params = np.random.uniform(0, 2*np.pi, (self.n_layers, self.n_qubits, 3))
-        if self.quantum_available:
-            self.params = pnp.array(self.params, requires_grad=True)
         
-        # Enhanced quantum circuit for attack classification
-        self.quantum_circuit = qml.QNode(self._enhanced_quantum_circuit, self.dev)
+        # Built-in statevector simulator (exact, no PennyLane dispatch)
+        self.quantum_engine = StatevectorEngine(self.n_qubits, self.n_layers)
+        
+        # Device/QNode construction is deferred to the first inference or warm_up()
+        self.dev = None
+        self.quantum_circuit = None
+        self.quantum_ready = False
         
-        print(f"🔬 Enhanced Quantum Architecture: {self.n_qubits} qubits, {self.n_features} attack classification features")
+        print(f"🔬 Enhanced Quantum Architecture: {self.n_qubits} qubits, {self.n_features} attack classification features ({self.quantum_backend} backend)")
+    
+    def build_pennylane_qnode(self):
+        """PennyLane QNode for _enhanced_quantum_circuit (imports PennyLane on first call)"""
+        if not _load_quantum_stack():
+            return None
+        dev = qml.device('default.qubit', wires=self.n_qubits)
+        return qml.QNode(self._enhanced_quantum_circuit, dev)
+    
+    def _ensure_quantum_backend(self):
+        """Construct whatever the configured backend needs before the first inference"""
+        if self.quantum_ready and (self.quantum_backend != 'pennylane' or self.quantum_circuit is not None):
+            return
+        if self.quantum_backend == 'pennylane' and self.quantum_circuit is None:
+            self.quantum_circuit = self.build_pennylane_qnode()
+            if self.quantum_circuit is None:
+                self.pennylane_available = False
+                self.quantum_backend = 'numpy'
+            else:
+                self.dev = self.quantum_circuit.device
+                self.params = pnp.array(self.params, requires_grad=True)
+        if self.quantum_inference_mode == 'lut' and self.quantum_lut is None:
+            self.enable_quantum_lut(self.lut_grid_points)
+        self.quantum_ready = True
+    
+    def warm_up(self):
+        """Build the quantum backend and run one inference now; returns seconds spent"""
+        start = time.perf_counter()
+        self._ensure_quantum_backend()
+        self.quantum_predict_batch([[0.0] * self.n_features])
+        elapsed = time.perf_counter() - start
+        print(f"🔥 Quantum backend warmed up in {elapsed * 1e3:.1f} ms ({self.quantum_backend})")
+        return elapsed
+    
+    def enable_quantum_lut(self, grid_points=32):
+        """Serve quantum scores from a precomputed interpolation table"""
+        self.quantum_lut = QuantumLookupTable(self.quantum_engine, grid_points).build(self.params)
+        self.quantum_inference_mode = 'lut'
+        print(f"🧮 Quantum LUT: {grid_points}^{self.n_qubits} grid, "
+              f"{self.quantum_lut.nbytes / 1e6:.1f} MB, built in {self.quantum_lut.build_seconds * 1e3:.1f} ms, "
+              f"max interpolation error {self.quantum_lut.max_error:.2e}, "
+              f"used for batches of {self.quantum_lut.break_even} windows or more")
+        return self.quantum_lut.max_error
+    
+    def disable_quantum_lut(self):
+        self.quantum_inference_mode = 'exact'
     
     def _enhanced_quantum_circuit(self, features, params):
         """Enhanced quantum circuit for multi-class attack prediction"""
@@ -176,168 +327,112 @@ class EnhancedPacketQuantumSecurityAI:
         def enhanced_packet_generator():
             while self.packet_simulator_active:
                 try:
-                    # Generate distinctive packets based on attack mode
-                    packets = self.generate_distinctive_packets()
+                    # Apply stat resets requested by other threads before touching packet_stats
+                    if self._apply_stat_requests():
+                        self._publish_stats()
                     
-                    for packet in packets:
-                        self.packet_history.append(packet)
-                        self.update_real_time_stats(packet)
+                    # Token-bucket pacing to the mode's target rate
+                    if self._scheduled_mode != self.attack_mode:
+                        self._scheduled_mode = self.attack_mode
+                        self.rate_scheduler.configure(*self._rate_profile(self.attack_mode))
+                    n = self.rate_scheduler.take()
+                    if not n:
+                        # Short naps so mode changes and shutdown are picked up promptly
+                        time.sleep(min(self.rate_scheduler.wait_time(), 0.1))
+                        continue
                     
-                    # Update packets per second calculation
-                    current_time = time.time()
-                    if current_time - self.packet_stats['last_update'] >= 1.0:
-                        self.calculate_packets_per_second()
-                        self.packet_stats['last_update'] = current_time
-                    
-                    # Attack-specific timing
-                    if self.attack_mode == 'ddos_volumetric':
-                        time.sleep(0.001)  # Very fast for DDoS
-                    elif self.attack_mode == 'port_scan':
-                        time.sleep(0.1)
-                    elif self.attack_mode == 'data_exfiltration':
-                        time.sleep(0.5)
-                    elif self.attack_mode == 'botnet_c2':
-                        time.sleep(2.0)
-                    elif self.attack_mode == 'syn_flood':
-                        time.sleep(0.05)
-                    else:
-                        time.sleep(0.3)  # Normal timing
+                    # Generate a distinctive batch as store columns based on attack mode
+                    columns = generate_columns(self.attack_mode, self.packet_rng,
+                                               self.rate_scheduler.timestamps(n), n)
+                    self._ingest_columns(columns)
                         
                 except Exception as e:
                     print(f"❌ Packet simulation error: {e}")
                     time.sleep(1)
         
+        def shared_ring_consumer(producer):
+            # The producer process generates and paces; this thread only ingests its records
+            while self.packet_simulator_active:
+                try:
+                    if self._apply_stat_requests():
+                        self._publish_stats()
+                    if self._scheduled_mode != self.attack_mode:
+                        self._scheduled_mode = self.attack_mode
+                        producer.set_mode(self.attack_mode or 'normal', *self._rate_profile(self.attack_mode))
+                    columns = producer.read(self.packet_history.capacity)
+                    if columns is None:
+                        if not producer.is_alive():
+                            print("❌ Packet producer process exited, stopping packet simulation")
+                            self.packet_simulator_active = False
+                            break
+                        time.sleep(self.ring_poll_interval)
+                        continue
+                    self._ingest_columns(columns)
+                    
+                except Exception as e:
+                    print(f"❌ Packet ring consumer error: {e}")
+                    time.sleep(1)
+        
         # Start background packet generation
-        packet_thread = threading.Thread(target=enhanced_packet_generator, daemon=True)
+        if self.packet_source == 'process':
+            self._scheduled_mode = self.attack_mode
+            self.packet_producer = PacketProducerProcess(self.ring_capacity, self.seed, self.burst_seconds,
+                                                         max_batch=self.packet_history.capacity)
+            self.packet_producer.start(self.attack_mode or 'normal', *self._rate_profile(self.attack_mode))
+            packet_thread = threading.Thread(target=shared_ring_consumer, args=(self.packet_producer,), daemon=True)
+        else:
+            packet_thread = threading.Thread(target=enhanced_packet_generator, daemon=True)
         packet_thread.start()
+        self._packet_thread = packet_thread
+        
+        print(f"📦 Enhanced network packet simulation with attack type diversity started ({self.packet_source})")
+    
+    def stop_packet_simulation(self):
+        """Stop the simulator thread and, in process mode, the producer process"""
+        self.packet_simulator_active = False
+        # Let the writer finish its batch (the consumer must be done with the ring before it is unmapped)
+        if self._packet_thread is not None and self._packet_thread is not threading.current_thread():
+            self._packet_thread.join(2.0)
+        if self.packet_producer is not None:
+            self.packet_producer.stop()
+            self.packet_producer = None
+    
+    def _ingest_columns(self, columns):
+        """Writer side: store a column batch and fold it into every running aggregate"""
+        start = self.packet_history.total
+        self.packet_history.extend_columns(columns)
+        self.traffic_counters.sync()
+        self.heavy_hitters.sync()
+        self._sketch_distinct(start)
+        self.update_real_time_stats_batch(columns)
         
-        print("📦 Enhanced network packet simulation with attack type diversity started")
+        # Update packets per second calculation
+        current_time = time.time()
+        if current_time - self.packet_stats['last_update'] >= 1.0:
+            self._refresh_rates()
+            self.packet_stats['last_update'] = current_time
+        self._publish_stats()
+    
+    def _rate_profile(self, mode):
+        return self.rate_profiles.get(mode, self.rate_profiles['normal'])
+    
+    def set_target_rate(self, target_pps, mode=None, batch_size=None):
+        """Change a mode's simulated packet rate (the current mode by default)"""
+        mode = mode or self.attack_mode or 'normal'
+        self.rate_profiles[mode] = (float(target_pps), batch_size or self._rate_profile(mode)[1])
+        self._scheduled_mode = None  # The generator thread reconfigures its scheduler (or the producer)
     
     def generate_distinctive_packets(self):
         """Generate highly distinctive packet patterns for different attack types"""
-        packets = []
-        current_time = time.time()
-        
-        if self.attack_mode == 'ddos_volumetric':
-            # DDoS Volumetric: Massive flood from many IPs
-            for _ in range(random.randint(100, 200)):  # Many packets
-                packets.append({
-                    'timestamp': current_time,
-                    'size': random.choice([64, 64, 64, 128, 1500]),
-                    'protocol': random.choice(['UDP', 'UDP', 'UDP', 'ICMP']),
-                    'src_ip': f"10.{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}",
-                    'dst_ip': '192.168.1.100',
-                    'src_port': random.randint(1024, 65535),
-                    'dst_port': random.choice([80, 443, 53]),
-                    'flags': random.choice(['', 'SYN', 'ACK']),
-                    'payload_entropy': random.uniform(0.1, 0.3),
-                    'packet_interval': 0.001,
-                    'attack_signature': 'ddos_volumetric',
-                    'direction': 'inbound'
-                })
-        
-        elif self.attack_mode == 'port_scan':
-            # Port Scan: Sequential ports from same IP
-            base_port = random.randint(1, 65500)
-            scanner_ip = f"172.16.{random.randint(1,10)}.{random.randint(1,50)}"
-            
-            for i in range(random.randint(20, 40)):
-                packets.append({
-                    'timestamp': current_time,
-                    'size': random.randint(60, 80),
-                    'protocol': 'TCP',
-                    'src_ip': scanner_ip,
-                    'dst_ip': '192.168.1.100',
-                    'src_port': random.randint(1024, 65535),
-                    'dst_port': base_port + i,
-                    'flags': 'SYN',
-                    'payload_entropy': 0.0,
-                    'packet_interval': 0.1,
-                    'attack_signature': 'port_scan',
-                    'direction': 'inbound'
-                })
-        
-        elif self.attack_mode == 'data_exfiltration':
-            # Data Exfiltration: Large outbound packets with high entropy
-            for _ in range(random.randint(5, 15)):
-                packets.append({
-                    'timestamp': current_time,
-                    'size': random.randint(1200, 1500),
-                    'protocol': random.choice(['TCP', 'HTTPS']),
-                    'src_ip': '192.168.1.100',
-                    'dst_ip': f"8.8.{random.randint(1,255)}.{random.randint(1,255)}",
-                    'src_port': random.randint(1024, 65535),
-                    'dst_port': random.choice([443, 80, 53]),
-                    'flags': 'PSH',
-                    'payload_entropy': random.uniform(0.8, 1.0),
-                    'packet_interval': 0.5,
-                    'attack_signature': 'data_exfiltration',
-                    'direction': 'outbound'
-                })
-        
-        elif self.attack_mode == 'botnet_c2':
-            # Botnet C&C: Periodic beacons to external servers
-            c2_server = f"203.0.113.{random.randint(1,50)}"
-            
-            for _ in range(random.randint(3, 8)):
-                packets.append({
-                    'timestamp': current_time,
-                    'size': random.randint(200, 400),
-                    'protocol': random.choice(['TCP', 'HTTPS']),
-                    'src_ip': '192.168.1.100',
-                    'dst_ip': c2_server,
-                    'src_port': random.randint(1024, 65535),
-                    'dst_port': random.choice([443, 8080, 8443]),
-                    'flags': 'ACK',
-                    'payload_entropy': random.uniform(0.6, 0.8),
-                    'packet_interval': 2.0,
-                    'attack_signature': 'botnet_c2',
-                    'direction': 'outbound'
-                })
-        
-        elif self.attack_mode == 'syn_flood':
-            # SYN Flood: Many SYN packets to same destination
-            for _ in range(random.randint(50, 100)):
-                packets.append({
-                    'timestamp': current_time,
-                    'size': random.randint(60, 74),
-                    'protocol': 'TCP',
-                    'src_ip': f"10.{random.randint(1,255)}.{random.randint(1,255)}.{random.randint(1,255)}",
-                    'dst_ip': '192.168.1.100',
-                    'src_port': random.randint(1024, 65535),
-                    'dst_port': 80,  # Same destination port
-                    'flags': 'SYN',
-                    'payload_entropy': 0.0,
-                    'packet_interval': 0.05,
-                    'attack_signature': 'syn_flood',
-                    'direction': 'inbound'
-                })
-        
-        else:
-            # Normal business traffic with mixed patterns
-            for _ in range(random.randint(3, 8)):
-                packets.append({
-                    'timestamp': current_time,
-                    'size': random.randint(200, 1200),
-                    'protocol': random.choice(['TCP', 'TCP', 'UDP', 'HTTPS']),
-                    'src_ip': f"192.168.1.{random.randint(10, 50)}",
-                    'dst_ip': f"192.168.1.{random.randint(10, 50)}",
-                    'src_port': random.randint(1024, 65535),
-                    'dst_port': random.choice([80, 443, 22, 25, 53]),
-                    'flags': random.choice(['ACK', 'PSH', 'FIN']),
-                    'payload_entropy': random.uniform(0.4, 0.7),
-                    'packet_interval': 0.3,
-                    'attack_signature': 'normal_business',
-                    'direction': random.choice(['inbound', 'outbound'])
-                })
-        
-        return packets
+        # Kept for callers that want packet dicts; the simulator writes columns directly
+        return columns_to_packets(generate_columns(self.attack_mode, self.packet_rng), self.attack_mode)
     
     def update_real_time_stats(self, packet):
         """Update real-time packet statistics for monitoring"""
+        # Fold newly stored packets into the sliding-window aggregates (no-op when caught up)
+        self.window_aggregator.sync()
+        
         self.packet_stats['total_packets'] += 1
-        self.packet_stats['unique_src_ips'].add(packet['src_ip'])
-        self.packet_stats['unique_dst_ports'].add(packet['dst_port'])
         self.packet_stats['protocol_counts'][packet['protocol']] += 1
         
         # Calculate running average packet size
@@ -348,26 +443,147 @@ class EnhancedPacketQuantumSecurityAI:
             n = self.packet_stats['total_packets']
             self.packet_stats['avg_packet_size'] = old_avg + (packet['size'] - old_avg) / n
     
+    def update_real_time_stats_batch(self, columns):
+        """Batch form of update_real_time_stats for a block of store columns"""
+        self.window_aggregator.sync()
+        
+        stats = self.packet_stats
+        sizes = columns['size']
+        n = len(sizes)
+        stats['total_packets'] += n
+        codes = np.bincount(columns['protocol'])
+        for code in np.flatnonzero(codes).tolist():
+            stats['protocol_counts'][self.packet_history.protocols.decode(code)] += int(codes[code])
+        
+        # Running average packet size over the whole batch
+        old_avg = stats['avg_packet_size']
+        stats['avg_packet_size'] = old_avg + (float(np.sum(sizes)) - n * old_avg) / stats['total_packets']
+    
+    def _new_packet_stats(self):
+        return {
+            'total_packets': 0,
+            'packets_per_second': 0,
+            'unique_src_ips': HyperLogLog(self.distinct_error_rate),
+            'unique_dst_ports': HyperLogLog(self.distinct_error_rate),
+            'distinct_estimates': {},
+            'protocol_counts': defaultdict(int),
+            'avg_packet_size': 0,
+            'traffic_rates': {},
+            'last_update': time.time()
+        }
+    
+    def _apply_stat_requests(self):
+        """Writer side: apply requests queued by set_attack_mode and friends; True if any were"""
+        applied = False
+        for action in self.stats_publisher.drain_requests():
+            if action == 'reset':
+                self.packet_stats = self._new_packet_stats()
+            elif action == 'resize_window' and self.window_aggregator.window_size != self._window_size():
+                self.window_aggregator.resize(self._window_size())
+            applied = True
+        return applied
+    
+    def _window_size(self):
+        """Aggregator window for ``analysis_window`` (capped at what the ring buffer holds)"""
+        return min(self.analysis_window, self.packet_history.capacity)
+    
+    def set_analysis_window(self, window):
+        """Change the packets per analysis window; the writer thread resizes the aggregator"""
+        self.analysis_window = int(window)
+        self.stats_publisher.request('resize_window')
+        if not self.packet_simulator_active:
+            self._apply_stat_requests()
+            self._publish_stats()
+    
+    def _refresh_rates(self):
+        """Writer side: once-a-second PPS, traffic rates and distinct-count estimates"""
+        self.calculate_packets_per_second()
+        stats = self.packet_stats
+        stats['traffic_rates'] = self.get_traffic_rates()
+        stats['distinct_estimates'] = {'src_ips': stats['unique_src_ips'].summary(),
+                                       'dst_ports': stats['unique_dst_ports'].summary()}
+    
+    def _publish_stats(self):
+        """Writer side: publish an immutable snapshot of the current stats"""
+        stats = self.packet_stats
+        self.window_aggregator.sync()
+        distinct = stats['distinct_estimates']
+        return self.stats_publisher.publish(
+            position=self.packet_history.total,
+            generation=self.packet_history.generation,
+            history_size=len(self.packet_history),
+            total_packets=stats['total_packets'],
+            packets_per_second=stats['packets_per_second'],
+            unique_src_ips=distinct.get('src_ips', {}).get('estimate', 0),
+            unique_dst_ports=distinct.get('dst_ports', {}).get('estimate', 0),
+            distinct_estimates=distinct,
+            avg_packet_size=stats['avg_packet_size'],
+            protocol_distribution=dict(stats['protocol_counts']),
+            traffic_rates=stats['traffic_rates'],
+            window_metrics=self.window_aggregator.metrics(),
+            window_size=self.window_aggregator.window_size,
+            attack_mode=self.attack_mode,
+            attack_start_time=self.attack_start_time,
+            simulator_rate=self.packet_producer.stats() if self.packet_producer else self.rate_scheduler.stats()
+        )
+    
+    def latest_stats(self):
+        """Latest published stats snapshot; without a running writer thread, publishes a fresh one inline"""
+        snapshot = self.stats_publisher.latest
+        resized = snapshot is not None and snapshot.window_size != self._window_size()
+        if not self.packet_simulator_active and (snapshot is None or resized
+                                                 or snapshot.position != self.packet_history.total):
+            if resized:
+                self.stats_publisher.request('resize_window')
+            self._apply_stat_requests()
+            self._refresh_rates()
+            snapshot = self._publish_stats()
+        return snapshot
+    
+    def _sketch_distinct(self, start):
+        """Fold packets stored since sequence ``start`` into the distinct-count sketches"""
+        store = self.packet_history
+        block = store.span(max(start, store.total - len(store)), store.total)
+        self.packet_stats['unique_src_ips'].add(block['src_ip'])
+        self.packet_stats['unique_dst_ports'].add(block['dst_port'])
+    
     def calculate_packets_per_second(self):
         """Calculate packets per second over the last second"""
-        current_time = time.time()
-        one_second_ago = current_time - 1.0
-        
-        # Count packets in the last second
-        recent_packets = [p for p in self.packet_history if p['timestamp'] > one_second_ago]
-        self.packet_stats['packets_per_second'] = len(recent_packets)
+        # Read from the 100 ms buckets rather than scanning the packet history
+        pps = self.traffic_counters.packets_per_second(1.0, time.time())
+        self.packet_stats['packets_per_second'] = int(round(pps))
+    
+    def get_traffic_rates(self, windows=(1.0, 10.0, 60.0)):
+        """Packet/byte rates with protocol and direction breakdowns over each window (seconds)"""
+        # Counters are synced by the ingest thread; rates() reads the buckets under the counters' lock
+        now = time.time()
+        return {f"{window:g}s": self.traffic_counters.rates(window, now) for window in windows}
     
-    def get_real_time_packet_stats(self):
+    def get_heavy_hitters(self, seconds=10.0, top_n=None, dimension=None, metric=None):
+        """Heaviest sources/destinations/ports over the last ``seconds``, optionally one dimension/metric"""
+        # Reader side: only the ingest thread syncs from the store; top() reads under the tracker lock
+        now = time.time()
+        if dimension is None:
+            return self.heavy_hitters.report(seconds, top_n, now)
+        metrics = [metric] if metric else ['packets', 'bytes']
+        return {dimension: {m: self.heavy_hitters.top(dimension, m, seconds, top_n, now) for m in metrics}}
+    
+    def get_real_time_packet_stats(self, snapshot=None):
         """Get current real-time packet statistics for display"""
+        snapshot = snapshot or self.latest_stats()
         return {
-            'total_packets': self.packet_stats['total_packets'],
-            'packets_per_second': self.packet_stats['packets_per_second'],
-            'unique_src_ips': len(self.packet_stats['unique_src_ips']),
-            'unique_dst_ports': len(self.packet_stats['unique_dst_ports']),
-            'avg_packet_size': int(self.packet_stats['avg_packet_size']),
-            'protocol_distribution': dict(self.packet_stats['protocol_counts']),
-            'attack_mode': self.attack_mode or 'normal',
-            'monitoring_duration': time.time() - (self.attack_start_time or time.time()),
+            'total_packets': snapshot.total_packets,
+            'packets_per_second': snapshot.packets_per_second,
+            'unique_src_ips': snapshot.unique_src_ips,
+            'unique_dst_ports': snapshot.unique_dst_ports,
+            'distinct_estimates': snapshot.distinct_estimates,
+            'avg_packet_size': int(snapshot.avg_packet_size),
+            'protocol_distribution': snapshot.protocol_distribution,
+            'traffic_rates': snapshot.traffic_rates,
+            'simulator_rate': snapshot.simulator_rate,
+            'stats_epoch': snapshot.epoch,
+            'attack_mode': snapshot.attack_mode or 'normal',
+            'monitoring_duration': time.time() - (snapshot.attack_start_time or time.time()),
             'predicted_attack_type': self.current_predicted_attack,
             'attack_probability_scores': self.attack_probability_scores
         }
@@ -389,331 +605,326 @@ class EnhancedPacketQuantumSecurityAI:
         
         self.attack_start_time = time.time()
         
-        # Reset stats for new attack
-        self.packet_stats = {
-            'total_packets': 0,
-            'packets_per_second': 0,
-            'unique_src_ips': set(),
-            'unique_dst_ports': set(),
-            'protocol_counts': defaultdict(int),
-            'avg_packet_size': 0,
-            'last_update': time.time()
-        }
+        # Reset stats for new attack; the generator thread owns packet_stats and applies it
+        self.stats_publisher.request('reset')
+        if not self.packet_simulator_active:
+            self._apply_stat_requests()
+            self._publish_stats()
         
         print(f"📦 Enhanced attack mode: {self.attack_mode}")
     
-    def extract_enhanced_features(self, packets):
+    def extract_enhanced_features(self, packets, metrics=None):
         """Extract 12 enhanced features for detailed attack classification"""
-        if len(packets) < 5:
-            return [0.0] * 12
-        
         try:
-            # Convert to arrays for analysis
-            sizes = [p['size'] for p in packets]
-            protocols = [p['protocol'] for p in packets]
-            src_ips = [p['src_ip'] for p in packets]
-            dst_ports = [p['dst_port'] for p in packets]
-            flags = [p.get('flags', '') for p in packets]
-            entropies = [p.get('payload_entropy', 0.5) for p in packets]
-            directions = [p.get('direction', 'inbound') for p in packets]
-            
-            # Enhanced feature extraction
-            time_span = max([p['timestamp'] for p in packets]) - min([p['timestamp'] for p in packets]) + 0.1
-            
-            # Feature 1: Packet rate (normalized)
-            packet_rate = (len(packets) / time_span) / 100.0
-            
-            # Feature 2: Average packet size (normalized)
-            avg_packet_size = np.mean(sizes) / 1500.0
-            
-            # Feature 3: Source IP diversity
-            unique_ips = len(set(src_ips))
-            ip_diversity = unique_ips / len(packets)
-            
-            # Feature 4: Port diversity
-            unique_ports = len(set(dst_ports))
-            port_diversity = unique_ports / len(packets)
-            
-            # Feature 5: Protocol concentration
-            tcp_count = protocols.count('TCP')
-            udp_count = protocols.count('UDP')
-            protocol_ratio = tcp_count / (tcp_count + udp_count + 1)
+            if metrics is None:
+                window = as_packet_window(packets)
+                if len(window) < 5:
+                    return [0.0] * 12
+                metrics = compute_window_metrics(window)
             
-            # Feature 6: Payload entropy
-            avg_entropy = np.mean(entropies)
-            
-            # Feature 7: Packet size variance (normalized)
-            size_variance = np.var(sizes) / 100000.0
-            
-            # Feature 8: SYN flag concentration
-            syn_count = flags.count('SYN')
-            syn_ratio = syn_count / len(packets)
-            
-            # Feature 9: Large packet ratio
-            large_packets = sum(1 for s in sizes if s > 1000)
-            large_packet_ratio = large_packets / len(packets)
-            
-            # Feature 10: Outbound traffic ratio
-            outbound_count = directions.count('outbound')
-            outbound_ratio = outbound_count / len(packets)
-            
-            # Feature 11: Same destination port concentration
-            most_common_port = max(set(dst_ports), key=dst_ports.count)
-            same_dst_ratio = dst_ports.count(most_common_port) / len(packets)
-            
-            # Feature 12: Attack signature confidence
-            signatures = [p.get('attack_signature', 'normal') for p in packets]
-            attack_indicators = sum(1 for s in signatures if s != 'normal_business')
-            attack_signature_score = attack_indicators / len(packets)
-            
-            features = [
-                packet_rate, avg_packet_size, ip_diversity, port_diversity,
-                protocol_ratio, avg_entropy, size_variance, syn_ratio,
-                large_packet_ratio, outbound_ratio, same_dst_ratio, attack_signature_score
-            ]
-            
-            return features
+            # Packet rate, avg size, IP/port diversity, protocol ratio, entropy,
+            # size variance, SYN/large/outbound/same-port ratios, attack signature
+            return metrics_to_features(metrics)
             
         except Exception as e:
             print(f"❌ Enhanced feature extraction error: {e}")
             return [0.0] * 12
     
-    def predict_attack_type(self, features, packets):
+    def predict_attack_type(self, features, packets, metrics=None):
         """ENHANCED: Predict specific attack type with confidence scores"""
         try:
-            attack_scores = {}
-            
-            print(f"🔍 [DEBUG] Analyzing {len(packets)} packets for attack prediction...")
-            
-            # Extract key metrics for classification
-            packet_rate_raw = len(packets) / ((max([p['timestamp'] for p in packets]) - min([p['timestamp'] for p in packets])) + 0.1)
-            avg_size = np.mean([p['size'] for p in packets])
-            protocols = [p['protocol'] for p in packets]
-            flags = [p.get('flags', '') for p in packets]
-            directions = [p.get('direction', 'inbound') for p in packets]
-            dst_ports = [p['dst_port'] for p in packets]
-            entropies = [p.get('payload_entropy', 0.5) for p in packets]
-            
-            print(f"🔍 [DEBUG] Packet rate: {packet_rate_raw:.1f}/s, Avg size: {avg_size:.0f}B")
+            # Extract key metrics for classification in one vectorized pass
+            if metrics is None:
+                metrics = compute_window_metrics(as_packet_window(packets))
             
-            # Calculate ratios
-            ip_diversity = len(set([p['src_ip'] for p in packets])) / len(packets)
-            port_diversity = len(set(dst_ports)) / len(packets)
-            syn_ratio = flags.count('SYN') / len(packets)
-            large_packet_ratio = sum(1 for p in packets if p['size'] > 1000) / len(packets)
-            outbound_ratio = directions.count('outbound') / len(packets)
-            udp_ratio = protocols.count('UDP') / len(packets)
-            tcp_ratio = protocols.count('TCP') / len(packets)
-            icmp_ratio = protocols.count('ICMP') / len(packets)
-            same_dst_ratio = max([dst_ports.count(port) for port in set(dst_ports)]) / len(packets)
-            avg_entropy = np.mean(entropies)
+            trace.debug('prediction.metrics',
+                        "🔍 [DEBUG] Analyzing {0[packet_count]} packets for attack prediction...\n"
+                        "🔍 [DEBUG] Packet rate: {0[packet_rate_raw]:.1f}/s, Avg size: {0[avg_size]:.0f}B\n"
+                        "🔍 [DEBUG] IP diversity: {0[ip_diversity]:.2f}, Port diversity: {0[port_diversity]:.2f}\n"
+                        "🔍 [DEBUG] UDP ratio: {0[udp_ratio]:.2f}, TCP ratio: {0[tcp_ratio]:.2f}, ICMP ratio: {0[icmp_ratio]:.2f}",
+                        metrics, metrics=metrics)
             
-            print(f"🔍 [DEBUG] IP diversity: {ip_diversity:.2f}, Port diversity: {port_diversity:.2f}")
-            print(f"🔍 [DEBUG] UDP ratio: {udp_ratio:.2f}, TCP ratio: {tcp_ratio:.2f}, ICMP ratio: {icmp_ratio:.2f}")
+            # Every signature's rules evaluated in one vectorized pass
+            attack_scores, matched_rules = self.get_rule_engine().score(metrics)
+            if trace.debug_enabled:
+                for attack_type, label, weight in matched_rules:
+                    trace.debug('prediction.rule', "🔍 [DEBUG] {}: {} (+{})", attack_type, label, weight,
+                                attack=attack_type, rule=label, weight=weight)
             
-            # DDoS Volumetric Detection
-            ddos_score = 0.0
-            if packet_rate_raw > 100:  # High packet rate
-                ddos_score += 0.4
-                print(f"🔍 [DEBUG] DDoS: High packet rate (+0.4)")
-            if ip_diversity > 0.5:  # Many different IPs
-                ddos_score += 0.3
-                print(f"🔍 [DEBUG] DDoS: High IP diversity (+0.3)")
-            if avg_size < 500:  # Small packets
-                ddos_score += 0.2
-                print(f"🔍 [DEBUG] DDoS: Small packets (+0.2)")
-            if udp_ratio > 0.4 or icmp_ratio > 0.2:  # UDP/ICMP heavy
-                ddos_score += 0.1
-                print(f"🔍 [DEBUG] DDoS: UDP/ICMP heavy (+0.1)")
-            attack_scores['ddos_volumetric'] = min(ddos_score, 1.0)
+            # Normal traffic score (inverse of max attack score) and the predicted type
+            predicted_attack, confidence, attack_scores = decide_attack(attack_scores, self.attack_confidence_threshold)
             
-            # Port Scan Detection
-            port_scan_score = 0.0
-            if port_diversity > 0.4:
-                port_scan_score += 0.4
-                print(f"🔍 [DEBUG] Port Scan: High port diversity (+0.4)")
-            if syn_ratio > 0.5:
-                port_scan_score += 0.3
-                print(f"🔍 [DEBUG] Port Scan: High SYN ratio (+0.3)")
-            if ip_diversity < 0.3:
-                port_scan_score += 0.2
-                print(f"🔍 [DEBUG] Port Scan: Low IP diversity (+0.2)")
-            if 60 <= avg_size <= 200:
-                port_scan_score += 0.1
-                print(f"🔍 [DEBUG] Port Scan: Small packet size (+0.1)")
-            attack_scores['port_scan'] = min(port_scan_score, 1.0)
-            
-            # Data Exfiltration Detection
-            exfil_score = 0.0
-            if large_packet_ratio > 0.4:
-                exfil_score += 0.3
-                print(f"🔍 [DEBUG] Exfiltration: Large packets (+0.3)")
-            if avg_entropy > 0.6:
-                exfil_score += 0.3
-                print(f"🔍 [DEBUG] Exfiltration: High entropy (+0.3)")
-            if outbound_ratio > 0.6:
-                exfil_score += 0.2
-                print(f"🔍 [DEBUG] Exfiltration: Outbound traffic (+0.2)")
-            if packet_rate_raw < 100:
-                exfil_score += 0.2
-                print(f"🔍 [DEBUG] Exfiltration: Low packet rate (+0.2)")
-            attack_scores['data_exfiltration'] = min(exfil_score, 1.0)
-            
-            # SYN Flood Detection
-            syn_flood_score = 0.0
-            if syn_ratio > 0.6:
-                syn_flood_score += 0.4
-                print(f"🔍 [DEBUG] SYN Flood: High SYN ratio (+0.4)")
-            if packet_rate_raw > 50:
-                syn_flood_score += 0.3
-                print(f"🔍 [DEBUG] SYN Flood: High packet rate (+0.3)")
-            if tcp_ratio > 0.7:
-                syn_flood_score += 0.2
-                print(f"🔍 [DEBUG] SYN Flood: High TCP ratio (+0.2)")
-            if same_dst_ratio > 0.6:
-                syn_flood_score += 0.1
-                print(f"🔍 [DEBUG] SYN Flood: Same destination (+0.1)")
-            attack_scores['syn_flood'] = min(syn_flood_score, 1.0)
-            
-            # Botnet C&C Detection
-            botnet_score = 0.0
-            if packet_rate_raw < 50:
-                botnet_score += 0.3
-                print(f"🔍 [DEBUG] Botnet: Low packet rate (+0.3)")
-            if 0.5 <= avg_entropy <= 0.9:
-                botnet_score += 0.3
-                print(f"🔍 [DEBUG] Botnet: Medium entropy (+0.3)")
-            if outbound_ratio > 0.6:
-                botnet_score += 0.2
-                print(f"🔍 [DEBUG] Botnet: Outbound traffic (+0.2)")
-            if 200 <= avg_size <= 500:
-                botnet_score += 0.2
-                print(f"🔍 [DEBUG] Botnet: Medium packet size (+0.2)")
-            attack_scores['botnet_c2'] = min(botnet_score, 1.0)
-            
-            # Normal traffic score (inverse of max attack score)
-            max_attack_score = max(attack_scores.values()) if attack_scores else 0
-            attack_scores['normal_traffic'] = max(0, 1.0 - max_attack_score)
-            
-            print(f"🔍 [DEBUG] Attack scores: {attack_scores}")
+            trace.debug('prediction.scores', "🔍 [DEBUG] Attack scores: {}", attack_scores, scores=attack_scores)
             
             # Store for dashboard display
             self.attack_probability_scores = attack_scores
-            
-            # Determine predicted attack type
-            if max_attack_score > self.attack_confidence_threshold:
-                predicted_attack = max(attack_scores.items(), key=lambda x: x[1])
-                self.current_predicted_attack = predicted_attack[0]
-                print(f"🎯 [DEBUG] ATTACK DETECTED: {predicted_attack[0]} with confidence {predicted_attack[1]:.3f}")
-                return predicted_attack[0], predicted_attack[1], attack_scores
+            self.current_predicted_attack = predicted_attack
+            if predicted_attack != 'normal_traffic':
+                trace.debug('prediction.attack', "🎯 [DEBUG] ATTACK DETECTED: {} with confidence {:.3f}",
+                            predicted_attack, confidence, attack=predicted_attack, confidence=confidence)
             else:
-                self.current_predicted_attack = 'normal_traffic'
-                print(f"🔍 [DEBUG] Normal traffic detected (max score: {max_attack_score:.3f})")
-                return 'normal_traffic', attack_scores.get('normal_traffic', 0.8), attack_scores
+                trace.debug('prediction.normal', "🔍 [DEBUG] Normal traffic detected (max score: {:.3f})",
+                            1.0 - confidence, max_score=1.0 - confidence)
+            return predicted_attack, confidence, attack_scores
                 
         except Exception as e:
-            print(f"❌ Attack prediction error: {e}")
+            trace.error('prediction.error', "❌ Attack prediction error: {}", e, error=repr(e))
             import traceback
             traceback.print_exc()
             self.current_predicted_attack = 'prediction_error'
             return 'prediction_error', 0.0, {}
     
+    def get_rule_engine(self):
+        """Compiled rule engine, recompiled whenever signatures or their rules change"""
+        key = rules_fingerprint(self.attack_signatures)
+        if key != self._rule_engine_key:
+            self._rule_engine = CompiledRuleEngine(self.attack_signatures)
+            self._rule_engine_key = key
+        return self._rule_engine
+    
+    def score_attack_batch(self, metrics_list):
+        """Score many windows' metrics in one call; returns (attack names, (N, n_attacks) scores)"""
+        engine = self.get_rule_engine()
+        scores, _ = engine.score_matrix(engine.metric_matrix(metrics_list))
+        return engine.attacks, scores
+    
     def analyze_current_pattern(self):
         """Enhanced pattern analysis with detailed attack type prediction"""
-        print(f"🔍 [DEBUG] Starting pattern analysis with {len(self.packet_history)} packets in history")
+        # Read one published snapshot: never blocks the generator thread or sees torn stats
+        snapshot = self.latest_stats()
+        trace.debug('analysis.start', "🔍 [DEBUG] Starting pattern analysis with {} packets in history",
+                    snapshot.history_size, epoch=snapshot.epoch)
         
-        if len(self.packet_history) < 10:
-            print(f"🔍 [DEBUG] Insufficient packet data for analysis")
-            return {
-                'pattern_type': 'insufficient_data',
-                'predicted_attack_type': 'insufficient_data',
-                'attack_confidence': 0.0,
-                'quantum_score': 0.0,
-                'classical_score': 0.0,
-                'confidence': 0.0,
-                'attack_detected': False,
-                'features': [0] * 12,
-                'threat_level': 'LOW',
-                'recommendation': 'Collecting enhanced packet baseline...',
-                'attack_probability_scores': {},
-                'attack_details': {},
-                'model_performance': self.model_metrics,
-                'real_time_stats': self.get_real_time_packet_stats()
-            }
+        if snapshot.history_size < 10:
+            trace.debug('analysis.insufficient', "🔍 [DEBUG] Insufficient packet data for analysis")
+            return self._insufficient_analysis(snapshot)
         
         try:
-            # Analyze recent packets with enhanced features
-            recent_packets = list(self.packet_history)[-50:]  # Use last 50 packets
-            print(f"🔍 [DEBUG] Analyzing {len(recent_packets)} recent packets")
-            
-            features = self.extract_enhanced_features(recent_packets)
-            print(f"🔍 [DEBUG] Extracted features: {[f'{f:.3f}' for f in features[:6]]}")
-            
-            # ENHANCED: Predict specific attack type
-            predicted_attack, attack_confidence, probability_scores = self.predict_attack_type(features, recent_packets)
-            
-            # Quantum and classical predictions for overall threat level
-            quantum_score = self.quantum_predict(features)
-            classical_score = self._classical_predict(features)
-            
-            # Combined threat score
-            combined_score = (quantum_score * 0.6) + (classical_score * 0.4)
-            
-            # Enhanced attack detection
-            attack_detected = attack_confidence > self.attack_confidence_threshold
-            
-            # Get detailed attack information
-            attack_details = self.get_attack_details(predicted_attack, attack_confidence)
-            
-            # Get real-time stats
-            real_time_stats = self.get_real_time_packet_stats()
-            
-            print(f"🎯 [DEBUG] FINAL PREDICTION: {predicted_attack} (confidence: {attack_confidence:.3f})")
-            print(f"📊 [DEBUG] Quantum: {quantum_score:.3f} | Classical: {classical_score:.3f} | Combined: {combined_score:.3f}")
-            print(f"📈 [DEBUG] Real-time: {real_time_stats['packets_per_second']} PPS, {real_time_stats['total_packets']} total")
-            
-            return {
-                'pattern_type': predicted_attack,
-                'predicted_attack_type': predicted_attack,
-                'attack_confidence': float(attack_confidence),
-                'quantum_score': float(quantum_score),
-                'classical_score': float(classical_score),
-                'confidence': float(combined_score),
-                'attack_detected': attack_detected,
-                'features': features,
-                'threat_level': attack_details['severity'],
-                'recommendation': attack_details['mitigation'],
-                'attack_probability_scores': probability_scores,
-                'attack_details': attack_details,
-                'model_performance': self.model_metrics,
-                'real_time_stats': real_time_stats
-            }
+            # Concurrent callers for the same data and settings share one computation
+            raw = self.analysis_cache.get(self._analysis_key(snapshot), lambda: self._score_window(snapshot))
+            return self._analysis_result(snapshot, raw)
             
         except Exception as e:
-            print(f"❌ Enhanced pattern analysis error: {e}")
-            import traceback
-            traceback.print_exc()
-            return {
-                'pattern_type': 'analysis_error',
-                'predicted_attack_type': 'analysis_error',
-                'attack_confidence': 0.0,
-                'quantum_score': 0.0,
-                'classical_score': 0.0,
-                'confidence': 0.0,
-                'attack_detected': False,
-                'features': [0] * 12,
-                'threat_level': 'UNKNOWN',
-                'recommendation': f'Analysis error: {str(e)}',
-                'attack_probability_scores': {},
-                'attack_details': {},
-                'model_performance': self.model_metrics,
-                'real_time_stats': self.get_real_time_packet_stats()
-            }
+            return self._analysis_error(snapshot, e)
+    
+    def _score_window(self, snapshot):
+        """Inline scores for the snapshot's analysis window (the cached part of an analysis)"""
+        # Analyze recent packets with enhanced features
+        metrics = self._analysis_metrics(snapshot)
+        trace.debug('analysis.window', "🔍 [DEBUG] Analyzing {} recent packets", metrics['packet_count'])
+        
+        features = self.extract_enhanced_features(None, metrics)
+        if trace.debug_enabled:
+            trace.debug('analysis.features', "🔍 [DEBUG] Extracted features: {}",
+                        [f'{f:.3f}' for f in features[:6]], features=features)
+        
+        # ENHANCED: Predict specific attack type
+        predicted_attack, attack_confidence, probability_scores = self.predict_attack_type(features, None, metrics)
+        
+        # Quantum and classical predictions for overall threat level
+        return {
+            'features': features,
+            'predicted_attack': predicted_attack,
+            'attack_confidence': attack_confidence,
+            'attack_scores': probability_scores,
+            'quantum_score': self.quantum_predict_batch([features])[0],
+            'classical_score': self._classical_predict(features)
+        }
+    
+    def _analysis_key(self, snapshot):
+        """Cache key: the store generation analysed plus every setting the scores depend on"""
+        self.get_rule_engine()
+        return (snapshot.generation, snapshot.window_size, self._rule_engine_key, self.attack_confidence_threshold,
+                np.asarray(self.params, dtype=float).tobytes(), self.quantum_inference_mode, self.quantum_backend,
+                self.quantum_available and self.is_trained)
+    
+    def _analysis_metrics(self, snapshot):
+        """Window metrics for an analysis, always from the published snapshot"""
+        # analysis_window assigned directly: ask the writer to resize (the snapshot keeps the old size until then)
+        if snapshot.window_size != self._window_size():
+            self.stats_publisher.request('resize_window')
+        return snapshot.window_metrics
+    
+    def _analysis_payload(self, snapshot):
+        """Everything analysis_executor.run_analysis needs, as picklable values"""
+        self.get_rule_engine()
+        quantum = self.quantum_available and self.is_trained
+        return {
+            'metrics': self._analysis_metrics(snapshot),
+            'signatures': self.attack_signatures,
+            'signatures_key': self._rule_engine_key,
+            'threshold': self.attack_confidence_threshold,
+            'params': np.asarray(self.params, dtype=float) if quantum else None,
+            'n_qubits': self.n_qubits,
+            'n_layers': self.n_layers,
+            'n_features': self.n_features,
+            'inference_mode': self.quantum_inference_mode,
+            'lut_grid_points': self.lut_grid_points
+        }
+    
+    def _analysis_result(self, snapshot, raw):
+        """Turn scores (inline or from a pool worker) into the analysis response"""
+        predicted_attack = raw['predicted_attack']
+        attack_confidence = raw['attack_confidence']
+        quantum_score = raw['quantum_score']
+        classical_score = raw['classical_score']
+        self.current_predicted_attack = predicted_attack
+        self.attack_probability_scores = raw['attack_scores']
+        
+        # Combined threat score
+        combined_score = (quantum_score * 0.6) + (classical_score * 0.4)
+        
+        # Enhanced attack detection
+        attack_detected = attack_confidence > self.attack_confidence_threshold
+        
+        # Get detailed attack information
+        attack_details = self.get_attack_details(predicted_attack, attack_confidence)
+        
+        # Get real-time stats
+        real_time_stats = self.get_real_time_packet_stats(snapshot)
+        
+        trace.debug('analysis.result',
+                    "🎯 [DEBUG] FINAL PREDICTION: {} (confidence: {:.3f})\n"
+                    "📊 [DEBUG] Quantum: {:.3f} | Classical: {:.3f} | Combined: {:.3f}\n"
+                    "📈 [DEBUG] Real-time: {} PPS, {} total",
+                    predicted_attack, attack_confidence, quantum_score, classical_score, combined_score,
+                    real_time_stats['packets_per_second'], real_time_stats['total_packets'],
+                    attack=predicted_attack, confidence=attack_confidence, quantum_score=quantum_score,
+                    classical_score=classical_score, combined_score=combined_score)
+        
+        return {
+            'pattern_type': predicted_attack,
+            'predicted_attack_type': predicted_attack,
+            'attack_confidence': float(attack_confidence),
+            'quantum_score': float(quantum_score),
+            'classical_score': float(classical_score),
+            'confidence': float(combined_score),
+            'attack_detected': attack_detected,
+            'features': raw['features'],
+            'threat_level': attack_details['severity'],
+            'recommendation': attack_details['mitigation'],
+            'attack_probability_scores': raw['attack_scores'],
+            'attack_details': attack_details,
+            'model_performance': self.model_metrics,
+            'real_time_stats': real_time_stats
+        }
+    
+    def _insufficient_analysis(self, snapshot):
+        return {
+            'pattern_type': 'insufficient_data',
+            'predicted_attack_type': 'insufficient_data',
+            'attack_confidence': 0.0,
+            'quantum_score': 0.0,
+            'classical_score': 0.0,
+            'confidence': 0.0,
+            'attack_detected': False,
+            'features': [0] * 12,
+            'threat_level': 'LOW',
+            'recommendation': 'Collecting enhanced packet baseline...',
+            'attack_probability_scores': {},
+            'attack_details': {},
+            'model_performance': self.model_metrics,
+            'real_time_stats': self.get_real_time_packet_stats(snapshot)
+        }
+    
+    def _analysis_error(self, snapshot, e):
+        trace.error('analysis.error', "❌ Enhanced pattern analysis error: {}", e, error=repr(e))
+        import traceback
+        traceback.print_exc()
+        return {
+            'pattern_type': 'analysis_error',
+            'predicted_attack_type': 'analysis_error',
+            'attack_confidence': 0.0,
+            'quantum_score': 0.0,
+            'classical_score': 0.0,
+            'confidence': 0.0,
+            'attack_detected': False,
+            'features': [0] * 12,
+            'threat_level': 'UNKNOWN',
+            'recommendation': f'Analysis error: {str(e)}',
+            'attack_probability_scores': {},
+            'attack_details': {},
+            'model_performance': self.model_metrics,
+            'real_time_stats': self.get_real_time_packet_stats(snapshot)
+        }
+    
+    def _analysis_task(self):
+        """(coalescing key, build) for AnalysisExecutor: one in-flight analysis per window configuration"""
+        def build():
+            snapshot = self.latest_stats()
+            return self._analysis_payload(snapshot), (snapshot, self._analysis_key(snapshot))
+        return ('window', self.analysis_window), build
+    
+    def submit_analysis(self, callback=None):
+        """Queue a pool analysis without waiting; ``callback(analysis)`` gets the finished response.
+        
+        Without a pool (analysis_workers=0) the analysis runs inline. Returns False if the
+        bounded queue rejected the request.
+        """
+        snapshot = self.latest_stats()
+        if self.analysis_executor is None or snapshot.history_size < 10:
+            analysis = self.analyze_current_pattern()
+            if callback:
+                callback(analysis)
+            return True
+        
+        cached = self.analysis_cache.peek(self._analysis_key(snapshot))
+        if cached is not None:
+            if callback:
+                callback(self._analysis_result(snapshot, cached))
+            return True
+        
+        def on_result(raw, context):
+            snapshot, key = context
+            self.analysis_cache.put(key, raw)
+            if callback:
+                callback(self._analysis_result(snapshot, raw))
+        key, build = self._analysis_task()
+        return self.analysis_executor.submit(key, build, on_result) is not None
+    
+    def latest_analysis(self, timeout=None):
+        """Analysis for request handlers: waits at most ``timeout`` for the pool, else the latest completed result"""
+        snapshot = self.latest_stats()
+        if self.analysis_executor is None or snapshot.history_size < 10:
+            return self.analyze_current_pattern()
+        cached = self.analysis_cache.peek(self._analysis_key(snapshot))
+        if cached is not None:
+            return self._analysis_result(snapshot, cached)
+        key, build = self._analysis_task()
+        completed = self.analysis_executor.result(key, build, timeout)
+        if completed is None:
+            # Nothing finished yet (pool still starting): answer inline once
+            return self.analyze_current_pattern()
+        raw, (snapshot, cache_key) = completed
+        self.analysis_cache.put(cache_key, raw)
+        return self._analysis_result(snapshot, raw)
+    
+    def latest_verdict(self):
+        """Newest verdict published by the continuous analysis loop (None before its first run)"""
+        return self.continuous_analysis.latest
+    
+    def add_verdict_listener(self, listener):
+        """Call ``listener(verdict, previous)`` after every continuous analysis run"""
+        self.continuous_analysis.add_listener(listener)
+    
+    def current_analysis(self):
+        """O(1) latest verdict while the continuous loop runs, otherwise an on-demand analysis"""
+        verdict = self.continuous_analysis.latest
+        if self.continuous_analysis.active and verdict is not None:
+            return verdict.analysis
+        return self.latest_analysis()
+    
+    def shutdown_analysis(self):
+        self.continuous_analysis.stop()
+        if self.analysis_executor is not None:
+            self.analysis_executor.shutdown()
+            self.analysis_executor = None
     
     def get_attack_details(self, attack_type, confidence):
         """Get detailed information about the predicted attack type"""
         if attack_type in self.attack_signatures:
-            attack_info = self.attack_signatures[attack_type].copy()
+            # Scoring rules stay internal; responses carry the description, severity and mitigation
+            attack_info = {k: v for k, v in self.attack_signatures[attack_type].items() if k != 'rules'}
             attack_info['confidence'] = confidence
             attack_info['detected_at'] = datetime.now().strftime('%H:%M:%S')
             return attack_info
@@ -736,49 +947,34 @@ class EnhancedPacketQuantumSecurityAI:
     
     def quantum_predict(self, features):
         """Enhanced quantum prediction with fallback"""
+        return float(self.quantum_predict_batch([features])[0])
+    
+    def quantum_predict_batch(self, feature_matrix):
+        """Score N feature vectors in one vectorized pass; returns an array of N probabilities"""
         if not self.quantum_available or not self.is_trained:
-            return self._classical_predict(features)
+            return np.array([self._classical_predict(f) for f in feature_matrix], dtype=float)
         
         try:
-            processed_features = self._prepare_enhanced_features(features)
-            measurement = self.quantum_circuit(processed_features, self.params)
-            probability = 1 / (1 + np.exp(-measurement * 3))
-            return float(probability)
+            self._ensure_quantum_backend()
+            processed = self._prepare_enhanced_features_batch(feature_matrix)
+            if self.quantum_inference_mode == 'lut' and self.quantum_lut is not None:
+                # Small batches are scored exactly; the table only pays off above its break-even size
+                measurements = self.quantum_lut.expval_z0_batch(processed, self.params)
+            elif self.quantum_backend == 'pennylane':
+                # Parameter broadcasting: one tape with a batch axis on every RY angle
+                measurements = np.asarray(self.quantum_circuit(processed.T, self.params), dtype=float)
+            else:
+                measurements = self.quantum_engine.expval_z0_batch(processed, self.params)
+            probabilities = 1 / (1 + np.exp(-measurements * 3))
+            return np.asarray(probabilities, dtype=float).reshape(len(processed))
         except Exception as e:
-            print(f"❌ Quantum prediction error: {e}")
-            return self._classical_predict(features)
+            trace.error('quantum.error', "❌ Quantum prediction error: {}", e, error=repr(e))
+            return np.array([self._classical_predict(f) for f in feature_matrix], dtype=float)
     
     def _classical_predict(self, features):
         """Enhanced classical prediction with attack type awareness"""
         try:
-            score = 0.0
-            
-            # High packet rate indicator
-            if features[0] > 0.5:  # Lowered threshold
-                score += 0.3
-            
-            # High IP diversity indicator  
-            if features[2] > 0.5:  # Lowered threshold
-                score += 0.3
-                
-            # High port diversity indicator
-            if features[3] > 0.4:  # Lowered threshold
-                score += 0.3
-                
-            # High attack signature
-            if len(features) > 11 and features[11] > 0.5:  # Lowered threshold
-                score += 0.4
-                
-            # SYN flood indicator
-            if len(features) > 7 and features[7] > 0.5:  # Lowered threshold
-                score += 0.3
-                
-            # Data exfiltration indicator
-            if len(features) > 8 and features[8] > 0.4 and len(features) > 9 and features[9] > 0.6:
-                score += 0.4
-                
-            return min(score, 1.0)
-            
+            return classical_score(features)
         except Exception as e:
             print(f"❌ Classical prediction error: {e}")
             return 0.5
@@ -793,6 +989,10 @@ class EnhancedPacketQuantumSecurityAI:
         processed = np.clip(processed, 0, 1)
         return processed[:self.n_qubits]
     
+    def _prepare_enhanced_features_batch(self, feature_matrix):
+        """Row-wise _prepare_enhanced_features for an (N, k) matrix"""
+        return encode_features(feature_matrix, self.n_features, self.n_qubits)
+    
     def update_timing(self, timestamp):
         """Update timing - triggers enhanced packet analysis"""
         try:
@@ -809,6 +1009,10 @@ class EnhancedPacketQuantumSecurityAI:
             return {
                 'model_info': {
                     'quantum_available': self.quantum_available,
+                    'quantum_backend': self.quantum_backend,
+                    'quantum_inference_mode': self.quantum_inference_mode,
+                    'lut_max_error': self.quantum_lut.max_error if self.quantum_lut else None,
+                    'lut_break_even': self.quantum_lut.break_even if self.quantum_lut else None,
                     'is_trained': self.is_trained,
                     'model_accuracy': self.model_metrics.get('accuracy', 0),
                     'training_iterations': self.model_metrics.get('training_epochs', 0),
@@ -818,6 +1022,10 @@ class EnhancedPacketQuantumSecurityAI:
                     'attack_types_supported': len(self.attack_signatures)
                 },
                 'real_time_metrics': real_time_stats,
+                'heavy_hitters': self.get_heavy_hitters(top_n=5),
+                'analysis_cache': self.analysis_cache.stats(),
+                'continuous_analysis': self.continuous_analysis.stats(),
+                'analysis_executor': self.analysis_executor.stats() if self.analysis_executor else None,
                 'attack_prediction': {
                     'current_prediction': self.current_predicted_attack,
                     'probability_scores': self.attack_probability_scores,
@@ -878,9 +1086,14 @@ class EnhancedPacketQuantumSecurityAI:
             self.model_metrics = model_data.get('model_metrics', self.model_metrics)
             self.is_trained = model_data.get('is_trained', True)
             
-            # Load attack signatures if available
+            # Load attack signatures if available (older models carry threshold keys instead of scoring rules)
             if 'attack_signatures' in model_data:
-                self.attack_signatures.update(model_data['attack_signatures'])
+                for name, signature in model_data['attack_signatures'].items():
+                    signature = {k: v for k, v in signature.items()
+                                 if k in ('rules', 'description', 'severity', 'mitigation')}
+                    if 'rules' not in signature and name in self.attack_signatures:
+                        signature = dict(signature, rules=self.attack_signatures[name].get('rules'))
+                    self.attack_signatures[name] = signature
             
             if 'confidence_threshold' in model_data:
                 self.attack_confidence_threshold = model_data['confidence_threshold']
@@ -4,6 +4,9 @@ import random
 import time
 import threading
 from datetime import datetime
+from event_trace import get_tracer
+
+trace = get_tracer('client')
 
 class QuantumNetworkClient:
     def __init__(self, attack_simulator, server_url="http://localhost:5000"):
@@ -40,24 +43,25 @@ class QuantumNetworkClient:
             )
             
             if response.status_code == 200:
-                print(f"✅ [CLIENT] Update successful at {datetime.now().strftime('%H:%M:%S')}")
+                trace.debug('update.ok', "✅ [CLIENT] Update successful at {:%H:%M:%S}", datetime.now())
                 self.failed_attempts = 0
                 return True
             else:
-                print(f"❌ [CLIENT] Server returned {response.status_code}")
+                trace.error('update.status', "❌ [CLIENT] Server returned {}", response.status_code,
+                            status=response.status_code)
                 self.failed_attempts += 1
                 return False
                 
         except requests.exceptions.Timeout:
-            print(f"⏰ [CLIENT] Request timeout")
+            trace.warning('update.timeout', "⏰ [CLIENT] Request timeout")
             self.failed_attempts += 1
             return False
         except requests.exceptions.ConnectionError:
-            print(f"🔌 [CLIENT] Connection error - server may be down")
+            trace.warning('update.connection', "🔌 [CLIENT] Connection error - server may be down")
             self.failed_attempts += 1
             return False
         except Exception as e:
-            print(f"💥 [CLIENT] Error: {e}")
+            trace.error('update.error', "💥 [CLIENT] Error: {}", e, error=repr(e))
             self.failed_attempts += 1
             return False
     
@@ -0,0 +1,269 @@
+# quantum_engine.py - Pure-NumPy statevector simulator for the analyzer circuit
+import time
+import numpy as np
+
+
+def rx_matrix(theta):
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[c, -1j * s], [-1j * s, c]], dtype=np.complex128)
+
+
+def ry_matrix(theta):
+    c, s = np.cos(theta / 2), np.sin(theta / 2)
+    return np.array([[c, -s], [s, c]], dtype=np.complex128)
+
+
+def rz_matrix(theta):
+    return np.array([[np.exp(-0.5j * theta), 0], [0, np.exp(0.5j * theta)]], dtype=np.complex128)
+
+
+class StatevectorEngine:
+    """Simulates ``_enhanced_quantum_circuit`` without PennyLane.
+
+    RY feature encoding, ``n_layers`` of RX/RY/RZ on every qubit followed by a
+    CNOT ladder, then <PauliZ(0)>. Wire 0 is the most significant basis bit,
+    matching PennyLane's ordering.
+
+    Only the encoding depends on the input, so the variational block is fused
+    into one unitary V and the observable V^dag Z0 V is cached per parameter
+    set. Inference is then a product state and one matrix-vector product. The
+    cache is keyed on the parameter bytes, so replacing or mutating ``params``
+    invalidates it automatically.
+    """
+
+    def __init__(self, n_qubits=4, n_layers=2):
+        self.n_qubits = n_qubits
+        self.n_layers = n_layers
+        self.dim = 2 ** n_qubits
+
+        # einsum subscripts applying a 2x2 gate to each wire of a (2,)*n tensor
+        # (trailing ``...`` carries a batch of states through the contraction)
+        axes = 'abcdefghijklmnopqrstuvwx'[:n_qubits]
+        self._gate_subscripts = [
+            f"yz,{axes.replace(axes[q], 'z')}...->{axes.replace(axes[q], 'y')}..."
+            for q in range(n_qubits)
+        ]
+
+        # The CNOT ladder is a fixed basis permutation: new_state = state[ladder]
+        basis = np.arange(self.dim)
+        ladder = basis.copy()
+        for q in range(n_qubits - 1):
+            control = (basis >> (n_qubits - 1 - q)) & 1
+            flipped = basis ^ (control << (n_qubits - 2 - q))
+            ladder = ladder[flipped]
+        self._cnot_ladder = ladder
+
+        # Bit of each wire in every basis index, and <Z0> weights on basis probabilities
+        self._basis_bits = ((basis[:, None] >> (n_qubits - 1 - np.arange(n_qubits))) & 1).astype(bool)
+        self._z0 = np.where(self._basis_bits[:, 0], -1.0, 1.0)
+
+        # Fused observable cache
+        self._cache_key = None
+        self._observable = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def layer_gates(self, params):
+        """Fused RZ.RY.RX gate per (layer, qubit): shape (n_layers, n_qubits, 2, 2)"""
+        params = np.asarray(params, dtype=np.float64)
+        return np.array([[rz_matrix(params[l, q, 2]) @ ry_matrix(params[l, q, 1]) @ rx_matrix(params[l, q, 0])
+                          for q in range(self.n_qubits)] for l in range(self.n_layers)])
+
+    def encoded_amplitudes(self, features):
+        """Real amplitudes of the product state after the RY(x * pi) encoding layer.
+
+        Accepts one feature vector or an (N, k) batch; wires beyond the given
+        features stay in |0>.
+        """
+        features = np.asarray(features, dtype=np.float64)[..., :self.n_qubits]
+        half = np.zeros(features.shape[:-1] + (self.n_qubits,))
+        half[..., :features.shape[-1]] = features * np.pi / 2
+        cos, sin = np.cos(half), np.sin(half)
+        return np.where(self._basis_bits, sin[..., None, :], cos[..., None, :]).prod(axis=-1)
+
+    def encoded_state(self, features):
+        return self.encoded_amplitudes(features).astype(np.complex128)
+
+    def _apply_variational(self, states, gates):
+        """Run the variational block on a (dim, batch) matrix of statevectors"""
+        shape = (2,) * self.n_qubits + (states.shape[1],)
+        for layer in range(self.n_layers):
+            tensor = states.reshape(shape)
+            for q in range(self.n_qubits):
+                tensor = np.einsum(self._gate_subscripts[q], gates[layer, q], tensor)
+            states = tensor.reshape(states.shape)[self._cnot_ladder]
+        return states
+
+    def statevector(self, features, params):
+        """Final statevector, gate by gate (reference path)"""
+        psi = self.encoded_state(features)[:, None]
+        return self._apply_variational(psi, self.layer_gates(params))[:, 0]
+
+    def variational_unitary(self, params):
+        """16x16 unitary of the full variational block for ``params``"""
+        identity = np.eye(self.dim, dtype=np.complex128)
+        return self._apply_variational(identity, self.layer_gates(params))
+
+    def observable(self, params):
+        """Cached real part of V^dag Z0 V; the encoded state is real, so that is all <Z0> needs"""
+        params = np.asarray(params, dtype=np.float64)
+        key = params.tobytes()
+        if key != self._cache_key:
+            unitary = self.variational_unitary(params)
+            self._observable = np.ascontiguousarray(((unitary.conj().T * self._z0) @ unitary).real)
+            self._cache_key = key
+            self.cache_misses += 1
+        else:
+            self.cache_hits += 1
+        return self._observable
+
+    def invalidate(self):
+        self._cache_key = None
+        self._observable = None
+
+    def expval_z0(self, features, params):
+        """<PauliZ(0)> of the circuit for one feature vector"""
+        observable = self.observable(params)
+        psi = self.encoded_amplitudes(features)
+        return float(psi @ (observable @ psi))
+
+    def expval_z0_batch(self, feature_matrix, params):
+        """<PauliZ(0)> for every row of an (N, k) feature matrix in one pass"""
+        observable = self.observable(params)
+        psi = self.encoded_amplitudes(np.atleast_2d(feature_matrix))
+        return np.einsum('ni,ni->n', psi @ observable, psi)
+
+
+class QuantumLookupTable:
+    """Precomputed <Z0> on a regular grid over the [0, 1]^n encoded-feature cube.
+
+    The circuit output is smooth in the clipped features, so it is evaluated
+    once per parameter set on ``grid_points`` per axis and served by
+    multilinear interpolation. ``max_error`` is measured at every cell centre
+    plus a random probe set, where multilinear error peaks.
+
+    The table is not free: 32^4 points take ~8 MB, and one interpolation
+    costs more than one exact inference with the fused engine. It only wins
+    on large batches, so ``expval_z0_batch`` sends batches smaller than
+    ``break_even`` rows (timed against the engine on every build) to the
+    engine, and the table is only built once a large batch arrives.
+    """
+
+    BREAK_EVEN = 64  # Rows; replaced by the measured value once the table is built
+
+    def __init__(self, engine, grid_points=32, probe_points=20000):
+        self.engine = engine
+        self.grid_points = int(grid_points)
+        self.probe_points = probe_points
+        self.break_even = self.BREAK_EVEN
+        self.table = None
+        self.max_error = None
+        self.build_seconds = None
+        self._params_key = None
+
+        n = engine.n_qubits
+        axes = 'abcdefgh'[:n]
+        bra, ket = 'ijklmnop'[:n], 'qrstuvwx'[:n]
+        operands = ','.join(f"{g}{i}" for g, i in zip(axes, bra)) + ',' + \
+            ','.join(f"{g}{k}" for g, k in zip(axes, ket))
+        self._grid_subscripts = f"{bra}{ket},{operands}->{axes}"
+        self._corners = np.array([[(c >> (n - 1 - q)) & 1 for q in range(n)] for c in range(2 ** n)])
+        self._strides = self.grid_points ** np.arange(n - 1, -1, -1)
+        self._corner_offsets = self._corners @ self._strides
+
+    def _evaluate_grid(self, observable, points):
+        """Exact <Z0> on the tensor grid points^n via one contraction"""
+        n = self.engine.n_qubits
+        half = points * np.pi / 2
+        amplitudes = np.stack([np.cos(half), np.sin(half)], axis=1)
+        tensor = observable.reshape((2,) * (2 * n))
+        return np.einsum(self._grid_subscripts, tensor, *([amplitudes] * (2 * n)), optimize=True)
+
+    def build(self, params):
+        start = time.perf_counter()
+        observable = self.engine.observable(params)
+        grid = np.linspace(0.0, 1.0, self.grid_points)
+        self.table = self._evaluate_grid(observable, grid)
+        self._params_key = np.asarray(params, dtype=np.float64).tobytes()
+        self.build_seconds = time.perf_counter() - start
+
+        # Error at every cell centre (interpolant there is the mean of the cell's corners)
+        centres = (grid[:-1] + grid[1:]) / 2
+        exact = self._evaluate_grid(observable, centres)
+        interpolated = np.zeros_like(exact)
+        for corner in self._corners:
+            interpolated += self.table[tuple(slice(c, c + self.grid_points - 1) for c in corner)]
+        interpolated /= len(self._corners)
+        max_error = float(np.max(np.abs(exact - interpolated)))
+
+        probes = np.random.default_rng(0).uniform(0, 1, (self.probe_points, self.engine.n_qubits))
+        probe_error = np.max(np.abs(self.engine.expval_z0_batch(probes, params) - self.interpolate(probes)))
+        self.max_error = max(max_error, float(probe_error))
+        self.break_even = self._measure_break_even(probes, params)
+        return self
+
+    def _measure_break_even(self, probes, params, sizes=(16, 32, 64, 128, 256, 512), repeat=3):
+        """Smallest batch size at which interpolation beats the exact engine (inf if it never does)"""
+        def best(func, batch):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                func(batch)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        for size in sizes:
+            batch = probes[:size]
+            if best(self.interpolate, batch) <= best(lambda b: self.engine.expval_z0_batch(b, params), batch):
+                return size
+        return float('inf')
+
+    def expval_z0_batch(self, feature_matrix, params):
+        """<Z0> per row: exact below ``break_even`` rows, interpolated (building the table if needed) above"""
+        feature_matrix = np.atleast_2d(feature_matrix)
+        if len(feature_matrix) < self.break_even:
+            return self.engine.expval_z0_batch(feature_matrix, params)
+        return self.ensure(params).interpolate(feature_matrix)
+
+    def ensure(self, params):
+        """Rebuild when ``params`` changed since the table was computed"""
+        if np.asarray(params, dtype=np.float64).tobytes() != self._params_key:
+            self.build(params)
+        return self
+
+    def interpolate(self, feature_matrix):
+        """Multilinear interpolation of <Z0> for an (N, n_qubits) matrix of encoded features"""
+        last = self.grid_points - 1
+        position = np.clip(np.atleast_2d(feature_matrix), 0.0, 1.0) * last
+        lower = np.minimum(position.astype(np.intp), last - 1)
+        frac = position - lower
+
+        # Corner weights as an outer product over axes, in the same order as _corner_offsets
+        weights = np.ones((len(position), 1))
+        for axis in range(position.shape[1]):
+            weights = (weights[:, :, None] * np.stack([1.0 - frac[:, axis], frac[:, axis]], axis=1)[:, None, :])
+            weights = weights.reshape(len(position), -1)
+        base = lower @ self._strides
+        values = self.table.reshape(-1)[base[:, None] + self._corner_offsets]
+        return np.einsum('nc,nc->n', weights, values)
+
+    @property
+    def nbytes(self):
+        return 0 if self.table is None else self.table.nbytes
+
+
+def compare_with_pennylane(analyzer, trials=200, seed=0):
+    """Max |engine - PennyLane QNode| over random inputs; None without PennyLane"""
+    qnode = analyzer.build_pennylane_qnode()
+    if qnode is None:
+        return None
+
+    engine = StatevectorEngine(analyzer.n_qubits, analyzer.n_layers)
+    rng = np.random.default_rng(seed)
+    max_error = 0.0
+    for _ in range(trials):
+        features = rng.uniform(0, 1, analyzer.n_qubits)
+        params = rng.uniform(0, 2 * np.pi, (analyzer.n_layers, analyzer.n_qubits, 3))
+        expected = float(qnode(features, params))
+        max_error = max(max_error, abs(engine.expval_z0(features, params) - expected))
+    return max_error
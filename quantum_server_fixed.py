@@ -1,17 +1,27 @@
 # quantum_server_fixed.py - Fixed Enhanced Server
-import sqlite3
 import json
 import threading
 import time
 from datetime import datetime
 from collections import deque
+from event_trace import get_tracer
+from db_connections import SQLiteConnectionManager
+from db_writer import GroupCommitWriter
+from db_schema import migrate, enable_incremental_vacuum, ROLLUPS, SCORES
+from db_retention import RetentionCompactor
+
+trace = get_tracer('server')
 
 class QuantumNetworkMonitorServer:
-    def __init__(self, quantum_analyzer, db_path="quantum_network_monitor.db"):
+    def __init__(self, quantum_analyzer, db_path="quantum_network_monitor.db", db=None, writer_options=None,
+                 retention_options=None):
         self.db_path = db_path
+        # Long-lived per-thread connections (WAL, synchronous=NORMAL, busy timeout, statement cache)
+        self.db = db or SQLiteConnectionManager(db_path)
         self.quantum_analyzer = quantum_analyzer
         self.client_last_seen = None
         self.monitoring_active = True
+        self.schema_version = 0
         
         # Attack detection
         self.attack_history = deque(maxlen=20)
@@ -23,103 +33,67 @@ class QuantumNetworkMonitorServer:
         except Exception as e:
             print(f"❌ Database setup error: {e}")
         
+        # Analysis rows and event logs are batched into group commits off the request thread
+        self.writer = GroupCommitWriter(self.db, **(writer_options or {}))
+        
+        # Old analysis rows and logs are pruned in small batches so the tables stop growing
+        self.retention = RetentionCompactor(self.db, **(retention_options or {}))
+        if self.retention.retention_days:
+            self.setup_incremental_vacuum()
+        self.retention.start()
+        
+        # Act on attacks as soon as the continuous analysis loop sees them
+        if hasattr(self.quantum_analyzer, 'add_verdict_listener'):
+            self.quantum_analyzer.add_verdict_listener(self.on_verdict)
+        
         # Start monitoring thread
         self.monitor_thread = threading.Thread(target=self.monitor_client_health, daemon=True)
         self.monitor_thread.start()
     
     def setup_database(self):
-        """Initialize the SQLite database with quantum analysis tables"""
+        """Create or upgrade the database schema once at startup (tracked in PRAGMA user_version)"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Main data table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS client_data (
-                    id INTEGER PRIMARY KEY,
-                    random_value REAL,
-                    timestamp TEXT,
-                    client_timestamp TEXT
-                )
-            ''')
-            
-            # Connection log table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS connection_log (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    event_type TEXT,
-                    timestamp TEXT,
-                    details TEXT
-                )
-            ''')
-            
-            # Quantum analysis table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS quantum_analysis (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT,
-                    pattern_type TEXT,
-                    quantum_score REAL,
-                    classical_score REAL,
-                    confidence REAL,
-                    attack_detected BOOLEAN,
-                    features TEXT
-                )
-            ''')
-            
-            # State snapshots table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS client_state_snapshots (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    timestamp TEXT,
-                    state_data TEXT,
-                    trigger_reason TEXT,
-                    quantum_analysis TEXT
-                )
-            ''')
-            
-            # Initialize 5 entries if empty
-            cursor.execute("SELECT COUNT(*) FROM client_data")
-            if cursor.fetchone()[0] == 0:
-                for i in range(1, 6):
-                    cursor.execute(
-                        "INSERT INTO client_data (id, random_value, timestamp, client_timestamp) VALUES (?, ?, ?, ?)",
-                        (i, 0.0, datetime.now().isoformat(), datetime.now().isoformat())
-                    )
-            
-            conn.commit()
-            conn.close()
-            print("🗄️  Quantum database initialized")
+            with self.db.transaction() as cursor:
+                old_version, self.schema_version = migrate(cursor)
+            if old_version != self.schema_version:
+                print(f"🗄️  Quantum database initialized (schema v{old_version} → v{self.schema_version})")
+            else:
+                print(f"🗄️  Quantum database initialized (schema v{self.schema_version})")
             
         except Exception as e:
             print(f"❌ Database error: {e}")
             # Create minimal fallback
             self._create_fallback_database()
     
+    def setup_incremental_vacuum(self):
+        """Retention only: switch to auto_vacuum=INCREMENTAL so pruned pages can be handed back"""
+        try:
+            # Existing files need a one-off blocking VACUUM; it is skipped entirely while retention is off
+            with self.db.transaction() as cursor:
+                if enable_incremental_vacuum(cursor):
+                    print("🧹 Database rebuilt with auto_vacuum=INCREMENTAL")
+        except Exception as e:
+            print(f"❌ Auto-vacuum setup error: {e}")
+    
     def _create_fallback_database(self):
         """Create minimal database if main setup fails"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS client_data (
-                    id INTEGER PRIMARY KEY,
-                    random_value REAL,
-                    timestamp TEXT,
-                    client_timestamp TEXT
-                )
-            ''')
-            
-            # Add basic entries
-            for i in range(1, 6):
-                cursor.execute(
-                    "INSERT OR REPLACE INTO client_data (id, random_value, timestamp, client_timestamp) VALUES (?, ?, ?, ?)",
-                    (i, 0.0, datetime.now().isoformat(), datetime.now().isoformat())
-                )
-            
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as cursor:
+                cursor.execute('''
+                    CREATE TABLE IF NOT EXISTS client_data (
+                        id INTEGER PRIMARY KEY,
+                        random_value REAL,
+                        timestamp TEXT,
+                        client_timestamp TEXT
+                    )
+                ''')
+                
+                # Add basic entries
+                for i in range(1, 6):
+                    cursor.execute(
+                        "INSERT OR REPLACE INTO client_data (id, random_value, timestamp, client_timestamp) VALUES (?, ?, ?, ?)",
+                        (i, 0.0, datetime.now().isoformat(), datetime.now().isoformat())
+                    )
             print("🗄️  Fallback database created")
             
         except Exception as e:
@@ -128,19 +102,11 @@ class QuantumNetworkMonitorServer:
     def log_event(self, event_type, details=""):
         """Log connection events with error handling"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check if table exists
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='connection_log'")
-            if cursor.fetchone():
-                cursor.execute(
-                    "INSERT INTO connection_log (event_type, timestamp, details) VALUES (?, ?, ?)",
-                    (event_type, datetime.now().isoformat(), details)
-                )
-            
-            conn.commit()
-            conn.close()
+            # Group-committed by the writer thread; nothing waits on the disk here
+            self.writer.execute(
+                "INSERT INTO connection_log (event_type, timestamp, details) VALUES (?, ?, ?)",
+                (event_type, datetime.now().isoformat(), details)
+            )
             
         except Exception as e:
             print(f"❌ Log event error: {e}")
@@ -148,17 +114,12 @@ class QuantumNetworkMonitorServer:
     def update_client_data(self, data):
         """Update client data and perform quantum analysis"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            for entry in data:
-                cursor.execute(
-                    "UPDATE client_data SET random_value = ?, timestamp = ?, client_timestamp = ? WHERE id = ?",
-                    (entry['random_value'], datetime.now().isoformat(), entry['client_timestamp'], entry['id'])
-                )
-            
-            conn.commit()
-            conn.close()
+            with self.db.transaction() as cursor:
+                for entry in data:
+                    cursor.execute(
+                        "UPDATE client_data SET random_value = ?, timestamp = ?, client_timestamp = ? WHERE id = ?",
+                        (entry['random_value'], datetime.now().isoformat(), entry['client_timestamp'], entry['id'])
+                    )
             
             # Update timing for quantum analysis
             self.client_last_seen = datetime.now()
@@ -168,49 +129,67 @@ class QuantumNetworkMonitorServer:
                 if hasattr(self.quantum_analyzer, 'update_timing'):
                     self.quantum_analyzer.update_timing(data[0]['client_timestamp'])
                 
-                analysis = self.quantum_analyzer.analyze_current_pattern()
-                self.store_quantum_analysis(analysis)
-                
-                # Check for attacks
-                if analysis.get('attack_detected', False):
-                    self.handle_attack_detection(analysis)
-                
-                print(f"📊 [SERVER] Updated {len(data)} entries | Risk: {analysis.get('confidence', 0):.2f}")
+                verdict = self.quantum_analyzer.latest_verdict() if hasattr(self.quantum_analyzer, 'latest_verdict') else None
+                if verdict is not None and self.quantum_analyzer.continuous_analysis.active:
+                    # Record the published verdict; on_verdict already handled any attack in it
+                    self.store_quantum_analysis(verdict.analysis)
+                elif hasattr(self.quantum_analyzer, 'submit_analysis'):
+                    # With an analysis pool this returns at once; results are recorded on completion
+                    if not self.quantum_analyzer.submit_analysis(self.record_analysis):
+                        trace.warning('update.analysis_rejected', "⚠️  [SERVER] Analysis queue full, update not analyzed")
+                else:
+                    self.record_analysis(self.quantum_analyzer.analyze_current_pattern())
                 
             except Exception as e:
-                print(f"❌ Quantum analysis error: {e}")
+                trace.error('update.analysis_error', "❌ Quantum analysis error: {}", e, error=repr(e))
             
         except Exception as e:
-            print(f"❌ [SERVER] Update error: {e}")
+            trace.error('update.error', "❌ [SERVER] Update error: {}", e, error=repr(e))
     
-    def store_quantum_analysis(self, analysis):
-        """Store quantum analysis results with error handling"""
+    def record_analysis(self, analysis):
+        """Store an analysis result and raise attack handling for it"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            self.store_quantum_analysis(analysis)
             
-            # Check if table exists
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='quantum_analysis'")
-            if cursor.fetchone():
-                cursor.execute('''
-                    INSERT INTO quantum_analysis 
-                    (timestamp, pattern_type, quantum_score, classical_score, confidence, attack_detected, features)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                ''', (
-                    datetime.now().isoformat(),
-                    analysis.get('pattern_type', 'unknown'),
-                    analysis.get('quantum_score', 0.0),
-                    analysis.get('classical_score', 0.0),
-                    analysis.get('confidence', 0.0),
-                    analysis.get('attack_detected', False),
-                    json.dumps(analysis.get('features', []))
-                ))
+            # Check for attacks
+            if analysis.get('attack_detected', False):
+                self.handle_attack_detection(analysis)
             
-            conn.commit()
-            conn.close()
+            trace.debug('update.analyzed', "📊 [SERVER] Analysis recorded | Risk: {:.2f}",
+                        analysis.get('confidence', 0), confidence=analysis.get('confidence', 0))
+        except Exception as e:
+            trace.error('update.analysis_error', "❌ Quantum analysis error: {}", e, error=repr(e))
+    
+    def on_verdict(self, verdict, previous):
+        """Handle an attack when a verdict first reports it (not on every repeat)"""
+        analysis = verdict.analysis
+        if not analysis.get('attack_detected', False):
+            return
+        before = previous.analysis if previous else {}
+        if before.get('attack_detected') and before.get('pattern_type') == analysis.get('pattern_type'):
+            return
+        self.store_quantum_analysis(analysis)
+        self.handle_attack_detection(analysis)
+    
+    def store_quantum_analysis(self, analysis):
+        """Store quantum analysis results with error handling"""
+        try:
+            self.writer.execute('''
+                INSERT INTO quantum_analysis 
+                (timestamp, pattern_type, quantum_score, classical_score, confidence, attack_detected, features)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                datetime.now().isoformat(),
+                analysis.get('pattern_type', 'unknown'),
+                analysis.get('quantum_score', 0.0),
+                analysis.get('classical_score', 0.0),
+                analysis.get('confidence', 0.0),
+                analysis.get('attack_detected', False),
+                json.dumps(analysis.get('features', []))
+            ))
             
         except Exception as e:
-            print(f"❌ Store analysis error: {e}")
+            trace.error('analysis.store_error', "❌ Store analysis error: {}", e, error=repr(e))
     
     def handle_attack_detection(self, analysis):
         """Handle detected attacks"""
@@ -218,7 +197,8 @@ class QuantumNetworkMonitorServer:
             attack_type = analysis.get('pattern_type', 'unknown')
             confidence = analysis.get('confidence', 0.0)
             
-            print(f"🚨 [QUANTUM] Attack detected: {attack_type} (confidence: {confidence:.2f})")
+            trace.warning('attack.detected', "🚨 [QUANTUM] Attack detected: {} (confidence: {:.2f})",
+                          attack_type, confidence, attack=attack_type, confidence=confidence)
             
             # Log attack
             self.log_event("ATTACK_DETECTED", f"{attack_type} - confidence: {confidence:.2f}")
@@ -233,32 +213,24 @@ class QuantumNetworkMonitorServer:
     def save_client_state(self, reason, quantum_analysis=None):
         """Save current client state with quantum analysis"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get current state
-            cursor.execute("SELECT * FROM client_data")
-            current_state = cursor.fetchall()
-            
-            state_json = json.dumps([{
-                'id': row[0], 
-                'random_value': row[1], 
-                'timestamp': row[2],
-                'client_timestamp': row[3]
-            } for row in current_state])
-            
-            quantum_json = json.dumps(quantum_analysis) if quantum_analysis else None
-            
-            # Check if table exists
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='client_state_snapshots'")
-            if cursor.fetchone():
+            with self.db.transaction() as cursor:
+                # Get current state
+                cursor.execute("SELECT * FROM client_data")
+                current_state = cursor.fetchall()
+                
+                state_json = json.dumps([{
+                    'id': row[0], 
+                    'random_value': row[1], 
+                    'timestamp': row[2],
+                    'client_timestamp': row[3]
+                } for row in current_state])
+                
+                quantum_json = json.dumps(quantum_analysis) if quantum_analysis else None
+                
                 cursor.execute(
                     "INSERT INTO client_state_snapshots (timestamp, state_data, trigger_reason, quantum_analysis) VALUES (?, ?, ?, ?)",
                     (datetime.now().isoformat(), state_json, reason, quantum_json)
                 )
-            
-            conn.commit()
-            conn.close()
             print(f"💾 [SERVER] State saved: {reason}")
             
         except Exception as e:
@@ -283,53 +255,99 @@ class QuantumNetworkMonitorServer:
                 print(f"❌ Monitor error: {e}")
                 time.sleep(5)
     
+    def close(self):
+        """Stop background monitoring and close the database connections"""
+        self.monitoring_active = False
+        self.retention.stop()
+        self.writer.close()
+        self.db.close_all()
+    
+    def get_analysis_trends(self, granularity='minute', since=None, until=None, pattern_type=None):
+        """Per-bucket analysis counts and score min/mean/max from the rollup tables (oldest bucket first)"""
+        if granularity not in ROLLUPS:
+            raise ValueError(f"granularity must be one of {sorted(ROLLUPS)}")
+        table, width = ROLLUPS[granularity]
+        
+        def bucket_of(value, default):
+            if value is None:
+                return default
+            return (value.isoformat() if isinstance(value, datetime) else str(value))[:width]
+        
+        query = f"SELECT * FROM {table} WHERE bucket >= ? AND bucket <= ?"
+        params = [bucket_of(since, ''), bucket_of(until, '\uffff')]
+        if pattern_type:
+            query += " AND pattern_type = ?"
+            params.append(pattern_type)
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute(query + " ORDER BY bucket", params)
+                rows = cursor.fetchall()
+        except Exception as e:
+            print(f"❌ Analysis trends error: {e}")
+            return []
+        
+        trends = []
+        for bucket, pattern, count, attack_count, *scores in rows:
+            if not trends or trends[-1]['bucket'] != bucket:
+                trends.append({'bucket': bucket, 'count': 0, 'attack_count': 0, 'patterns': {},
+                               **{score: {'min': None, 'sum': 0.0, 'max': None} for score in SCORES}})
+            entry = trends[-1]
+            entry['count'] += count
+            entry['attack_count'] += attack_count
+            entry['patterns'][pattern] = count
+            for score, (low, total, high) in zip(SCORES, zip(scores[0::3], scores[1::3], scores[2::3])):
+                stat = entry[score]
+                stat['min'] = low if stat['min'] is None else min(stat['min'], low)
+                stat['max'] = high if stat['max'] is None else max(stat['max'], high)
+                stat['sum'] += total or 0.0
+        for entry in trends:
+            for score in SCORES:
+                entry[score]['mean'] = entry[score].pop('sum') / entry['count'] if entry['count'] else None
+        return trends
+    
+    def get_database_stats(self):
+        """Schema version, connection manager, group-commit writer and retention metrics"""
+        return {'schema_version': self.schema_version, 'connections': self.db.stats(),
+                'writer': self.writer.stats(), 'retention': self.retention.stats()}
+    
     def get_status(self):
         """Get comprehensive status including quantum analysis"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get current data
-            cursor.execute("SELECT * FROM client_data ORDER BY id")
-            current_data = cursor.fetchall()
-            
-            # Get recent logs with error handling
-            recent_logs = []
-            try:
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='connection_log'")
-                if cursor.fetchone():
+            with self.db.transaction() as cursor:
+                # Get current data
+                cursor.execute("SELECT * FROM client_data ORDER BY id")
+                current_data = cursor.fetchall()
+                
+                # Get recent logs with error handling
+                recent_logs = []
+                try:
                     cursor.execute("SELECT * FROM connection_log ORDER BY timestamp DESC LIMIT 10")
                     recent_logs = cursor.fetchall()
-            except:
-                pass
-            
-            # Get quantum analysis with error handling
-            quantum_analysis = []
-            try:
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='quantum_analysis'")
-                if cursor.fetchone():
+                except:
+                    pass
+                
+                # Get quantum analysis with error handling
+                quantum_analysis = []
+                try:
                     cursor.execute("SELECT * FROM quantum_analysis ORDER BY timestamp DESC LIMIT 10")
                     quantum_analysis = cursor.fetchall()
-            except:
-                pass
-            
-            # Get saved snapshots with error handling
-            snapshots = []
-            try:
-                cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='client_state_snapshots'")
-                if cursor.fetchone():
+                except:
+                    pass
+                
+                # Get saved snapshots with error handling
+                snapshots = []
+                try:
                     cursor.execute("SELECT * FROM client_state_snapshots ORDER BY timestamp DESC LIMIT 5")
                     snapshots = cursor.fetchall()
-            except:
-                pass
-            
-            conn.close()
+                except:
+                    pass
             
             return {
                 'current_data': current_data,
                 'recent_logs': recent_logs,
                 'quantum_analysis': quantum_analysis,
                 'saved_snapshots': snapshots,
+                'database': self.get_database_stats(),
                 'client_last_seen': self.client_last_seen.isoformat() if self.client_last_seen else None,
                 'status': 'connected' if self.client_last_seen and (datetime.now() - self.client_last_seen).total_seconds() < 10 else 'disconnected'
             }
@@ -0,0 +1,98 @@
+# rate_scheduler.py - Token-bucket pacing for the packet simulator
+import time
+import numpy as np
+
+# mode -> (target packets/s, packets per batch); None sizes batches to BATCH_INTERVAL.
+# Defaults keep the old loop's nominal rates (mean batch size / sleep).
+MODE_PROFILES = {
+    'ddos_volumetric': (100000.0, None),
+    'port_scan': (300.0, 30),
+    'data_exfiltration': (20.0, 10),
+    'botnet_c2': (2.75, 5),
+    'syn_flood': (1500.0, 75),
+    'normal': (18.0, 5),
+}
+BATCH_INTERVAL = 0.01  # Seconds of traffic per batch for profiles without a fixed batch size
+
+
+class RateScheduler:
+    """Token bucket that sizes simulator batches to a target packet rate.
+
+    Tokens accrue at ``target_pps`` from the absolute elapsed time since the
+    rate was set, so sleep overshoot and generation time are paid back on
+    the next batch instead of accumulating as drift. A batch is released once
+    ``batch_size`` tokens are available. ``burst_seconds`` caps the backlog
+    the bucket may hold after a stall; anything beyond it is written off as
+    ``shortfall`` rather than released as one huge burst. ``max_batch`` bounds
+    a single release (e.g. to the packet store capacity).
+    """
+
+    def __init__(self, target_pps, batch_size=None, burst_seconds=0.1, max_batch=None,
+                 clock=time.monotonic):
+        self.clock = clock
+        self.max_batch = max_batch
+        self.configure(target_pps, batch_size, burst_seconds)
+
+    def configure(self, target_pps, batch_size=None, burst_seconds=None):
+        """Set a new target rate; statistics restart from now"""
+        self.target_pps = float(target_pps)
+        if burst_seconds is not None:
+            self.burst_seconds = float(burst_seconds)
+        batch = batch_size or max(int(round(self.target_pps * BATCH_INTERVAL)), 1)
+        self.batch_size = min(batch, self.max_batch) if self.max_batch else batch
+        self.started = self.clock()
+        self.wall_started = time.time()
+        self._origin = self.started  # Moves forward when backlog is written off
+        self.emitted = 0
+        self.batches = 0
+        self.shortfall = 0
+        self._last_wall = self.wall_started
+
+    def _tokens(self, now):
+        tokens = self.target_pps * (now - self._origin) - self.emitted
+        cap = max(self.target_pps * self.burst_seconds, self.batch_size)
+        if tokens > cap:
+            # Stalled for longer than the burst allowance: forgive the excess
+            self.shortfall += int(tokens - cap)
+            self._origin += (tokens - cap) / self.target_pps
+            tokens = cap
+        return tokens
+
+    def take(self):
+        """Packets to emit now (0 while the next batch is not yet due)"""
+        tokens = self._tokens(self.clock())
+        if tokens < self.batch_size:
+            return 0
+        n = int(tokens)
+        if self.max_batch:
+            n = min(n, self.max_batch)
+        self.emitted += n
+        self.batches += 1
+        return n
+
+    def wait_time(self):
+        """Seconds until the next batch is due"""
+        if self.target_pps <= 0:
+            return 0.1
+        return max((self.batch_size - self._tokens(self.clock())) / self.target_pps, 0.0)
+
+    def timestamps(self, n):
+        """Arrival times spread evenly since the previous batch, ending now"""
+        now = time.time()
+        stamps = np.linspace(self._last_wall, now, n + 1)[1:]
+        self._last_wall = now
+        return stamps
+
+    def stats(self):
+        elapsed = max(self.clock() - self.started, 1e-9)
+        achieved = self.emitted / elapsed
+        return {
+            'target_pps': self.target_pps,
+            'achieved_pps': achieved,
+            'error_pct': (achieved / self.target_pps - 1) * 100 if self.target_pps else 0.0,
+            'batch_size': self.batch_size,
+            'batches': self.batches,
+            'emitted': self.emitted,
+            'shortfall': self.shortfall,
+            'elapsed': elapsed
+        }
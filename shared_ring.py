@@ -0,0 +1,211 @@
+# shared_ring.py - Shared-memory packet ring fed by an out-of-process generator
+import time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from packet_store import PACKET_COLUMNS
+from packet_generator import generate_columns
+from rate_scheduler import RateScheduler, MODE_PROFILES, BATCH_INTERVAL
+
+# One packed fixed-size record per packet, field for field the packet store columns
+RECORD_DTYPE = np.dtype(list(PACKET_COLUMNS))
+
+# Header slots (int64). The consumer writes READ_SEQ and the control slots (STOP
+# to CONTROL), the producer everything else, so no lock is needed. The RATE_*
+# slots describe the producer's scheduler since it applied control version APPLIED.
+(WRITE_SEQ, READ_SEQ, DROPPED, CAPACITY, STOP, MODE, TARGET_MPPS, BATCH, CONTROL,
+ APPLIED, RATE_EMITTED, RATE_SHORTFALL, RATE_STARTED_NS) = range(13)
+HEADER_SLOTS = 16
+HEADER_BYTES = HEADER_SLOTS * 8
+
+# Mode codes for the MODE slot; unknown modes run as 'normal'
+MODES = tuple(MODE_PROFILES)
+
+
+class SharedPacketRing:
+    """Single-producer, single-consumer ring of packet records in shared memory.
+
+    ``write_seq`` and ``read_seq`` count records ever written and consumed;
+    each side publishes its counter only after copying the records, so the
+    other side never sees a half-written slot. The producer never blocks:
+    records that do not fit in the free space are dropped and counted in
+    ``dropped``, which is the backpressure signal when the consumer falls
+    behind.
+    """
+
+    def __init__(self, capacity=65536, name=None):
+        if name is None:
+            capacity = int(capacity)
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER_BYTES + capacity * RECORD_DTYPE.itemsize)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.header = np.ndarray((HEADER_SLOTS,), dtype=np.int64, buffer=self.shm.buf)
+        if self.owner:
+            self.header[:] = 0
+            self.header[CAPACITY] = capacity
+        self.capacity = int(self.header[CAPACITY])
+        self.records = np.ndarray((self.capacity,), dtype=RECORD_DTYPE, buffer=self.shm.buf, offset=HEADER_BYTES)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __len__(self):
+        return int(self.header[WRITE_SEQ] - self.header[READ_SEQ])
+
+    def write(self, columns):
+        """Producer side: append a column batch; returns the number of records kept"""
+        n = len(columns['timestamp'])
+        write_seq = int(self.header[WRITE_SEQ])
+        free = self.capacity - (write_seq - int(self.header[READ_SEQ]))
+        kept = min(n, free)
+        if kept < n:
+            self.header[DROPPED] += n - kept
+        if kept:
+            start = write_seq % self.capacity
+            first = min(kept, self.capacity - start)
+            for name, _ in PACKET_COLUMNS:
+                values = columns[name]
+                self.records[name][start:start + first] = values[:first]
+                if first < kept:
+                    self.records[name][:kept - first] = values[first:kept]
+            self.header[WRITE_SEQ] = write_seq + kept
+        return kept
+
+    def read(self, max_records=None):
+        """Consumer side: copy out up to ``max_records`` pending records as columns (None if empty)"""
+        read_seq = int(self.header[READ_SEQ])
+        n = int(self.header[WRITE_SEQ]) - read_seq
+        if max_records is not None:
+            n = min(n, int(max_records))
+        if n <= 0:
+            return None
+        start = read_seq % self.capacity
+        first = min(n, self.capacity - start)
+        block = self.records[start:start + first]
+        if first < n:
+            block = np.concatenate([block, self.records[:n - first]])
+        else:
+            block = block.copy()
+        self.header[READ_SEQ] = read_seq + n
+        return {name: block[name] for name, _ in PACKET_COLUMNS}
+
+    def set_mode(self, mode, target_pps, batch_size=None):
+        """Consumer side: ask the producer for a new mode/rate"""
+        self.header[MODE] = MODES.index(mode) if mode in MODES else MODES.index('normal')
+        self.header[TARGET_MPPS] = int(round(target_pps * 1000))
+        self.header[BATCH] = batch_size or 0
+        self.header[CONTROL] += 1
+
+    def stats(self):
+        header = self.header
+        return {
+            'capacity': self.capacity,
+            'written': int(header[WRITE_SEQ]),
+            'consumed': int(header[READ_SEQ]),
+            'pending': int(header[WRITE_SEQ] - header[READ_SEQ]),
+            'dropped': int(header[DROPPED])
+        }
+
+    def close(self):
+        self.header = self.records = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def producer_main(name, seed=None, burst_seconds=0.1, max_batch=None):
+    """Generator process: paces batches with a RateScheduler and writes them into the ring"""
+    ring = SharedPacketRing(name=name)
+    rng = np.random.default_rng(seed)
+    header = ring.header
+    scheduler = RateScheduler(*MODE_PROFILES['normal'], burst_seconds=burst_seconds,
+                              max_batch=max_batch or ring.capacity)
+    control = -1
+    try:
+        while not header[STOP]:
+            if header[CONTROL] != control:
+                control = int(header[CONTROL])
+                mode = MODES[int(header[MODE])]
+                scheduler.configure(header[TARGET_MPPS] / 1000.0, int(header[BATCH]) or None)
+                header[RATE_EMITTED] = 0
+                header[RATE_SHORTFALL] = 0
+                header[RATE_STARTED_NS] = time.monotonic_ns()
+                header[APPLIED] = control
+            n = scheduler.take()
+            header[RATE_SHORTFALL] = scheduler.shortfall
+            if not n:
+                time.sleep(min(scheduler.wait_time(), 0.1))
+                continue
+            ring.write(generate_columns(mode, rng, scheduler.timestamps(n), n))
+            header[RATE_EMITTED] += n
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ring.close()
+
+
+class PacketProducerProcess:
+    """Owns the shared ring and the generator process that fills it"""
+
+    def __init__(self, capacity=65536, seed=None, burst_seconds=0.1, max_batch=None):
+        self.ring = SharedPacketRing(capacity)
+        self.seed = seed
+        self.burst_seconds = burst_seconds
+        self.max_batch = max_batch
+        self.process = None
+
+    def start(self, mode, target_pps, batch_size=None):
+        self.set_mode(mode, target_pps, batch_size)
+        # spawn: forking a process that already runs Flask and simulator threads is unsafe
+        context = mp.get_context('spawn')
+        self.process = context.Process(target=producer_main, name='packet-producer', daemon=True,
+                                       args=(self.ring.name, self.seed, self.burst_seconds, self.max_batch))
+        self.process.start()
+
+    def set_mode(self, mode, target_pps, batch_size=None):
+        self.ring.set_mode(mode, target_pps, batch_size)
+        self.target_pps = float(target_pps)
+        self.batch_size = batch_size or max(int(round(self.target_pps * BATCH_INTERVAL)), 1)
+
+    def read(self, max_records=None):
+        return self.ring.read(max_records)
+
+    def is_alive(self):
+        return bool(self.process and self.process.is_alive())
+
+    def stats(self):
+        """Ring counters plus the producer's achieved rate (RateScheduler.stats keys)"""
+        header = self.ring.header
+        stats = self.ring.stats()
+        applied = header[APPLIED] == header[CONTROL]
+        emitted = int(header[RATE_EMITTED]) if applied else 0
+        elapsed = max((time.monotonic_ns() - int(header[RATE_STARTED_NS])) / 1e9, 1e-9) if applied else 0.0
+        achieved = emitted / elapsed if elapsed else 0.0
+        stats.update({
+            'target_pps': self.target_pps,
+            'achieved_pps': achieved,
+            'error_pct': (achieved / self.target_pps - 1) * 100 if self.target_pps and applied else 0.0,
+            'batch_size': self.batch_size,
+            'emitted': emitted,
+            'shortfall': int(header[RATE_SHORTFALL]) if applied else 0,
+            'elapsed': elapsed,
+            'alive': self.is_alive()
+        })
+        return stats
+
+    def stop(self, timeout=2.0):
+        if self.ring.header is None:
+            return
+        self.ring.header[STOP] = 1
+        if self.process is not None:
+            self.process.join(timeout)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join(timeout)
+        self.ring.close()
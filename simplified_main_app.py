@@ -5,7 +5,7 @@ import sys
 import json
 import subprocess
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 from flask import Flask, request, jsonify
 
 # Import simplified components
@@ -25,8 +25,16 @@ class SimplifiedPacketQuantumNetworkMonitor:
         print("📦 Initializing Simplified Quantum Network Security System...")
         
         # Initialize components
-        self.quantum_analyzer = QuantumNetworkAnalyzer()
-        self.server = QuantumNetworkMonitorServer(self.quantum_analyzer)
+        # QML_PACKET_SOURCE=process moves packet generation out of the Flask process
+        # QML_ANALYSIS_WORKERS sizes the analysis process pool (0 analyzes inline on the request thread)
+        # QML_ANALYSIS_INTERVAL is the continuous analysis cadence in seconds (0 analyzes only on request)
+        # QML_RETENTION_DAYS opts in to deleting analysis rows and connection logs older than that (0 keeps everything)
+        self.quantum_analyzer = QuantumNetworkAnalyzer(packet_source=os.environ.get('QML_PACKET_SOURCE', 'thread'),
+                                                       analysis_workers=int(os.environ.get('QML_ANALYSIS_WORKERS', '1')),
+                                                       analysis_interval=float(os.environ.get('QML_ANALYSIS_INTERVAL', '0.25')))
+        self.server = QuantumNetworkMonitorServer(
+            self.quantum_analyzer,
+            retention_options={'retention_days': float(os.environ.get('QML_RETENTION_DAYS', '0'))})
         
         # Create client and attack simulator
         self.attack_simulator = NetworkAttackSimulator(None)
@@ -129,21 +137,59 @@ class SimplifiedPacketQuantumNetworkMonitor:
             except Exception as e:
                 return jsonify({'error': f'Analytics not available: {e}'}), 500
         
+        # Heavy hitters API endpoint (?window=seconds&top=N&dimension=src_ip&metric=bytes)
+        @self.app.route('/api/heavy_hitters')
+        def heavy_hitters_api():
+            try:
+                return jsonify({
+                    'window_seconds': request.args.get('window', 10.0, type=float),
+                    'heavy_hitters': self.quantum_analyzer.get_heavy_hitters(
+                        seconds=request.args.get('window', 10.0, type=float),
+                        top_n=request.args.get('top', None, type=int),
+                        dimension=request.args.get('dimension'),
+                        metric=request.args.get('metric')),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except KeyError as e:
+                return jsonify({'error': f'Unknown dimension or metric: {e}'}), 400
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+        
         # Attack prediction API endpoint
         @self.app.route('/api/attack_prediction')
         def attack_prediction_api():
             try:
-                analysis = self.quantum_analyzer.analyze_current_pattern()
+                analysis = self.quantum_analyzer.current_analysis()
+                verdict = self.quantum_analyzer.latest_verdict()
                 return jsonify({
                     'predicted_attack': analysis.get('predicted_attack_type', 'unknown'),
                     'confidence': analysis.get('attack_confidence', 0.0),
                     'probability_scores': analysis.get('attack_probability_scores', {}),
                     'attack_details': analysis.get('attack_details', {}),
+                    'verdict_age_seconds': time.time() - verdict.computed_at if verdict else None,
                     'timestamp': datetime.now().isoformat()
                 })
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
     
+        @self.app.route('/api/analysis_trends')
+        def analysis_trends_api():
+            try:
+                granularity = request.args.get('granularity', 'minute')
+                hours = request.args.get('hours', 1.0 if granularity == 'minute' else 24.0, type=float)
+                return jsonify({
+                    'granularity': granularity,
+                    'hours': hours,
+                    'buckets': self.server.get_analysis_trends(
+                        granularity=granularity,
+                        since=datetime.now() - timedelta(hours=hours),
+                        pattern_type=request.args.get('pattern'))
+                })
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+    
     def enhanced_attack_simulation(self, attack_type):
         """Start attack simulation"""
         print(f"🎯 Starting {attack_type} attack simulation")
@@ -187,7 +233,7 @@ class SimplifiedPacketQuantumNetworkMonitor:
             
             # Add attack prediction
             try:
-                analysis = self.quantum_analyzer.analyze_current_pattern()
+                analysis = self.quantum_analyzer.current_analysis()
                 status_data['attack_prediction'] = {
                     'predicted_attack': analysis.get('predicted_attack_type', 'unknown'),
                     'confidence': analysis.get('attack_confidence', 0.0),
@@ -446,6 +492,7 @@ class SimplifiedPacketQuantumNetworkMonitor:
                             <a href="/" class="btn">🔄 Refresh</a>
                             <a href="/packet_analytics" class="btn btn-info" target="_blank">📊 Analytics</a>
                             <a href="/api/attack_prediction" class="btn btn-info" target="_blank">🎯 API</a>
+                            <a href="/api/analysis_trends?granularity=hour" class="btn btn-info" target="_blank">📈 Trends</a>
                         </div>
                     </div>
                     
@@ -616,11 +663,14 @@ class SimplifiedPacketQuantumNetworkMonitor:
         print("🧹 Cleaning up system...")
         
         # Stop packet simulation
-        if hasattr(self.quantum_analyzer, 'packet_simulator_active'):
-            self.quantum_analyzer.packet_simulator_active = False
+        if hasattr(self.quantum_analyzer, 'stop_packet_simulation'):
+            self.quantum_analyzer.stop_packet_simulation()
+        if hasattr(self.quantum_analyzer, 'shutdown_analysis'):
+            self.quantum_analyzer.shutdown_analysis()
         
         # Stop client
         self.client.stop()
+        self.server.close()
         
         print("✅ Cleanup complete")
 
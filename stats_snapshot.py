@@ -0,0 +1,44 @@
+# stats_snapshot.py - Immutable stats snapshots published by the packet writer thread
+import time
+from collections import deque, namedtuple
+
+StatsSnapshot = namedtuple('StatsSnapshot', [
+    'epoch', 'published_at', 'position', 'generation', 'history_size', 'total_packets', 'packets_per_second',
+    'unique_src_ips', 'unique_dst_ports', 'distinct_estimates', 'avg_packet_size',
+    'protocol_distribution', 'traffic_rates', 'window_metrics', 'window_size', 'attack_mode', 'attack_start_time',
+    'simulator_rate'
+])
+
+
+class SnapshotPublisher:
+    """Single-writer, many-reader publication by atomic reference swap.
+
+    The writer builds a complete StatsSnapshot from freshly allocated values
+    and swaps ``latest`` in one assignment, so readers never take a lock,
+    never wait on the writer and never see half-updated state. Published
+    values are never mutated afterwards. Other threads ask the writer for
+    changes (such as a stats reset) with ``request``; the writer drains the
+    requests between batches.
+    """
+
+    def __init__(self):
+        self.latest = None
+        self.epoch = 0
+        self._requests = deque()
+
+    def publish(self, **fields):
+        self.epoch += 1
+        snapshot = StatsSnapshot(epoch=self.epoch, published_at=time.time(), **fields)
+        self.latest = snapshot
+        return snapshot
+
+    def request(self, action):
+        self._requests.append(action)
+
+    def drain_requests(self):
+        """Pending requests in arrival order (deque.popleft is atomic)"""
+        while True:
+            try:
+                yield self._requests.popleft()
+            except IndexError:
+                return
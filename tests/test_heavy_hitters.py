@@ -0,0 +1,33 @@
+# test_heavy_hitters.py - HeavyHitterTracker queries
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from heavy_hitters import HeavyHitterTracker
+from packet_store import PacketRingBuffer
+
+
+def _tracker():
+    store = PacketRingBuffer(capacity=1000)
+    tracker = HeavyHitterTracker(store, k=3)
+    now = time.time()
+    store.extend([{'timestamp': now, 'size': 100, 'protocol': 'TCP', 'src_ip': f"10.0.0.{i % 4}",
+                   'dst_ip': '192.168.1.1', 'dst_port': 80} for i in range(40)] +
+                 [{'timestamp': now, 'size': 100, 'protocol': 'TCP', 'src_ip': '10.0.0.9',
+                   'dst_ip': '192.168.1.1', 'dst_port': 80} for _ in range(60)])
+    tracker.sync()
+    return tracker
+
+
+def test_top_defaults_to_the_current_time():
+    top = _tracker().top('src_ip')
+    assert top[0] == {'key': '10.0.0.9', 'count': 60, 'lower_bound': 60}
+    assert len(top) == 3
+
+
+def test_report_defaults_to_the_current_time():
+    report = _tracker().report()
+    assert report['dst_port']['packets'][0]['key'] == 80
+    assert report['dst_port']['bytes'][0]['count'] == 100 * 100
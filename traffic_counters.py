@@ -0,0 +1,134 @@
+# traffic_counters.py - Time-bucketed packet/byte counters at several resolutions
+import threading
+import numpy as np
+
+DEFAULT_RESOLUTIONS = ((0.1, 100), (1.0, 120), (10.0, 90), (60.0, 60))  # (seconds, buckets)
+CODE_SLOTS = 16  # Per-protocol/direction series; larger codes share the last slot
+
+
+class BucketRing:
+    """Fixed ring of ``n_buckets`` counters of ``resolution`` seconds each.
+
+    Every slot remembers the bucket epoch (``floor(t / resolution)``) it holds,
+    so stale slots are recognised and recycled lazily on write; nothing has to
+    sweep the ring as time passes.
+    """
+
+    def __init__(self, resolution, n_buckets):
+        self.resolution = float(resolution)
+        self.n_buckets = int(n_buckets)
+        self.epochs = np.full(self.n_buckets, -1, dtype=np.int64)
+        self.packets = np.zeros(self.n_buckets, dtype=np.int64)
+        self.bytes = np.zeros(self.n_buckets, dtype=np.int64)
+        self.protocol_packets = np.zeros((self.n_buckets, CODE_SLOTS), dtype=np.int64)
+        self.protocol_bytes = np.zeros((self.n_buckets, CODE_SLOTS), dtype=np.int64)
+        self.direction_packets = np.zeros((self.n_buckets, CODE_SLOTS), dtype=np.int64)
+
+    @property
+    def span_seconds(self):
+        return self.resolution * self.n_buckets
+
+    def add(self, timestamps, sizes, protocols, directions):
+        epochs = np.floor(timestamps / self.resolution).astype(np.int64)
+        unique_epochs, inverse = np.unique(epochs, return_inverse=True)
+        # Only the newest n_buckets epochs of a batch can coexist in the ring
+        live = unique_epochs > unique_epochs[-1] - self.n_buckets
+        slots = unique_epochs % self.n_buckets
+        current = self.epochs[slots]
+        live &= unique_epochs >= current  # Older than what the slot holds: already evicted
+
+        fresh = slots[live & (unique_epochs > current)]
+        self.epochs[fresh] = unique_epochs[live & (unique_epochs > current)]
+        for counter in (self.packets, self.bytes, self.protocol_packets, self.protocol_bytes,
+                        self.direction_packets):
+            counter[fresh] = 0
+
+        keep = live[inverse]
+        rows = slots[inverse][keep]
+        sizes = sizes[keep]
+        protocols = np.minimum(protocols[keep], CODE_SLOTS - 1)
+        np.add.at(self.packets, rows, 1)
+        np.add.at(self.bytes, rows, sizes)
+        np.add.at(self.protocol_packets, (rows, protocols), 1)
+        np.add.at(self.protocol_bytes, (rows, protocols), sizes)
+        np.add.at(self.direction_packets, (rows, np.minimum(directions[keep], CODE_SLOTS - 1)), 1)
+
+    def window_slots(self, seconds, now):
+        """Slots covering the last ``seconds`` up to ``now`` and the time they actually cover"""
+        now_epoch = int(np.floor(now / self.resolution))
+        k = min(max(int(np.ceil(seconds / self.resolution)), 1), self.n_buckets)
+        first_epoch = now_epoch - k + 1
+        mask = (self.epochs >= first_epoch) & (self.epochs <= now_epoch)
+        covered = now - first_epoch * self.resolution  # Includes the partial current bucket
+        return mask, max(covered, 1e-9)
+
+
+class TrafficCounters:
+    """Packet and byte rates over a PacketRingBuffer, per protocol and direction.
+
+    Like SlidingWindowAggregator, ``sync()`` folds in packets appended to the
+    store since the last call, so counting costs O(new packets). Reads touch
+    at most one ring of buckets, independent of the history buffer size, and
+    keep counting traffic the ring buffer has already evicted. Only the
+    thread that writes the store may call ``sync()``.
+    """
+
+    def __init__(self, store, resolutions=DEFAULT_RESOLUTIONS):
+        self.store = store
+        self.rings = sorted((BucketRing(res, n) for res, n in resolutions), key=lambda r: r.resolution)
+        self.lock = threading.Lock()
+        self.position = store.total
+        self.missed = 0  # Packets evicted from the store before sync() saw them
+
+    def sync(self):
+        with self.lock:
+            total = self.store.total
+            if total == self.position:
+                return
+            start = max(self.position, total - len(self.store))
+            self.missed += start - self.position
+            block = self.store.span(start, total)
+            self.position = total
+            for ring in self.rings:
+                ring.add(block['timestamp'], block['size'], block['protocol'], block['direction'])
+
+    def ring_for(self, seconds):
+        """Finest ring whose span covers ``seconds`` (the coarsest one otherwise)"""
+        for ring in self.rings:
+            if ring.span_seconds >= seconds:
+                return ring
+        return self.rings[-1]
+
+    def rates(self, seconds, now):
+        """Per-second packet/byte rates over the last ``seconds``, with protocol/direction breakdowns"""
+        ring = self.ring_for(seconds)
+        with self.lock:
+            mask, covered = ring.window_slots(seconds, now)
+            protocol_packets = ring.protocol_packets[mask].sum(axis=0)
+            protocol_bytes = ring.protocol_bytes[mask].sum(axis=0)
+            direction_packets = ring.direction_packets[mask].sum(axis=0)
+            packets = int(ring.packets[mask].sum())
+            total_bytes = int(ring.bytes[mask].sum())
+
+        protocols = self.store.protocols.values[:CODE_SLOTS]
+        directions = self.store.directions.values[:CODE_SLOTS]
+        return {
+            'window_seconds': seconds,
+            'resolution': ring.resolution,
+            'packets': packets,
+            'bytes': total_bytes,
+            'packets_per_second': packets / covered,
+            'bytes_per_second': total_bytes / covered,
+            'protocol_pps': {name: protocol_packets[code] / covered
+                             for code, name in enumerate(protocols) if protocol_packets[code]},
+            'protocol_bps': {name: protocol_bytes[code] / covered
+                             for code, name in enumerate(protocols) if protocol_bytes[code]},
+            'direction_pps': {name: direction_packets[code] / covered
+                              for code, name in enumerate(directions) if direction_packets[code]}
+        }
+
+    def packets_per_second(self, seconds, now):
+        ring = self.ring_for(seconds)
+        with self.lock:
+            mask, covered = ring.window_slots(seconds, now)
+            return float(ring.packets[mask].sum()) / covered